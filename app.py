@@ -10,15 +10,17 @@ from igt_env import IGTEnv
 from auth import is_logged_in, is_admin, login, logout, get_user_id, get_nickname
 from deck_config import load_config, save_config, get_decks, get_allow_user_edit
 from i18n import t, get_lang, set_lang
+from igt_outcome import deck_risk_table
+from igt_cohort import fit_cohort
+from igt_trajectory import has_path_rows, history_from_entry
+from igt_replay import verify_submissions
 from submission_store import (
-    get_all,
     get_all_grouped_by_user,
-    self_play_to_csv_rows,
-    model_run_to_csv_rows,
     to_csv_string,
     list_users,
     delete_user_data,
 )
+from submission_export import EXPORT_FORMATS, get_export
 
 st.set_page_config(page_title="爱荷华赌博任务 · 实验室", page_icon="🃏", layout="wide")
 if "lang" not in st.session_state:
@@ -101,6 +103,22 @@ if is_logged_in() and is_admin() and st.session_state.get("viewing_backend"):
     if st.button(t("btn_back_home"), key="back_from_admin"):
         st.session_state.viewing_backend = False
         st.rerun()
+    st.radio(
+        t("export_format"), EXPORT_FORMATS, horizontal=True, key="export_fmt",
+        format_func=lambda f: t(f"export_fmt_{f}"),
+    )
+
+    def lazy_download(module, label, key, user_id=None):
+        """导出只在点「准备下载」后生成（有缓存），之后显示下载按钮；避免每次刷新都为全部数据生成 CSV。"""
+        fmt = st.session_state.get("export_fmt", "csv")
+        if st.session_state.get(key):
+            f, file_name, mime = get_export(module, user_id, fmt)
+            with f:
+                st.download_button(label, data=f, file_name=file_name, mime=mime, key=f"{key}_{fmt}")
+        elif st.button(t("btn_prepare_export", label=label), key=f"{key}_prepare"):
+            st.session_state[key] = True
+            st.rerun()
+
     st.markdown("---")
     tab_deck, tab_users, tab_self, tab_others = st.tabs([
         t("tab_deck"), t("tab_users"), t("tab_self"), t("tab_others"),
@@ -136,6 +154,26 @@ if is_logged_in() and is_admin() and st.session_state.get("viewing_backend"):
                 st.session_state.igt_decks = {k: list(v) for k, v in get_decks().items()}
                 st.success(t("saved_deck"))
                 st.rerun()
+        risk_n = 100
+        st.markdown("**" + t("risk_title", n=risk_n) + "**")
+        st.caption(t("risk_caption"))
+        risk_rows = deck_risk_table(cfg.get("decks"), n_trials=risk_n)
+        st.dataframe(
+            [
+                {
+                    t("risk_plan"): t("risk_plan_random") if r["plan"] == "random" else t("risk_plan_deck", k=r["plan"]),
+                    t("risk_mean"): round(r["mean"], 1),
+                    t("risk_std"): round(r["std"], 1),
+                    t("risk_q05"): r["q05"],
+                    t("risk_q50"): r["q50"],
+                    t("risk_q95"): r["q95"],
+                    t("risk_prob_loss"): f"{r['prob_loss']:.1%}",
+                }
+                for r in risk_rows
+            ],
+            use_container_width=True,
+            hide_index=True,
+        )
     with tab_users:
         st.subheader(t("users_title"))
         st.caption(t("users_caption"))
@@ -164,39 +202,39 @@ if is_logged_in() and is_admin() and st.session_state.get("viewing_backend"):
                 with st.expander(t("expander_user", uid=user_id, nick=nickname, n=len(entries)), expanded=(len(entries) > 0)):
                     for i, e in enumerate(entries):
                         ts = e.get("时间", "")
-                        history = e.get("history", [])
+                        history = history_from_entry(e)
                         n_rounds = len(history)
                         final_balance = history[-1][2] if history else 0
                         st.caption(t("submit_n", n=i+1) + f" · {ts} · " + t("rounds_balance", rounds=n_rounds, balance=final_balance))
-                    csv_rows = self_play_to_csv_rows(entries)
-                    csv_str = to_csv_string(csv_rows)
-                    st.download_button(
-                        t("dl_user_csv", uid=user_id),
-                        data=csv_str.encode("utf-8-sig"),
-                        file_name=f"igt_自己玩_{user_id}.csv",
-                        mime="text/csv",
-                        key=f"dl_self_{user_id}",
-                    )
-            all_self = get_all("自己玩")
-            if all_self:
-                all_csv = self_play_to_csv_rows(all_self)
+                    lazy_download("自己玩", t("dl_user_csv", uid=user_id), f"dl_self_{user_id}", user_id)
+            lazy_download("自己玩", t("dl_all_self"), "dl_self_all")
+            st.markdown("---")
+            st.caption(t("cohort_fit_caption"))
+            if st.button(t("cohort_fit_btn"), key="cohort_fit"):
+                bar = st.progress(0.0)
+                with st.spinner(t("cohort_fit_spinner")):
+                    st.session_state.cohort_fit_rows = fit_cohort(progress=lambda i, n: bar.progress(i / n))
+                bar.empty()
+            if st.session_state.get("cohort_fit_rows"):
+                fit_rows = st.session_state.cohort_fit_rows
+                st.success(t("cohort_fit_done", n=len(fit_rows)))
+                st.dataframe(fit_rows, use_container_width=True, height=260, hide_index=True)
                 st.download_button(
-                    t("dl_all_self"),
-                    data=to_csv_string(all_csv).encode("utf-8-sig"),
-                    file_name="igt_自己玩_全部.csv",
+                    t("dl_cohort_fit"),
+                    data=to_csv_string(fit_rows).encode("utf-8"),
+                    file_name="igt_自己玩_拟合参数.csv",
                     mime="text/csv",
-                    key="dl_self_all",
+                    key="dl_cohort_fit",
                 )
     with tab_others:
         sub_tabs = st.tabs(["Delta", "Q-learning", "ORL", "仪表盘"])
         mod_map = ["Delta", "Qlearning", "ORL", "仪表盘"]
         for idx, (mod_name, mod_key) in enumerate(zip(["Delta", "Q-learning", "ORL", "仪表盘"], mod_map)):
             with sub_tabs[idx]:
-                entries = get_all(mod_key)
-                if not entries:
+                grouped = get_all_grouped_by_user(mod_key)
+                if not grouped:
                     st.info(t("no_mod_data", mod=mod_name))
                 else:
-                    grouped = get_all_grouped_by_user(mod_key)
                     for user_id in sorted(grouped.keys()):
                         user_entries = grouped[user_id]
                         nickname = user_entries[0].get("昵称", "") if user_entries else ""
@@ -206,26 +244,26 @@ if is_logged_in() and is_admin() and st.session_state.get("viewing_backend"):
                                 n_trials = e.get("n_trials", 0)
                                 final_balance = e.get("final_balance", 0)
                                 st.caption(t("submit_n", n=i+1) + f" · {ts} · " + t("rounds_balance", rounds=n_trials, balance=final_balance))
-                            if user_entries and user_entries[0].get("path_rows") is not None:
-                                csv_rows = model_run_to_csv_rows(user_entries)
-                                st.download_button(
-                                    t("dl_mod_csv", uid=user_id),
-                                    data=to_csv_string(csv_rows).encode("utf-8-sig"),
-                                    file_name=f"igt_{mod_key}_{user_id}.csv",
-                                    mime="text/csv",
-                                    key=f"dl_{mod_key}_{user_id}",
-                                )
-                    if entries and entries[0].get("path_rows") is not None:
-                        all_csv = model_run_to_csv_rows(entries)
-                        st.download_button(
-                            t("dl_all_mod", mod=mod_name),
-                            data=to_csv_string(all_csv).encode("utf-8-sig"),
-                            file_name=f"igt_{mod_key}_全部.csv",
-                            mime="text/csv",
-                            key=f"dl_{mod_key}_all",
-                        )
+                            if user_entries and has_path_rows(user_entries[0]):
+                                lazy_download(mod_key, t("dl_mod_csv", uid=user_id), f"dl_{mod_key}_{user_id}", user_id)
+                    if has_path_rows(next(iter(grouped.values()))[0]):
+                        lazy_download(mod_key, t("dl_all_mod", mod=mod_name), f"dl_{mod_key}_all")
                     elif mod_key == "仪表盘":
                         st.caption(t("dashboard_no_path"))
+        st.markdown("---")
+        st.caption(t("replay_verify_caption"))
+        if st.button(t("replay_verify_btn"), key="replay_verify"):
+            with st.spinner(t("replay_verify_spinner")):
+                drift = verify_submissions(mod_map)
+            if drift:
+                st.error(t("replay_verify_drift", n=len(drift)))
+                st.dataframe(
+                    [{"模块": m, "学号": uid, "提交时间": ts, "路径": ", ".join(bad)} for m, uid, ts, bad in drift],
+                    use_container_width=True,
+                    hide_index=True,
+                )
+            else:
+                st.success(t("replay_verify_ok"))
     st.stop()
 
 st.title("🃏 " + t("app_title_full"))
@@ -1,10 +1,14 @@
 """
 全局牌堆配置：存储于 data/app_config.json。
 管理员在后台修改；开关关闭时仅管理员可改、所有人使用同一配置；开关打开时所有人可自行修改。
+进程内缓存：按文件 (mtime, size) 与本进程的保存次数校验，文件未变时不再读盘解析；
+缓存内容只读（牌堆为 MappingProxyType + 元组），可在所有会话间共享。管理员保存后所有会话下次读取即生效。
 """
 
 import json
 import os
+import threading
+from types import MappingProxyType
 from igt_env import IGTEnv
 
 DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
@@ -19,8 +23,20 @@ def _ensure_dir():
     os.makedirs(DATA_DIR, exist_ok=True)
 
 
-def load_config():
-    _ensure_dir()
+_cache_lock = threading.Lock()
+_cache = {"key": None, "allow_user_edit": False, "decks": None}
+_version = 0  # save_config 每次保存加一，同一进程内即使 mtime 精度不够也能失效
+
+
+def _file_key():
+    try:
+        st = os.stat(APP_CONFIG_FILE)
+    except OSError:
+        return (_version, None)
+    return (_version, st.st_mtime_ns, st.st_size)
+
+
+def _read_config():
     if not os.path.exists(APP_CONFIG_FILE):
         return {"allow_user_edit": False, "decks": _default_decks()}
     try:
@@ -38,7 +54,26 @@ def load_config():
     return data
 
 
+def _cached():
+    """返回 (allow_user_edit, 只读牌堆表)；文件未变时直接用缓存。"""
+    key = _file_key()
+    with _cache_lock:
+        if _cache["key"] != key:
+            data = _read_config()
+            _cache["allow_user_edit"] = bool(data["allow_user_edit"])
+            _cache["decks"] = MappingProxyType({k: tuple(v) for k, v in data["decks"].items()})
+            _cache["key"] = key
+        return _cache["allow_user_edit"], _cache["decks"]
+
+
+def load_config():
+    """完整配置的可修改副本（管理员表单用）。"""
+    allow, decks = _cached()
+    return {"allow_user_edit": allow, "decks": {k: list(v) for k, v in decks.items()}}
+
+
 def save_config(allow_user_edit: bool = None, decks: dict = None):
+    global _version
     data = load_config()
     if allow_user_edit is not None:
         data["allow_user_edit"] = allow_user_edit
@@ -47,14 +82,15 @@ def save_config(allow_user_edit: bool = None, decks: dict = None):
     _ensure_dir()
     with open(APP_CONFIG_FILE, "w", encoding="utf-8") as f:
         json.dump(data, f, ensure_ascii=False, indent=2)
+    with _cache_lock:
+        _version += 1
 
 
 def get_decks():
-    """当前全局牌堆配置（列表形式，与 IGTEnv 一致）。"""
-    c = load_config()
-    return {k: list(v) for k, v in c["decks"].items()}
+    """当前全局牌堆配置（只读映射，值为 (每次收益, 罚款概率, 罚款金额) 元组；需要修改时先 dict() 复制）。"""
+    return _cached()[1]
 
 
 def get_allow_user_edit():
     """是否允许所有用户自行修改牌堆。"""
-    return load_config().get("allow_user_edit", False)
+    return _cached()[0]
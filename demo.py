@@ -4,8 +4,9 @@
 学生在浏览器中手动选牌堆，观察余额与奖惩变化。
 """
 
+import numpy as np
 import streamlit as st
-from igt_env import IGTEnv
+from igt_env import IGTEnv, PlayStats
 
 st.set_page_config(page_title="爱荷华赌博任务", page_icon="🃏", layout="wide")
 if "igt_decks" not in st.session_state:
@@ -35,6 +36,10 @@ if "balance" not in st.session_state:
 
 env = st.session_state.env
 st.session_state.balance = env.balance
+# 计数、累计比例与余额序列逐轮增量维护；session 中没有或轮数对不上时按 history 重建
+stats = st.session_state.get("play_stats")
+if stats is None or stats.n != len(env.history):
+    stats = st.session_state.play_stats = PlayStats.from_history(env.history)
 
 # 标题区：全页宽（不放在任何 column 内）
 st.title("🃏 行为经济学实验：爱荷华赌博任务")
@@ -62,7 +67,8 @@ with game_col:
     for i, deck in enumerate(IGTEnv.DECK_NAMES):
         with [col1, col2, col3, col4][i]:
             if st.button(f"牌堆 {deck}", key=f"deck_{deck}"):
-                reward = env.step(deck)
+                env.step(deck)
+                stats.update(i, env.balance)
                 st.session_state.balance = env.balance
                 st.rerun()
 
@@ -77,37 +83,31 @@ with game_col:
         st.session_state.env = IGTEnv(decks=st.session_state.igt_decks)
         st.session_state.env.reset(initial_balance=2000)
         st.session_state.balance = 2000
+        st.session_state.play_stats = PlayStats()
         st.rerun()
 
     # 最近记录：放在固定高度的可滚动容器内，不无限延伸
     st.markdown("---")
     st.subheader("最近记录")
-    if env.history:
-        records = [
-            {"轮次": i, "选择": c, "收益": r, "余额": b}
-            for i, (c, r, b) in enumerate(env.history, 1)
-        ]
-        records.reverse()  # 最新在上
+    history = env.history
+    if history:
+        n = len(history)
+        records = {
+            "轮次": np.arange(n, 0, -1),
+            "选择": np.array(IGTEnv.DECK_NAMES)[history.choices[::-1]],  # 最新在上
+            "收益": history.rewards[::-1],
+            "余额": history.balances[::-1],
+        }
         st.dataframe(records, use_container_width=True, height=280, hide_index=True)
     else:
         st.caption("暂无记录，请选择牌堆开始。")
 
 with charts_col:
     st.subheader("📊 实时可视化")
-    if env.history:
-        n = len(env.history)
-        trials = list(range(1, n + 1))
-        balances = [2000] + [h[2] for h in env.history]  # 每步后的余额
+    if history:
+        balances = stats.balances  # 含初始余额的每步后余额
         # 选牌比例累积：到第 t 轮时各牌堆被选中的比例
-        counts = {d: 0 for d in IGTEnv.DECK_NAMES}
-        prop_a, prop_b, prop_c, prop_d = [], [], [], []
-        for choice, _, _ in env.history:
-            counts[choice] += 1
-            t = sum(counts.values())
-            prop_a.append(counts["A"] / t)
-            prop_b.append(counts["B"] / t)
-            prop_c.append(counts["C"] / t)
-            prop_d.append(counts["D"] / t)
+        prop_a, prop_b, prop_c, prop_d = stats.proportions.T
 
         chart_data_prop = {
             "A 比例": prop_a,
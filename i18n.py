@@ -37,6 +37,17 @@ TEXTS = {
         "deck_penalty_L": "牌堆 {k} 罚金金额（负数）",
         "btn_save_deck": "保存牌堆配置",
         "saved_deck": "已保存。关闭「允许用户自行修改」时，所有人将使用上述配置。",
+        "risk_title": "📐 当前配置的风险指标（解析计算，{n} 轮）",
+        "risk_caption": "按二项分布卷积精确计算，无需模拟。净收益 = 最终余额 - 2000。",
+        "risk_plan": "方案",
+        "risk_plan_deck": "只选牌堆 {k}",
+        "risk_plan_random": "四堆随机",
+        "risk_mean": "期望净收益",
+        "risk_std": "标准差",
+        "risk_q05": "5% 分位",
+        "risk_q50": "中位数",
+        "risk_q95": "95% 分位",
+        "risk_prob_loss": "亏损概率",
         "users_title": "👥 用户管理",
         "users_caption": "从提交数据中汇总的用户列表；可删除某学号的全部提交数据。",
         "no_users": "暂无用户数据（尚未有人提交）。",
@@ -51,6 +62,21 @@ TEXTS = {
         "rounds_balance": "{rounds} 轮 · 最终余额 ¥{balance}",
         "dl_user_csv": "下载该用户 CSV（学号 {uid}）",
         "dl_all_self": "📥 一键下载全部自己玩数据（CSV）",
+        "export_format": "导出格式",
+        "export_fmt_csv": "CSV",
+        "export_fmt_gzip": "CSV（gzip 压缩）",
+        "export_fmt_zip": "ZIP",
+        "btn_prepare_export": "准备下载：{label}",
+        "cohort_fit_caption": "对全部提交做 Delta / Q-learning / ORL 最大似然拟合（多进程并行，已拟合过的提交直接读缓存）。",
+        "cohort_fit_btn": "🧮 拟合全班参数",
+        "cohort_fit_spinner": "正在拟合…",
+        "cohort_fit_done": "已完成 {n} 条提交的拟合。",
+        "replay_verify_caption": "模型运行提交只存参数、种子与牌堆，查看或导出时重新模拟；可按校验和检查当前引擎能否复现。",
+        "replay_verify_btn": "校验可复现提交",
+        "replay_verify_spinner": "正在重新模拟并比对校验和…",
+        "replay_verify_ok": "全部可复现提交与当前引擎结果一致。",
+        "replay_verify_drift": "有 {n} 条提交与当前引擎的模拟结果不一致（引擎可能已改动）。",
+        "dl_cohort_fit": "📥 下载全班拟合参数（CSV）",
         "no_mod_data": "暂无 {mod} 模块提交数据。",
         "dl_mod_csv": "下载 CSV（学号 {uid}）",
         "dl_all_mod": "📥 一键下载全部 {mod} 数据",
@@ -87,6 +113,12 @@ TEXTS = {
         "deck_btn": "牌堆 {deck}",
         "last_choice": "上次选择 **牌堆 {deck}**，本次收益: **{sign}{reward}**",
         "btn_reset": "🔄 重置游戏（重新开始）",
+        "log_search": "搜索日志",
+        "log_page": "页码",
+        "log_matches": "匹配 {n} 条",
+        "live_model_title": "实时模型匹配",
+        "live_model_best": "目前你的选择最像 **{model}**（后验 {p:.0%}，已玩 {n} 轮）",
+        "live_model_caption": "每次选牌后在参数网格上在线更新三个模型的后验（均匀先验），轮数越多越可靠。",
         "viz_title": "📊 可视化与记录",
         "history_label": "选择历史",
         "bar_chart_caption": "选择牌堆柱状图（x 轴：A/B/C/D，y 轴：选择次数）",
@@ -114,6 +146,12 @@ TEXTS = {
         "report_style": "策略风格",
         "report_bias": "潜在偏差",
         "report_model": "模型匹配",
+        "fit_model": "模型",
+        "fit_loglik": "对数似然",
+        "fit_weight": "AIC 权重",
+        "fit_params": "最优参数",
+        "report_risk": "运气还是策略",
+        "report_risk_text": "按您实际的选牌次数，最终余额的期望为 **¥ {mean:.0f}**（标准差 {std:.0f}，90% 区间 ¥ {lo} ~ ¥ {hi}），低于初始 2000 的概率为 **{p_loss:.1%}**。您的实际余额 ¥ {actual} 位于该分布的第 {pct:.0f} 百分位。",
         "col_round": "轮次",
         "col_choice": "选择",
         "col_reward": "收益",
@@ -159,10 +197,20 @@ TEXTS = {
         "seed_short": "随机种子",
         "step_delay_dash_help": ">0 时可看到图表随轮次实时变化",
         "run_all": "▶ 一键运行三模型",
+        "crn_toggle": "公共随机数（三模型共用同一条结果带）",
+        "crn_help": "开启后，第 k 次从某牌堆抽牌的罚款结果对三个模型相同，选牌随机数也共用；曲线差异主要来自模型本身而不是运气。",
         "hint_delta": "👈 在左侧设置参数后点击「开始运行 Delta 规则」，即可在前端逐步看到选择路径与日志。",
         "hint_ql": "👈 在左侧设置参数后点击「开始运行 Q-learning」，即可在前端逐步看到选择路径与日志。",
         "hint_orl": "👈 在左侧设置参数后点击「开始运行 ORL」，可看到 V 值、Ef 值与频率感知图。",
         "hint_dash": "设置参数后点击「开始对比」，将同时运行三组模型并生成对比图。",
+        "pop_title": "👥 群体平均行为",
+        "pop_caption": "单条路径受运气影响很大：用上方参数把每个模型重复运行多次，批量模拟后看平均表现。",
+        "pop_replicates": "重复次数",
+        "pop_run": "▶ 运行群体模拟",
+        "pop_spinner": "正在批量模拟…",
+        "pop_mean_curve": "平均总收益（每个模型 {n} 次重复）",
+        "pop_band": "总收益 5% / 95% 分位",
+        "pop_prop": "全程牌组选择占比（A/B/C/D）",
     },
     "en": {
         "app_title": "Iowa Gambling Task · Lab",
@@ -195,6 +243,17 @@ TEXTS = {
         "deck_penalty_L": "Deck {k} penalty amount (negative)",
         "btn_save_deck": "Save deck config",
         "saved_deck": "Saved. When \"Allow user edit\" is off, everyone will use the above.",
+        "risk_title": "📐 Risk profile of this config (analytic, {n} rounds)",
+        "risk_caption": "Exact binomial convolution, no simulation. Net = final balance - 2000.",
+        "risk_plan": "Plan",
+        "risk_plan_deck": "Deck {k} only",
+        "risk_plan_random": "Uniform random",
+        "risk_mean": "Expected net",
+        "risk_std": "Std. dev.",
+        "risk_q05": "5% quantile",
+        "risk_q50": "Median",
+        "risk_q95": "95% quantile",
+        "risk_prob_loss": "P(loss)",
         "users_title": "👥 User management",
         "users_caption": "Users from submissions; you can delete all data for a user.",
         "no_users": "No users yet (no submissions).",
@@ -209,6 +268,21 @@ TEXTS = {
         "rounds_balance": "{rounds} rounds · balance ¥{balance}",
         "dl_user_csv": "Download CSV (ID {uid})",
         "dl_all_self": "📥 Download all self-play (CSV)",
+        "export_format": "Export format",
+        "export_fmt_csv": "CSV",
+        "export_fmt_gzip": "CSV (gzip)",
+        "export_fmt_zip": "ZIP",
+        "btn_prepare_export": "Prepare download: {label}",
+        "cohort_fit_caption": "Fit Delta / Q-learning / ORL to every submission by maximum likelihood (parallel; cached fits are reused).",
+        "cohort_fit_btn": "🧮 Fit whole class",
+        "cohort_fit_spinner": "Fitting…",
+        "cohort_fit_done": "Fitted {n} submissions.",
+        "replay_verify_caption": "Model-run submissions store only parameters, seed and decks and are re-simulated when viewed or exported; checksums show whether the current engine still reproduces them.",
+        "replay_verify_btn": "Verify reproducible submissions",
+        "replay_verify_spinner": "Re-simulating and comparing checksums…",
+        "replay_verify_ok": "All reproducible submissions match the current engine.",
+        "replay_verify_drift": "{n} submissions no longer match the current engine's simulation (the engine may have changed).",
+        "dl_cohort_fit": "📥 Download class fit parameters (CSV)",
         "no_mod_data": "No {mod} submissions yet.",
         "dl_mod_csv": "Download CSV (ID {uid})",
         "dl_all_mod": "📥 Download all {mod} data",
@@ -244,6 +318,12 @@ TEXTS = {
         "deck_btn": "Deck {deck}",
         "last_choice": "Last **deck {deck}**, reward: **{sign}{reward}**",
         "btn_reset": "🔄 Reset game",
+        "log_search": "Search log",
+        "log_page": "Page",
+        "log_matches": "{n} matching lines",
+        "live_model_title": "Live model match",
+        "live_model_best": "Your choices look most like **{model}** (posterior {p:.0%}, {n} rounds)",
+        "live_model_caption": "The posterior of each model over its parameter grid is updated online after every pick (uniform prior); more rounds make it more reliable.",
         "viz_title": "📊 Charts & history",
         "history_label": "Choice history",
         "bar_chart_caption": "Deck choice bar chart (A/B/C/D vs count)",
@@ -271,6 +351,12 @@ TEXTS = {
         "report_style": "Strategy style",
         "report_bias": "Potential bias",
         "report_model": "Model match",
+        "fit_model": "Model",
+        "fit_loglik": "Log-likelihood",
+        "fit_weight": "AIC weight",
+        "fit_params": "Best-fit parameters",
+        "report_risk": "Luck or strategy",
+        "report_risk_text": "Given your actual deck counts, the expected final balance is **¥ {mean:.0f}** (std {std:.0f}, 90% range ¥ {lo} – ¥ {hi}); the chance of ending below the initial 2000 is **{p_loss:.1%}**. Your actual balance ¥ {actual} sits at the {pct:.0f}th percentile.",
         "col_round": "Round",
         "col_choice": "Choice",
         "col_reward": "Reward",
@@ -314,10 +400,20 @@ TEXTS = {
         "seed_short": "Seed",
         "step_delay_dash_help": ">0 to watch charts update",
         "run_all": "▶ Run all three",
+        "crn_toggle": "Common random numbers (shared outcome tape)",
+        "crn_help": "When on, the k-th draw from each deck has the same penalty outcome for all three models and the choice random numbers are shared too, so the curves differ by model rather than by luck.",
         "hint_delta": "👈 Set parameters in the sidebar and click «Run Delta rule» to see the path and log.",
         "hint_ql": "👈 Set parameters in the sidebar and click «Run Q-learning» to see the path and log.",
         "hint_orl": "👈 Set parameters in the sidebar and click «Run ORL» to see V, Ef and frequency charts.",
         "hint_dash": "Set parameters and click «Run all three» to compare the three models.",
+        "pop_title": "👥 Population average",
+        "pop_caption": "A single path is mostly luck: repeat each model many times with the parameters above and compare the averages.",
+        "pop_replicates": "Replicates",
+        "pop_run": "▶ Run population",
+        "pop_spinner": "Simulating…",
+        "pop_mean_curve": "Mean total reward ({n} replicates per model)",
+        "pop_band": "Total reward 5% / 95% quantiles",
+        "pop_prop": "Overall deck choice share (A/B/C/D)",
     },
 }
 
@@ -5,14 +5,18 @@ IGT 策略分析：行为学指标、策略风格、计算建模推断。
 
 from collections import Counter
 
+from igt_fit import MODEL_LABELS, fit_all_models
+from igt_outcome import outcome_from_counts
+
 IGT_N_TRIALS = 100  # 标准 IGT 轮次
 BLOCK_SIZE = 20     # 每 Block 轮数
 
 
-def analyze_igt_history(history):
+def analyze_igt_history(history, decks=None, initial_balance=2000):
     """
     history: list of (choice, reward, balance_after)
-    Returns dict with: net_score, block_scores, strategy_styles, hints, summary.
+    decks: 本局使用的牌堆配置（缺省为默认配置），用于计算「按实际选牌次数」的解析结果分布。
+    Returns dict with: net_score, block_scores, strategy_styles, hints, summary, fit, risk.
     """
     if not history:
         return None
@@ -74,13 +78,25 @@ def analyze_igt_history(history):
     else:
         learning_desc = "学习趋势：随阶段推移有所改善。"
 
-    # 模型匹配（启发式：根据偏好简单对应）
-    if good > bad and counts.get("C", 0) + counts.get("D", 0) >= n * 0.6:
-        model_match = "您的操作路径与理性计算（Q-learning/Delta）风格更接近，表现出较强的理性计算特征。"
-    elif counts.get("B", 0) >= n * 0.3:
-        model_match = "您的操作路径与 ORL 模型（频率敏感）的拟合度较高，表现出对赢钱频率的敏感。"
+    # 模型匹配：逐轮最大似然拟合三种模型，按 AIC 权重选出最接近的一个
+    fit = fit_all_models(history)
+    best = fit["best"]
+    best_params = "，".join(f"{k}={v:.3g}" for k, v in fit["fits"][best]["params"].items())
+    model_match = (
+        f"最大似然拟合显示，您的操作路径与 {MODEL_LABELS[best]} 模型最接近"
+        f"（AIC 权重 {fit['weights'][best]:.0%}，最优参数：{best_params}）。"
+    )
+    if best == "orl":
+        model_match += "ORL 同时考虑金额与赢钱频率，说明您对「赢得频繁」较为敏感。"
     else:
-        model_match = "您的操作路径兼具探索与利用特征，与 Delta 规则或 Q-learning 的直觉/学习特征有一定匹配。"
+        model_match += "该模型只根据奖惩金额更新估值，不单独考虑赢钱频率。"
+
+    # 运气还是策略：固定本局选牌次数，最终余额的精确分布
+    dist = outcome_from_counts(decks, counts, initial_balance)
+    actual = history[-1][2]
+    risk = dist.summary()
+    risk["actual_balance"] = actual
+    risk["actual_percentile"] = dist.cdf(actual - initial_balance) * 100
 
     summary = {
         "net_score": net_score,
@@ -91,7 +107,9 @@ def analyze_igt_history(history):
         "strategy_styles": strategy_styles if strategy_styles else ["未明显归类为单一策略风格"],
         "hints": hints,
         "model_match": model_match,
+        "fit": fit,
         "counts": dict(counts),
         "n": n,
+        "risk": risk,
     }
     return summary
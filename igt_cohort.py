@@ -0,0 +1,156 @@
+"""
+全班批量拟合：读取 submission_store 中全部「自己玩」提交，用进程池并行拟合 Delta / Q-learning / ORL，
+结果按 (history, decks, 拟合配置) 的哈希缓存在 data/fit_cache.json，只重拟新增或变化的提交。
+- 后台：app.py「自己玩」页签中的「拟合全班参数」按钮
+- 命令行：python igt_cohort.py --out cohort_fit.csv
+"""
+
+import hashlib
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+from igt_fit import FIT_SPACE, GRID_POINTS, MODEL_LABELS, fit_all_models_batch
+from igt_trajectory import history_from_entry
+from submission_store import DATA_DIR, get_all, to_csv_string
+
+try:
+    import fcntl
+except ImportError:  # Windows：不加进程间锁
+    fcntl = None
+
+FIT_CACHE_FILE = os.path.join(DATA_DIR, "fit_cache.json")
+MODELS = ("delta", "qlearning", "orl")
+CHUNK_SIZE = 16  # 每个 worker 任务一次批量拟合的提交数
+
+# 拟合配置变化（参数空间、网格密度）时缓存自动失效
+FIT_VERSION = hashlib.sha1(json.dumps([FIT_SPACE, GRID_POINTS], sort_keys=True).encode("utf-8")).hexdigest()[:12]
+
+
+def history_key(history, decks=None):
+    """提交的缓存键：history 与牌堆配置的哈希（含拟合配置版本）。"""
+    payload = json.dumps(
+        {"history": [list(h) for h in history], "decks": decks, "fit": FIT_VERSION},
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def _load_cache():
+    if not os.path.exists(FIT_CACHE_FILE):
+        return {}
+    try:
+        with open(FIT_CACHE_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+
+def _save_cache(cache):
+    """
+    把 cache 合并进磁盘上的缓存并原子写回，返回合并后的缓存。
+    在旁路锁文件上加排他锁后重读、合并、写唯一临时文件再替换，多个拟合（多个后台会话、命令行）同时保存互不覆盖。
+    """
+    cache_dir = os.path.dirname(FIT_CACHE_FILE)
+    os.makedirs(cache_dir, exist_ok=True)
+    with open(FIT_CACHE_FILE + ".lock", "ab") as lock:
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        merged = {**_load_cache(), **cache}
+        fd, tmp = tempfile.mkstemp(dir=cache_dir, prefix=".fit_cache.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(merged, f, ensure_ascii=False)
+            os.replace(tmp, FIT_CACHE_FILE)
+        except BaseException:
+            os.remove(tmp)
+            raise
+    return merged
+
+
+def _flatten(res):
+    """fit_all_models 结果 -> 可 JSON 序列化的扁平结果。"""
+    out = {"best": res["best"]}
+    for m in MODELS:
+        f = res["fits"][m]
+        out[m] = {
+            "params": f["params"],
+            "log_lik": f["log_lik"],
+            "aic": f["aic"],
+            "bic": f["bic"],
+            "weight": res["weights"][m],
+        }
+    return out
+
+
+def _fit_chunk(histories):
+    """worker：一块 history 同时批量拟合（同长度的提交共享一次网格回放）。"""
+    return [_flatten(res) for res in fit_all_models_batch(histories, MODELS)]
+
+
+def fit_cohort(workers=None, progress=None, chunk_size=CHUNK_SIZE):
+    """
+    拟合全部「自己玩」提交（命中缓存的跳过），返回每条提交一行的参数表（行字典列表）。
+    未缓存的提交按 chunk_size 分块分发到进程池；progress(done, total) 为可选的进度回调。
+    """
+    entries = [e for e in get_all("自己玩") if e.get("history") or e.get("history_z")]
+    histories = [history_from_entry(e) for e in entries]
+    keys = [history_key(h, e.get("decks")) for h, e in zip(histories, entries)]
+    cache = _load_cache()
+    todo = {}
+    for k, h in zip(keys, histories):
+        if k not in cache and k not in todo:
+            todo[k] = h
+    if todo:
+        todo_keys = list(todo)
+        chunks = [todo_keys[i:i + chunk_size] for i in range(0, len(todo_keys), chunk_size)]
+        ctx = multiprocessing.get_context("spawn")  # Streamlit 进程是多线程的，避免 fork
+        done = 0
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+            results = pool.map(_fit_chunk, [[todo[k] for k in ks] for ks in chunks])
+            for ks, res in zip(chunks, results):
+                cache.update(zip(ks, res))
+                done += len(ks)
+                if progress:
+                    progress(done, len(todo))
+        cache = _save_cache(cache)
+    return [_cohort_row(e, h, cache[k]) for k, e, h in zip(keys, entries, histories)]
+
+
+def _cohort_row(entry, history, res):
+    row = {
+        "学号": entry.get("学号", ""),
+        "昵称": entry.get("昵称", ""),
+        "提交时间": entry.get("时间", ""),
+        "轮数": len(history),
+        "最终余额": history[-1][2] if history else 0,
+        "最接近模型": MODEL_LABELS[res["best"]],
+    }
+    for m in MODELS:
+        r = res[m]
+        label = MODEL_LABELS[m]
+        row[f"{label} 权重"] = round(r["weight"], 4)
+        row[f"{label} AIC"] = round(r["aic"], 2)
+        for p, v in r["params"].items():
+            row[f"{label} {p}"] = round(v, 4)
+    return row
+
+
+def main(argv=None):
+    import argparse
+    p = argparse.ArgumentParser(description="全班「自己玩」数据批量拟合 Delta / Q-learning / ORL")
+    p.add_argument("--workers", "-j", type=int, default=None, help="进程数（默认 CPU 核数）")
+    p.add_argument("--out", "-o", default="cohort_fit.csv", help="输出 CSV 路径")
+    args = p.parse_args(argv)
+    rows = fit_cohort(args.workers, progress=lambda i, n: print(f"拟合 {i}/{n}"))
+    with open(args.out, "w", encoding="utf-8", newline="") as f:
+        f.write(to_csv_string(rows))
+    print(f"共 {len(rows)} 条提交，结果已写入 {args.out}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
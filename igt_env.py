@@ -5,42 +5,284 @@
 
 import numpy as np
 
+DECK_NAMES = ('A', 'B', 'C', 'D')
+
+_DECK_INDEX = {k: i for i, k in enumerate(DECK_NAMES)}
+
+DEFAULT_DECKS = {
+    'A': (100, 0.5, -250),
+    'B': (100, 0.1, -1250),
+    'C': (50, 0.5, -50),
+    'D': (50, 0.1, -25),
+}
+
+
+def make_rng(seed=None, rng=None):
+    """
+    返回独立的 numpy.random.Generator，不触碰全局 np.random 状态。
+    rng 优先：可传 Generator（原样返回）或 SeedSequence；否则由 seed（int / None）新建。
+    """
+    return np.random.default_rng(rng if rng is not None else seed)
+
+
+def spawn_rngs(seed, n):
+    """
+    用 SeedSequence 从同一个种子派生 n 条互不相关的子随机流（并行会话、进程池 worker 各取一条）。
+    seed 可为 int / None / SeedSequence / Generator。
+    """
+    if isinstance(seed, np.random.Generator):
+        seed = np.random.SeedSequence(seed.integers(2**63, size=4).tolist())
+    elif not isinstance(seed, np.random.SeedSequence):
+        seed = np.random.SeedSequence(seed)
+    return [np.random.default_rng(s) for s in seed.spawn(n)]
+
+
+def seed_run(env, seed=None, rng=None):
+    """
+    为一次智能体运行准备随机流，返回智能体自己的 Generator。
+    - 显式传入 rng：智能体直接使用，env 保持自身随机流；
+    - 传入 seed：派生两条子流，分别重设 env 与交给智能体，保证同一 seed 结果可复现；
+    - 都为 None：env 不变，智能体使用新的随机流。
+    """
+    if rng is not None:
+        return make_rng(rng=rng)
+    if seed is None:
+        return make_rng()
+    env_rng, agent_rng = spawn_rngs(seed, 2)
+    env.reseed(rng=env_rng)
+    return agent_rng
+
+
+def normalize_decks(decks=None):
+    """把自定义 decks 规范为 {牌堆: (收益 int, 罚款概率 float, 罚款金额 int)}，缺失的牌堆用默认值补齐。"""
+    if decks is None:
+        return dict(DEFAULT_DECKS)
+    table = {k: (int(w), float(p), int(l)) for k, (w, p, l) in decks.items() if k in DECK_NAMES}
+    for k in DECK_NAMES:
+        if k not in table:
+            table[k] = DEFAULT_DECKS[k]
+    return table
+
+
+def deck_table(decks=None):
+    """牌堆参数表（数组形式）：返回 (wins, p_loss, losses)，按 DECK_NAMES 顺序，供向量化计算使用。"""
+    table = normalize_decks(decks)
+    wins = np.array([table[k][0] for k in DECK_NAMES], dtype=np.int64)
+    p_loss = np.array([table[k][1] for k in DECK_NAMES], dtype=float)
+    losses = np.array([table[k][2] for k in DECK_NAMES], dtype=np.int64)
+    return wins, p_loss, losses
+
+
+def deck_index(choices):
+    """把牌堆字母（'A'..'D' 或其数组）转换为整数下标 0..3；已是整数时原样返回数组。"""
+    arr = np.asarray(choices)
+    if arr.dtype.kind in ('U', 'S', 'O'):
+        names = np.array(DECK_NAMES)  # 已按字母序排列，可直接二分查找
+        arr = arr.astype(str)
+        idx = np.searchsorted(names, arr).clip(0, len(DECK_NAMES) - 1)
+        bad = names[idx] != arr
+        if np.any(bad):
+            raise ValueError(f"无效牌堆: {arr[bad].flat[0]}，应为 A/B/C/D")
+        return idx.astype(np.int64)
+    return arr.astype(np.int64, copy=False)
+
+
+class OutcomeTape:
+    """
+    公共随机数（CRN）结果带：每个牌堆一条预先抽好的均匀数序列，第 k 次从牌堆 d 抽牌用第 k 个数
+    （u < 罚款概率即罚款）。多个环境共用同一条带时，「第 k 次抽 B」的结果对所有智能体相同，
+    模型之间的差异不再被各自消耗随机数的方式掩盖。
+    n_tapes > 1 时有多条互相独立的带（批量环境中第 i 个会话用第 i % n_tapes 条）。
+    序列按需翻倍扩展，按列顺序抽取，内容只取决于种子，与扩展时机无关。
+    """
+
+    def __init__(self, n_tapes=1, seed=None, rng=None, block=128):
+        if n_tapes < 1:
+            raise ValueError(f"n_tapes 必须为正整数: {n_tapes}")
+        self.n_tapes = int(n_tapes)
+        self._block = int(block)
+        self._rngs = spawn_rngs(rng if rng is not None else seed, len(DECK_NAMES))  # 每个牌堆一条子流
+        self._u = [np.empty((self.n_tapes, 0)) for _ in DECK_NAMES]
+
+    def _ensure(self, deck, length):
+        cur = self._u[deck].shape[1]
+        if length <= cur:
+            return
+        new = max(int(length), 2 * cur, self._block)
+        extra = self._rngs[deck].random((new - cur, self.n_tapes)).T  # 按列抽取，前缀与扩展方式无关
+        self._u[deck] = np.concatenate((self._u[deck], extra), axis=1)
+
+    def draw(self, deck, k, tape=0):
+        """第 tape 条带上牌堆 deck（下标）的第 k 个均匀数。"""
+        self._ensure(deck, k + 1)
+        return float(self._u[deck][tape, k])
+
+    def lookup(self, decks, ks, tapes):
+        """向量化版 draw：decks / ks / tapes 为等长整数数组，返回对应的均匀数数组。"""
+        out = np.empty(len(decks))
+        for d in range(len(DECK_NAMES)):
+            m = decks == d
+            if m.any():
+                k = ks[m]
+                self._ensure(d, int(k.max()) + 1)
+                out[m] = self._u[d][tapes[m], k]
+        return out
+
+
+HISTORY_DTYPE = np.dtype([('choice', np.int8), ('reward', np.int32), ('balance', np.int64)])
+
+
+class HistoryBuffer:
+    """
+    只追加的结构化历史缓冲：预分配数组、容量不足时翻倍扩容。
+    每行 (choice 下标 int8, reward int32, balance_after int64)，共 13 字节。
+    choices / rewards / balances / view(n) 返回已写入部分的只读视图（零拷贝）；
+    按下标或迭代访问时给出旧格式元组 (牌堆字母, 收益, 余额)，to_list() 按需生成旧式列表。
+    """
+
+    def __init__(self, capacity=128):
+        self._data = np.empty(max(int(capacity), 1), dtype=HISTORY_DTYPE)
+        self._n = 0
+
+    def append(self, choice, reward, balance):
+        """追加一行；choice 为牌堆下标 0..3。"""
+        if self._n == len(self._data):
+            grown = np.empty(2 * len(self._data), dtype=HISTORY_DTYPE)
+            grown[:self._n] = self._data
+            self._data = grown
+        self._data[self._n] = (choice, reward, balance)
+        self._n += 1
+
+    def view(self, n=None):
+        """前 n 行（缺省为全部）的只读结构化视图。只追加不改写，前缀视图在之后的 step 中保持不变。"""
+        n = self._n if n is None else max(0, min(int(n), self._n))
+        v = self._data[:n]
+        v.flags.writeable = False
+        return v
+
+    @property
+    def choices(self):
+        return self.view()['choice']
+
+    @property
+    def rewards(self):
+        return self.view()['reward']
+
+    @property
+    def balances(self):
+        return self.view()['balance']
+
+    def _row(self, i):
+        c, r, b = self._data[i].tolist()
+        return DECK_NAMES[c], r, b
+
+    def __len__(self):
+        return self._n
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self._row(j) for j in range(*i.indices(self._n))]
+        if i < 0:
+            i += self._n
+        if not 0 <= i < self._n:
+            raise IndexError("history index out of range")
+        return self._row(i)
+
+    def __iter__(self):
+        names = DECK_NAMES
+        for c, r, b in self.view().tolist():
+            yield names[c], r, b
+
+    def to_list(self):
+        """旧格式：[(choice, reward, balance_after), ...]（新列表，可直接 JSON 序列化）。"""
+        return list(self)
+
+
+class PlayStats:
+    """
+    逐轮增量维护的汇总（自己玩页面存在 session 中）：每次 update 为 O(1)（摊还），图表直接读视图。
+    counts: 各牌堆累计次数；proportions: (n, 4) 到第 t 轮时的累计选牌比例；
+    balances: (n + 1,) 含初始余额的余额序列。数组预分配、容量不足时翻倍扩容。
+    """
+
+    def __init__(self, initial_balance=2000, capacity=128):
+        cap = max(int(capacity), 1)
+        self.n = 0
+        self.counts = np.zeros(len(DECK_NAMES), dtype=np.int64)
+        self._props = np.empty((cap, len(DECK_NAMES)))
+        self._balances = np.empty(cap + 1, dtype=np.int64)
+        self._balances[0] = initial_balance
+
+    @classmethod
+    def from_history(cls, history, initial_balance=2000):
+        """从已有 HistoryBuffer 重建（页面刷新后 session 中没有汇总时用）。"""
+        stats = cls(initial_balance, capacity=len(history) or 1)
+        n = len(history)
+        if n:
+            cum = np.cumsum(np.eye(len(DECK_NAMES), dtype=np.int64)[history.choices], axis=0)
+            stats._props[:n] = cum / np.arange(1, n + 1)[:, None]
+            stats._balances[1:n + 1] = history.balances
+            stats.counts = cum[-1].copy()
+            stats.n = n
+        return stats
+
+    def update(self, choice, balance):
+        """加入一轮：choice 为牌堆下标 0..3，balance 为本轮后的余额。"""
+        if self.n == len(self._props):
+            self._props = np.concatenate((self._props, np.empty_like(self._props)))
+            self._balances = np.concatenate((self._balances, np.empty(len(self._balances) - 1, dtype=np.int64)))
+        self.counts[choice] += 1
+        self.n += 1
+        self._props[self.n - 1] = self.counts / self.n
+        self._balances[self.n] = balance
+
+    @property
+    def proportions(self):
+        v = self._props[:self.n]
+        v.flags.writeable = False
+        return v
+
+    @property
+    def balances(self):
+        v = self._balances[:self.n + 1]
+        v.flags.writeable = False
+        return v
+
 
 class IGTEnv:
     """
     IGT 规则引擎：无 UI，仅负责逻辑。
     牌堆 A/B 长期不利，C/D 长期有利。支持传入自定义 decks 覆盖默认。
+    传入 tape（OutcomeTape）时，罚款由结果带上各牌堆的第 k 个数决定（公共随机数），不再消耗 rng。
     """
 
-    DECK_NAMES = ('A', 'B', 'C', 'D')
+    DECK_NAMES = DECK_NAMES
 
-    DEFAULT_DECKS = {
-        'A': (100, 0.5, -250),
-        'B': (100, 0.1, -1250),
-        'C': (50, 0.5, -50),
-        'D': (50, 0.1, -25),
-    }
+    DEFAULT_DECKS = DEFAULT_DECKS
 
-    def __init__(self, seed=None, decks=None):
-        if seed is not None:
-            np.random.seed(seed)
+    def __init__(self, seed=None, decks=None, rng=None, tape=None, tape_index=0, keep_history=True):
+        # 每个实例持有自己的 Generator，多会话并发（Streamlit 多线程）互不干扰
+        self._rng = make_rng(seed, rng)
         # 每个牌堆: (每次收益, 罚款概率, 罚款金额)
-        if decks is not None:
-            self.decks = {k: (int(w), float(p), int(l)) for k, (w, p, l) in decks.items() if k in self.DECK_NAMES}
-            for k in self.DECK_NAMES:
-                if k not in self.decks:
-                    self.decks[k] = self.DEFAULT_DECKS[k]
-        else:
-            self.decks = dict(self.DEFAULT_DECKS)
+        self.decks = normalize_decks(decks)
         self._balance = 0
-        self._history = []  # [(choice, reward, balance_after), ...]
+        self._history = HistoryBuffer()  # 每行 (choice 下标, reward, balance_after)
+        self.keep_history = keep_history  # False 时不记录历史（超长流式运行，内存与轮数无关）
+        self.tape = tape
+        self.tape_index = int(tape_index)
+        self._draws = [0] * len(DECK_NAMES)  # 各牌堆已抽次数（结果带游标）
 
     def reset(self, initial_balance=2000):
-        """重置环境与余额（算法训练时可用）。"""
+        """重置环境与余额（算法训练时可用）；使用结果带时游标回到开头。"""
         self._balance = initial_balance
-        self._history = []
+        self._history = HistoryBuffer()
+        self._draws = [0] * len(DECK_NAMES)
         return self._balance
 
+    def reseed(self, seed=None, rng=None):
+        """替换本环境的随机流（不影响余额与历史）。"""
+        self._rng = make_rng(seed, rng)
+
     def step(self, choice):
         """
         执行一次选择，返回本次收益。
@@ -50,19 +292,35 @@ class IGTEnv:
         if choice not in self.decks:
             raise ValueError(f"无效牌堆: {choice}，应为 A/B/C/D")
         win, p_loss, loss_val = self.decks[choice]
-        loss = loss_val if np.random.random() < p_loss else 0
+        i = _DECK_INDEX[choice]
+        if self.tape is None:
+            u = self._rng.random()
+        else:
+            u = self.tape.draw(i, self._draws[i], self.tape_index)
+            self._draws[i] += 1
+        loss = loss_val if u < p_loss else 0
         reward = win + loss  # loss 为 0 或负数
         self._balance += reward
-        self._history.append((choice, reward, self._balance))
+        if self.keep_history:
+            self._history.append(i, reward, self._balance)
         return reward
 
     @property
     def balance(self):
         return self._balance
 
+    @property
+    def rng(self):
+        return self._rng
+
     @property
     def history(self):
-        return self._history.copy()
+        """历史缓冲（零拷贝）：可按下标/迭代取 (choice, reward, balance_after)，或用 .choices/.rewards/.balances 取只读数组。"""
+        return self._history
+
+    def history_list(self):
+        """旧格式历史：[(choice, reward, balance_after), ...] 的新列表（提交、JSON 序列化用）。"""
+        return self._history.to_list()
 
     def expected_reward(self, choice):
         """返回某牌堆的期望收益（用于分析与教学）。"""
@@ -70,3 +328,84 @@ class IGTEnv:
             raise ValueError(f"无效牌堆: {choice}")
         win, p_loss, loss_val = self.decks[choice]
         return win + p_loss * loss_val
+
+
+class IGTBatchEnv:
+    """
+    向量化 IGT：同时持有 N 个独立会话，余额与牌堆参数均为 NumPy 数组。
+    step(choices) 一次处理 N 个选择、只做一次向量化随机抽样；奖惩规则与 IGTEnv 完全一致。
+    传入 tape（OutcomeTape）时，第 i 个会话按第 i % n_tapes 条结果带决定罚款（公共随机数）。
+    """
+
+    DECK_NAMES = DECK_NAMES
+
+    DEFAULT_DECKS = DEFAULT_DECKS
+
+    def __init__(self, n_envs, seed=None, decks=None, rng=None, tape=None):
+        if n_envs < 1:
+            raise ValueError(f"n_envs 必须为正整数: {n_envs}")
+        self.n_envs = int(n_envs)
+        self.decks = normalize_decks(decks)
+        self.wins, self.p_loss, self.losses = deck_table(self.decks)
+        self._rng = make_rng(seed, rng)
+        self.tape = tape
+        self._rows = np.arange(self.n_envs)
+        self._tape_rows = self._rows % tape.n_tapes if tape is not None else None
+        self._balances = np.zeros(self.n_envs, dtype=np.int64)
+        self._draws = np.zeros((self.n_envs, len(DECK_NAMES)), dtype=np.int64)
+        self._n_steps = 0
+
+    def reset(self, initial_balance=2000):
+        """重置全部会话；initial_balance 可为标量或长度为 N 的数组。"""
+        self._balances = np.broadcast_to(np.asarray(initial_balance, dtype=np.int64), (self.n_envs,)).copy()
+        self._draws[:] = 0
+        self._n_steps = 0
+        return self.balances
+
+    def reseed(self, seed=None, rng=None):
+        """替换随机流（不影响余额）。"""
+        self._rng = make_rng(seed, rng)
+
+    def step(self, choices, u=None):
+        """
+        N 个会话各执行一次选择，返回长度为 N 的收益数组 (int64)。
+        choices: 长度为 N 的牌堆下标 0..3（或 'A'..'D' 字母数组）
+        u: 可选，长度为 N 的预先抽好的均匀数（u < 罚款概率即罚款）；缺省时取结果带或本环境的随机流
+        """
+        idx = deck_index(choices)
+        if idx.shape != (self.n_envs,):
+            raise ValueError(f"choices 形状应为 ({self.n_envs},)，实际为 {idx.shape}")
+        if idx.size and (idx.min() < 0 or idx.max() >= len(DECK_NAMES)):
+            raise ValueError("无效牌堆下标，应为 0..3（A/B/C/D）")
+        if u is None and self.tape is not None:
+            u = self.tape.lookup(idx, self._draws[self._rows, idx], self._tape_rows)
+            self._draws[self._rows, idx] += 1
+        elif u is None:
+            u = self._rng.random(self.n_envs)
+        hit = u < self.p_loss[idx]
+        rewards = self.wins[idx] + np.where(hit, self.losses[idx], 0)
+        self._balances += rewards
+        self._n_steps += 1
+        return rewards
+
+    @property
+    def balances(self):
+        """当前 N 个余额（只读视图）。"""
+        view = self._balances.view()
+        view.flags.writeable = False
+        return view
+
+    @property
+    def rng(self):
+        return self._rng
+
+    @property
+    def n_steps(self):
+        return self._n_steps
+
+    def expected_reward(self, choice):
+        """返回某牌堆的期望收益（可传字母或下标，也可传数组）。"""
+        idx = deck_index(choice)
+        if np.any((idx < 0) | (idx >= len(DECK_NAMES))):
+            raise ValueError(f"无效牌堆: {choice}")
+        return self.wins[idx] + self.p_loss[idx] * self.losses[idx]
@@ -0,0 +1,157 @@
+"""
+逐步记录的流式导出：从 *_steps 生成器取 StepRecord，按固定大小的块写盘，内存与总轮数无关。
+- CSV：首行为 "# " + JSON 元数据（model、params、seed、decks 等），第二行为列名，之后逐块追加。
+- NPY：结构化数组 .npy，逐块追加写入文件末尾，每块写完都改写头部的行数（文件随时可用
+  np.load(path, mmap_mode="r") 读取）；元数据写在同名 .json（与 igt_sweep 的结果表一致）。
+用法见 run_delta.py / run_qlearning.py / run_orl.py 的 --auto --out。
+"""
+
+import json
+import os
+import struct
+
+import numpy as np
+
+from igt_env import DECK_NAMES
+
+# 每个模型导出的内部值：数组按牌堆展开成 <名>_A..<名>_D 列
+STATE_FIELDS = {"delta": ("V",), "qlearning": ("Q", "explored"), "orl": ("V", "Ef")}
+DEFAULT_CHUNK = 65536
+
+
+def record_dtype(model):
+    """导出用的结构化 dtype：t, choice, reward, balance + 模型内部值。"""
+    if model not in STATE_FIELDS:
+        raise ValueError(f"未知模型: {model}，应为 {'/'.join(STATE_FIELDS)}")
+    fields = [("t", np.int64), ("choice", np.int8), ("reward", np.int32), ("balance", np.int64)]
+    for key in STATE_FIELDS[model]:
+        if key == "explored":
+            fields.append((key, np.bool_))
+        else:
+            fields += [(f"{key}_{d}", np.float64) for d in DECK_NAMES]
+    return np.dtype(fields)
+
+
+class _ChunkWriter:
+    """按块缓冲 StepRecord，缓冲满时交给 _flush 写盘。支持 with 语句。"""
+
+    def __init__(self, path, model, meta=None, chunk_size=DEFAULT_CHUNK):
+        self.path = path
+        self.model = model
+        self.dtype = record_dtype(model)
+        self.meta = {"model": model, **(meta or {}), "columns": list(self.dtype.names)}
+        self._buf = np.empty(max(int(chunk_size), 1), dtype=self.dtype)
+        self._n = 0
+        self.n_records = 0
+        self._keys = STATE_FIELDS[model]
+
+    def write(self, rec):
+        """追加一条 StepRecord。"""
+        row = [rec.t, rec.choice, rec.reward, rec.balance]
+        for key in self._keys:
+            v = rec.state[key]
+            if key == "explored":
+                row.append(v)
+            else:
+                row.extend(v.tolist())
+        self._buf[self._n] = tuple(row)
+        self._n += 1
+        if self._n == len(self._buf):
+            self.flush()
+
+    def write_all(self, records):
+        """逐条写入一个记录迭代器（如 *_steps 生成器），返回写入条数。"""
+        for rec in records:
+            self.write(rec)
+        return self.n_records + self._n
+
+    def flush(self):
+        if self._n:
+            self._flush(self._buf[:self._n])
+            self.n_records += self._n
+            self._n = 0
+
+    def close(self):
+        self.flush()
+        self._close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+class CSVTrajectoryWriter(_ChunkWriter):
+    """CSV：首行 "# {元数据 JSON}"，第二行列名。"""
+
+    def __init__(self, path, model, meta=None, chunk_size=DEFAULT_CHUNK):
+        super().__init__(path, model, meta, chunk_size)
+        self._fmt = ["%.6g" if self.dtype[k].kind == "f" else "%d" for k in self.dtype.names]
+        self._f = open(path, "w", encoding="utf-8", newline="")
+        self._f.write("# " + json.dumps(self.meta, ensure_ascii=False) + "\n")
+        self._f.write(",".join(self.dtype.names) + "\n")
+
+    def _flush(self, chunk):
+        np.savetxt(self._f, chunk, fmt=self._fmt, delimiter=",")
+
+    def _close(self):
+        self._f.close()
+
+
+class NpyTrajectoryWriter(_ChunkWriter):
+    """
+    追加写入的 .npy：头部预留固定长度，每块写完后原地改写行数；元数据写在同名 .json。
+    """
+
+    HEADER_LEN = 512  # 含 magic 的头部总长（64 字节对齐），足够容纳最长的 dtype 描述
+
+    def __init__(self, path, model, meta=None, chunk_size=DEFAULT_CHUNK):
+        super().__init__(path, model, meta, chunk_size)
+        self._f = open(path, "wb")
+        self._write_header(0)
+        self._write_meta()
+
+    def _write_header(self, n):
+        d = "{'descr': %r, 'fortran_order': False, 'shape': (%d,), }" % (
+            np.lib.format.dtype_to_descr(self.dtype), n,
+        )
+        prefix = np.lib.format.magic(1, 0)
+        body_len = self.HEADER_LEN - len(prefix) - 2
+        body = d.ljust(body_len - 1) + "\n"
+        if len(body) != body_len:
+            raise ValueError("dtype 描述过长，无法写入 .npy 头部")
+        self._f.seek(0)
+        self._f.write(prefix + struct.pack("<H", body_len) + body.encode("latin1"))
+
+    def _write_meta(self):
+        with open(os.path.splitext(self.path)[0] + ".json", "w", encoding="utf-8") as f:
+            json.dump({**self.meta, "n_records": self.n_records}, f, ensure_ascii=False, indent=2)
+
+    def _flush(self, chunk):
+        self._f.seek(0, os.SEEK_END)
+        self._f.write(chunk.tobytes())
+        self._write_header(self.n_records + len(chunk))
+        self._f.flush()
+
+    def _close(self):
+        self._f.close()
+        self._write_meta()
+
+
+def open_writer(path, model, meta=None, chunk_size=DEFAULT_CHUNK):
+    """按扩展名选择导出格式（.csv / .npy）。"""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".csv":
+        return CSVTrajectoryWriter(path, model, meta, chunk_size)
+    if ext == ".npy":
+        return NpyTrajectoryWriter(path, model, meta, chunk_size)
+    raise ValueError(f"不支持的导出格式: {path}（应为 .csv 或 .npy）")
+
+
+def read_csv_meta(path):
+    """读取流式 CSV 首行的元数据。"""
+    with open(path, "r", encoding="utf-8") as f:
+        first = f.readline()
+    return json.loads(first[2:]) if first.startswith("# ") else {}
@@ -0,0 +1,243 @@
+"""
+最大似然拟合：把一段 history（choice, reward, balance_after）逐轮代入 Delta / Q-learning / ORL 的更新规则，
+计算选择序列的对数似然，先在参数网格上整体批量评估，再在最优点附近做批量局部细化。
+输出各模型最优参数、对数似然、AIC / BIC 与 AIC 权重，供分析报告替代启发式的模型匹配。
+"""
+
+from itertools import product
+
+import numpy as np
+
+from igt_env import DECK_NAMES, deck_index
+from igt_kernels import MODEL_PARAMS, BatchAgents
+
+MODEL_LABELS = {"delta": "Delta", "qlearning": "Q-learning", "orl": "ORL"}
+
+# 拟合参数空间：(下界, 上界, 刻度)。temp 跨越多个数量级，用对数刻度。
+FIT_SPACE = {
+    "delta": {
+        "alpha": (0.01, 1.0, "linear"),
+        "temp": (0.1, 1000.0, "log"),
+    },
+    "qlearning": {
+        "alpha": (0.01, 1.0, "linear"),
+        "epsilon": (0.01, 1.0, "linear"),
+        "gamma": (0.0, 0.99, "linear"),
+    },
+    "orl": {
+        "alpha_v": (0.01, 1.0, "linear"),
+        "alpha_f": (0.01, 1.0, "linear"),
+        "W_v": (0.0, 1.0, "linear"),
+        "W_f": (0.0, 1.0, "linear"),
+        "temp": (0.1, 1000.0, "log"),
+    },
+}
+
+# 粗网格每个参数的点数（ORL 参数多，每维少取几个点）
+GRID_POINTS = {"delta": 25, "qlearning": 12, "orl": 6}
+
+_LOG_P_FLOOR = np.log(1e-10)  # 对数概率下限，避免 ε=0 等情形出现 log(0)
+
+
+def history_arrays(history):
+    """history -> (choices 下标数组, rewards 数组)；支持 IGTEnv.history 缓冲或 (choice, reward, balance) 列表。"""
+    if hasattr(history, "choices") and hasattr(history, "rewards"):
+        return np.asarray(history.choices, dtype=np.int64), np.asarray(history.rewards, dtype=float)
+    choices = deck_index([h[0] for h in history]) if len(history) else np.zeros(0, dtype=np.int64)
+    rewards = np.array([h[1] for h in history], dtype=float)
+    return choices, rewards
+
+
+def log_likelihood(model, choices, rewards, params):
+    """
+    批量对数似然：params 为 {参数名: 长度 M 的数组}（缺省取默认值），返回长度 M 的 log L。
+    choices / rewards 形状为 (T,)（M 组参数共用一段 history）或 (T, M)（每个智能体各自的 history）；
+    M 组参数同时逐轮回放，整段 history 只遍历一次。
+    """
+    n = len(next(iter(params.values()))) if params else 1
+    agents = BatchAgents(model, n, params)
+    ll = np.zeros(n)
+    for c, r in zip(choices, rewards):
+        c = np.broadcast_to(c, (n,))
+        ll += np.maximum(agents.log_prob(c), _LOG_P_FLOOR)
+        agents.update(c, np.broadcast_to(r, (n,)))
+    return ll
+
+
+def _to_unit(model, names, values):
+    """参数值 -> [0, 1] 坐标（对数刻度的参数取 log 后归一化）。"""
+    out = np.empty_like(values, dtype=float)
+    for j, k in enumerate(names):
+        lo, hi, scale = FIT_SPACE[model][k]
+        v = values[..., j]
+        out[..., j] = (np.log(v / lo) / np.log(hi / lo)) if scale == "log" else (v - lo) / (hi - lo)
+    return out
+
+
+def _from_unit(model, names, unit):
+    """[0, 1] 坐标 -> 参数值。"""
+    unit = np.clip(unit, 0.0, 1.0)
+    out = np.empty_like(unit, dtype=float)
+    for j, k in enumerate(names):
+        lo, hi, scale = FIT_SPACE[model][k]
+        u = unit[..., j]
+        out[..., j] = lo * (hi / lo) ** u if scale == "log" else lo + u * (hi - lo)
+    return out
+
+
+def sample_params(model, n, rng, margin=0.1):
+    """
+    在拟合参数空间内均匀抽 n 组参数（对数刻度的参数按对数均匀），每维两端各留 margin 比例不取，
+    用于参数恢复检验。返回 {参数名: 长度 n 的数组}。
+    """
+    names = list(FIT_SPACE[model])
+    unit = margin + (1.0 - 2.0 * margin) * rng.random((n, len(names)))
+    values = _from_unit(model, names, unit)
+    return {k: values[:, j] for j, k in enumerate(names)}
+
+
+def _unit_grid(d, grid_points):
+    """[0, 1]^d 上每维 grid_points 个点的网格，形状 (grid_points^d, d)。"""
+    axis = np.linspace(0.0, 1.0, grid_points)
+    return np.array(list(product(axis, repeat=d))).reshape(-1, d)
+
+
+def fit_grid(model, grid_points=None):
+    """拟合用的粗参数网格：{参数名: 长度 K 的数组}（对数刻度的参数按对数等距）。"""
+    names = list(FIT_SPACE[model])
+    values = _from_unit(model, names, _unit_grid(len(names), grid_points or GRID_POINTS[model]))
+    return {k: values[:, j] for j, k in enumerate(names)}
+
+
+def _evaluate(model, names, fixed, choices, rewards, values):
+    """values 形状 (H, K, d)：H 段 history 各评估 K 组参数；choices / rewards 形状 (T, H)。返回 (H, K)。"""
+    h, k = values.shape[:2]
+    flat = values.reshape(h * k, -1)
+    params = {p: flat[:, j] for j, p in enumerate(names)}
+    params.update({p: np.full(h * k, v, dtype=float) for p, v in fixed.items()})
+    ll = log_likelihood(model, np.repeat(choices, k, axis=1), np.repeat(rewards, k, axis=1), params)
+    return ll.reshape(h, k)
+
+
+def _fit_group(model, names, fixed, choices, rewards, grid_points, refine_iters):
+    """同长度的 H 段 history 一起拟合：粗网格 + 批量局部细化，返回 (best 参数 (H, d), log L (H,))。"""
+    h = choices.shape[1]
+    d = len(names)
+    if d == 0:
+        return np.zeros((h, 0)), _evaluate(model, names, fixed, choices, rewards, np.zeros((h, 1, 0)))[:, 0]
+    unit = _unit_grid(d, grid_points)
+    ll_all = _evaluate(model, names, fixed, choices, rewards, np.broadcast_to(_from_unit(model, names, unit), (h,) + unit.shape))
+    best = ll_all.argmax(axis=1)
+    best_u = unit[best]
+    ll = ll_all[np.arange(h), best]
+    offsets = np.array(list(product((-1.0, 0.0, 1.0), repeat=d)))
+    step = np.full(h, 0.5 / max(grid_points - 1, 1))
+    for _ in range(refine_iters):
+        cand = np.clip(best_u[:, None, :] + step[:, None, None] * offsets[None], 0.0, 1.0)
+        ll_c = _evaluate(model, names, fixed, choices, rewards, _from_unit(model, names, cand))
+        i = ll_c.argmax(axis=1)
+        top = ll_c[np.arange(h), i]
+        better = top > ll
+        ll = np.where(better, top, ll)
+        best_u = np.where(better[:, None], cand[np.arange(h), i], best_u)
+        step = np.where(better, step, step * 0.5)
+    return _from_unit(model, names, best_u), ll
+
+
+def fit_model_arrays(choices, rewards, model, fixed=None, grid_points=None, refine_iters=12, max_agents=200_000):
+    """
+    等长的 H 段 history 同时拟合同一模型：choices（牌堆下标）/ rewards 形状 (T, H)。
+    与参数网格一起展开成批量，每批智能体数不超过 max_agents（控制内存）。返回 H 个结果字典（同 fit_model）。
+    """
+    if model not in FIT_SPACE:
+        raise ValueError(f"未知模型: {model}，应为 {'/'.join(FIT_SPACE)}")
+    fixed = dict(fixed or {})
+    names = [k for k in FIT_SPACE[model] if k not in fixed]
+    g = grid_points or GRID_POINTS[model]
+    choices = np.asarray(choices, dtype=np.int64)
+    rewards = np.asarray(rewards, dtype=float)
+    n, h = choices.shape
+    per_chunk = max(1, max_agents // (g ** len(names)))
+    results = []
+    for s in range(0, h, per_chunk):
+        best, ll = _fit_group(
+            model, names, fixed, choices[:, s:s + per_chunk], rewards[:, s:s + per_chunk], g, refine_iters
+        )
+        results.extend(_fit_result(model, names, fixed, b, float(v), n) for b, v in zip(best, ll))
+    return results
+
+
+def fit_model_batch(histories, model, fixed=None, grid_points=None, refine_iters=12, max_agents=200_000):
+    """
+    多段 history 同时拟合同一模型：同长度的 history 分组后交给 fit_model_arrays。
+    返回与 histories 对应的结果字典列表（同 fit_model）。
+    """
+    arrays = [history_arrays(h) for h in histories]
+    results = [None] * len(histories)
+    by_len = {}
+    for i, (c, _) in enumerate(arrays):
+        by_len.setdefault(len(c), []).append(i)
+    for n, idx in by_len.items():
+        choices = np.stack([arrays[i][0] for i in idx], axis=1).reshape(n, len(idx))
+        rewards = np.stack([arrays[i][1] for i in idx], axis=1).reshape(n, len(idx))
+        fits = fit_model_arrays(choices, rewards, model, fixed, grid_points, refine_iters, max_agents)
+        for i, f in zip(idx, fits):
+            results[i] = f
+    return results
+
+
+def _fit_result(model, names, fixed, best, ll, n):
+    k = len(names)
+    params = {**MODEL_PARAMS[model], **fixed, **dict(zip(names, best.tolist()))}
+    return {
+        "model": model,
+        "params": params,
+        "log_lik": ll,
+        "k": k,
+        "n": n,
+        "aic": 2 * k - 2 * ll,
+        "bic": k * np.log(max(n, 1)) - 2 * ll,
+    }
+
+
+def fit_model(history, model, fixed=None, grid_points=None, refine_iters=12):
+    """
+    单个模型的最大似然拟合。fixed 为固定不拟合的参数 {名: 值}。
+    先在粗网格上整体评估，再以最优点为中心、每次评估 3^d 个邻点（步长减半）做批量局部细化。
+    返回 dict：params, log_lik, k, n, aic, bic。
+    """
+    return fit_model_batch([history], model, fixed, grid_points, refine_iters)[0]
+
+
+def _with_weights(fits, models):
+    aic = np.array([fits[m]["aic"] for m in models])
+    w = np.exp(-0.5 * (aic - aic.min()))
+    w /= w.sum()
+    weights = dict(zip(models, w.tolist()))
+    return {
+        "fits": fits,
+        "weights": weights,
+        "best": max(weights, key=weights.get),
+        "n": fits[models[0]]["n"] if models else 0,
+    }
+
+
+def fit_all_models_batch(histories, models=("delta", "qlearning", "orl"), fixed=None):
+    """多段 history 同时拟合全部模型，返回与 histories 对应的 fit_all_models 结果列表。"""
+    fixed = fixed or {}
+    per_model = {m: fit_model_batch(histories, m, fixed.get(m)) for m in models}
+    return [_with_weights({m: per_model[m][i] for m in models}, models) for i in range(len(histories))]
+
+
+def fit_all_models(history, models=("delta", "qlearning", "orl"), fixed=None):
+    """
+    对每个模型拟合 history，并按 AIC 计算模型权重。
+    fixed: {模型: {参数: 值}}。返回 dict：fits（按模型）、weights（AIC 权重）、best（权重最大的模型）。
+    """
+    fixed = fixed or {}
+    return _with_weights({m: fit_model(history, m, fixed.get(m)) for m in models}, models)
+
+
+def chance_log_likelihood(n_trials):
+    """随机选择（每堆 1/4）的对数似然，作为拟合好坏的参照。"""
+    return n_trials * np.log(1.0 / len(DECK_NAMES))
@@ -0,0 +1,297 @@
+"""
+智能体计算内核：Delta / Q-learning / ORL 共用。
+智能体状态是长度为 4 的 float 数组，牌堆用整数下标 0..3（与 igt_env.DECK_NAMES 对应）。
+选择用预先抽好的均匀数 + 累积概率查找完成，每轮不再新建列表或调用 np.random.choice。
+每个模型有一个惰性逐步生成器（*_steps），逐轮 yield StepRecord；*_kernel 把它收成数组，
+命令行、页面与导出都从生成器取记录，run_delta / run_qlearning / run_orl 中的 run_* 函数都是这里的薄包装。
+"""
+
+from collections import namedtuple
+
+import numpy as np
+
+from igt_env import DECK_NAMES
+
+N_DECKS = len(DECK_NAMES)
+
+
+def softmax_choice(values, temp, u, buf):
+    """
+    Softmax 选择：values 为各牌堆分值，buf 为预分配的长度 4 的工作数组（会被覆盖），
+    u ∈ [0, 1) 为预先抽好的均匀数。返回牌堆下标。
+    """
+    np.subtract(values, values.max(), out=buf)
+    buf *= 1.0 / max(temp, 1e-8)
+    np.exp(buf, out=buf)
+    buf.cumsum(out=buf)
+    i = int(buf.searchsorted(u * buf[-1], side="right"))
+    return i if i < N_DECKS else N_DECKS - 1
+
+
+def epsilon_greedy_choice(values, epsilon, u_explore, u_pick):
+    """ε-贪心：u_explore < ε 时按 u_pick 均匀随机选一堆，否则选分值最大的（并列取第一个）。"""
+    if u_explore < epsilon:
+        return min(int(u_pick * N_DECKS), N_DECKS - 1)
+    return int(values.argmax())
+
+
+def delta_update(V, i, reward, alpha):
+    """Delta 规则：V[i] += α (r - V[i])。"""
+    V[i] += alpha * (reward - V[i])
+
+
+def qlearning_update(Q, i, reward, alpha, gamma):
+    """Q-learning：Q[i] += α (r + γ max Q - Q[i])（max 取更新前的 Q）。"""
+    max_next_q = Q.max()
+    Q[i] += alpha * (reward + gamma * max_next_q - Q[i])
+
+
+def orl_update(V, Ef, valence, i, reward, alpha_v, alpha_f, W_v, W_f):
+    """ORL 单步更新：更新 V[i]、Ef[i]，并只重算被选牌堆的综合分值 valence[i]，返回该分值。"""
+    V[i] += alpha_v * (reward - V[i])
+    sign = 1.0 if reward > 0 else -1.0
+    Ef[i] += alpha_f * (sign - Ef[i])
+    valence[i] = W_v * V[i] + W_f * Ef[i]
+    return valence[i]
+
+
+StepRecord = namedtuple("StepRecord", ["t", "choice", "reward", "balance", "state"])
+StepRecord.__doc__ = """
+单步记录：t 为轮次（从 1 开始），choice 为牌堆下标，reward / balance 为本轮收益与之后的余额，
+state 为本轮更新后的内部值快照（Delta: V；Q-learning: Q、explored；ORL: V、Ef、valence）。
+"""
+
+
+def _uniforms(rng, n_trials, k=1, block=4096):
+    """
+    逐轮给出 k 个预先抽好的均匀数（按块抽取，内存与总轮数无关；n_trials 为 None 时无限）。
+    每块内依次抽 k 个长度为块大小的数组；总轮数不超过 block 时与一次性抽取完全一致。
+    """
+    t = 0
+    while n_trials is None or t < n_trials:
+        m = block if n_trials is None else min(block, n_trials - t)
+        draws = [rng.random(m) for _ in range(k)]
+        yield from zip(*draws)
+        t += m
+
+
+def delta_steps(env, n_trials, alpha, temp, rng, initial_balance=2000):
+    """Delta 规则的惰性逐步生成器：每轮 yield 一个 StepRecord；n_trials 为 None 时一直运行。"""
+    env.reset(initial_balance=initial_balance)
+    V = np.zeros(N_DECKS)
+    buf = np.empty(N_DECKS)
+    step = env.step
+    for t, (u,) in enumerate(_uniforms(rng, n_trials), 1):
+        i = softmax_choice(V, temp, u, buf)
+        r = step(DECK_NAMES[i])
+        delta_update(V, i, r, alpha)
+        yield StepRecord(t, i, r, env.balance, {"V": V.copy()})
+
+
+def qlearning_steps(env, n_trials, alpha, epsilon, gamma, rng, initial_balance=2000):
+    """ε-贪心 Q-learning 的惰性逐步生成器；state 含 Q 与本轮是否探索 explored。"""
+    env.reset(initial_balance=initial_balance)
+    Q = np.zeros(N_DECKS)
+    step = env.step
+    for t, (u_explore, u_pick) in enumerate(_uniforms(rng, n_trials, 2), 1):
+        i = epsilon_greedy_choice(Q, epsilon, u_explore, u_pick)
+        r = step(DECK_NAMES[i])
+        qlearning_update(Q, i, r, alpha, gamma)
+        yield StepRecord(t, i, r, env.balance, {"Q": Q.copy(), "explored": bool(u_explore < epsilon)})
+
+
+def orl_steps(env, n_trials, alpha_v, alpha_f, W_v, W_f, temp, rng, initial_balance=2000):
+    """ORL 的惰性逐步生成器；state 含 V、Ef 与综合分值 valence。"""
+    env.reset(initial_balance=initial_balance)
+    V = np.zeros(N_DECKS)
+    Ef = np.zeros(N_DECKS)
+    valence = np.zeros(N_DECKS)
+    buf = np.empty(N_DECKS)
+    step = env.step
+    for t, (u,) in enumerate(_uniforms(rng, n_trials), 1):
+        i = softmax_choice(valence, temp, u, buf)
+        r = step(DECK_NAMES[i])
+        orl_update(V, Ef, valence, i, r, alpha_v, alpha_f, W_v, W_f)
+        yield StepRecord(t, i, r, env.balance, {"V": V.copy(), "Ef": Ef.copy(), "valence": valence.copy()})
+
+
+def _run_arrays(n_trials, initial_balance):
+    choices = np.empty(n_trials, dtype=np.int8)
+    rewards = np.empty(n_trials, dtype=np.int64)
+    balances = np.empty(n_trials + 1, dtype=np.int64)
+    balances[0] = initial_balance
+    return choices, rewards, balances
+
+
+def _collect(records, n_trials, initial_balance):
+    """把逐步记录收进数组，返回 (choices, rewards, balances, 最后一条记录)。"""
+    choices, rewards, balances = _run_arrays(n_trials, initial_balance)
+    rec = None
+    for rec in records:
+        choices[rec.t - 1] = rec.choice
+        rewards[rec.t - 1] = rec.reward
+        balances[rec.t] = rec.balance
+    return choices, rewards, balances, rec
+
+
+def delta_kernel(env, n_trials, alpha, temp, rng, initial_balance=2000):
+    """
+    Delta 规则跑完 n_trials 轮，返回 (choices, rewards, balances, V)。
+    choices/rewards 长度 n_trials，balances 长度 n_trials + 1（含初始余额）。
+    """
+    choices, rewards, balances, last = _collect(
+        delta_steps(env, n_trials, alpha, temp, rng, initial_balance), n_trials, initial_balance
+    )
+    V = last.state["V"] if last else np.zeros(N_DECKS)
+    return choices, rewards, balances, V
+
+
+def qlearning_kernel(env, n_trials, alpha, epsilon, gamma, rng, initial_balance=2000):
+    """
+    ε-贪心 Q-learning 跑完 n_trials 轮，返回 (choices, rewards, balances, explored, Q)。
+    explored[t] 为 True 表示第 t 轮是探索。
+    """
+    explored = np.zeros(n_trials, dtype=bool)
+
+    def records():
+        for rec in qlearning_steps(env, n_trials, alpha, epsilon, gamma, rng, initial_balance):
+            explored[rec.t - 1] = rec.state["explored"]
+            yield rec
+
+    choices, rewards, balances, last = _collect(records(), n_trials, initial_balance)
+    Q = last.state["Q"] if last else np.zeros(N_DECKS)
+    return choices, rewards, balances, explored, Q
+
+
+def orl_kernel(env, n_trials, alpha_v, alpha_f, W_v, W_f, temp, rng, initial_balance=2000):
+    """
+    ORL 跑完 n_trials 轮，返回 (choices, rewards, balances, ef_trace, V, Ef)。
+    ef_trace 形状 (n_trials + 1, 4)，第 0 行为初始 Ef。
+    """
+    ef_trace = np.zeros((n_trials + 1, N_DECKS))
+
+    def records():
+        for rec in orl_steps(env, n_trials, alpha_v, alpha_f, W_v, W_f, temp, rng, initial_balance):
+            ef_trace[rec.t] = rec.state["Ef"]
+            yield rec
+
+    choices, rewards, balances, last = _collect(records(), n_trials, initial_balance)
+    if last is None:
+        return choices, rewards, balances, ef_trace, np.zeros(N_DECKS), np.zeros(N_DECKS)
+    return choices, rewards, balances, ef_trace, last.state["V"], last.state["Ef"]
+
+
+def to_path_rows(choices, rewards, balances):
+    """内核输出 -> 旧格式 path_rows：[(轮次, 牌堆字母, 收益, 余额), ...]。"""
+    names = [DECK_NAMES[i] for i in choices.tolist()]
+    return list(zip(range(1, len(names) + 1), names, rewards.tolist(), balances[1:].tolist()))
+
+
+# ---------- 批量内核：M 个同模型智能体，状态为 (4, M) 数组 ----------
+
+MODEL_PARAMS = {
+    "delta": {"alpha": 0.15, "temp": 1.5},
+    "qlearning": {"alpha": 0.15, "epsilon": 0.1, "gamma": 0.0},
+    "orl": {"alpha_v": 0.15, "alpha_f": 0.15, "W_v": 0.5, "W_f": 0.5, "temp": 1.5},
+}
+
+
+class BatchAgents:
+    """
+    M 个同一模型（delta / qlearning / orl）的智能体，每个可有不同参数。
+    params: {参数名: 标量或长度 M 的数组}，缺省参数取 MODEL_PARAMS 中的默认值。
+    状态按牌堆优先存为 (4, M)，跨牌堆的 max / sum 是逐元素运算，M 很大时也很快。
+    probs() 给出当前各牌堆选择概率 (M, 4)，choose() 用均匀数抽样，update() 用 (choices, rewards) 更新状态，
+    log_prob(choices) 直接给出所选牌堆的对数概率（拟合用）。
+    """
+
+    def __init__(self, model, n_agents, params=None):
+        if model not in MODEL_PARAMS:
+            raise ValueError(f"未知模型: {model}，应为 {'/'.join(MODEL_PARAMS)}")
+        params = params or {}
+        unknown = set(params) - set(MODEL_PARAMS[model])
+        if unknown:
+            raise ValueError(f"{model} 没有参数: {', '.join(sorted(unknown))}")
+        self.model = model
+        self.n_agents = int(n_agents)
+        self.params = {
+            k: np.broadcast_to(np.asarray(params.get(k, v), dtype=float), (self.n_agents,)).copy()
+            for k, v in MODEL_PARAMS[model].items()
+        }
+        if "temp" in self.params:
+            self._inv_temp = 1.0 / np.maximum(self.params["temp"], 1e-8)
+        self._rows = np.arange(self.n_agents)
+        self.reset()
+
+    def reset(self):
+        self.values = np.zeros((N_DECKS, self.n_agents))  # Delta: V；Q-learning: Q；ORL: valence
+        if self.model == "orl":
+            self.V = np.zeros((N_DECKS, self.n_agents))
+            self.Ef = np.zeros((N_DECKS, self.n_agents))
+
+    def _scaled_logits(self):
+        """Softmax 模型：(values - max) / temp，形状 (4, M)。"""
+        x = self.values - self.values.max(axis=0)
+        x *= self._inv_temp
+        return x
+
+    def probs(self):
+        """当前各牌堆的选择概率 (M, 4)。"""
+        if self.model == "qlearning":
+            greedy = np.zeros((N_DECKS, self.n_agents))
+            greedy[self.values.argmax(axis=0), self._rows] = 1.0
+            eps = self.params["epsilon"]
+            return (eps / N_DECKS + (1.0 - eps) * greedy).T
+        x = self._scaled_logits()
+        np.exp(x, out=x)
+        x /= x.sum(axis=0)
+        return x.T
+
+    def log_prob(self, choices):
+        """本轮选择 choices (M,) 在当前策略下的对数概率 (M,)。"""
+        if self.model == "qlearning":
+            eps = self.params["epsilon"]
+            greedy = self.values.argmax(axis=0) == choices
+            return np.log(np.maximum(eps / N_DECKS + np.where(greedy, 1.0 - eps, 0.0), 1e-300))
+        x = self._scaled_logits()
+        picked = x[choices, self._rows]
+        np.exp(x, out=x)
+        return picked - np.log(x.sum(axis=0))
+
+    def choose(self, u, u_pick=None):
+        """
+        按当前策略抽样，返回 (M,) 的牌堆下标。u 为 (M,) 均匀数；
+        Q-learning 额外需要 u_pick（探索时均匀选牌用）。
+        """
+        if self.model == "qlearning":
+            explore = u < self.params["epsilon"]
+            pick = np.minimum((u_pick * N_DECKS).astype(np.int64), N_DECKS - 1)
+            return np.where(explore, pick, self.values.argmax(axis=0))
+        x = self._scaled_logits()
+        np.exp(x, out=x)
+        np.cumsum(x, axis=0, out=x)
+        idx = (x <= u * x[-1]).sum(axis=0)
+        return np.minimum(idx, N_DECKS - 1)
+
+    def update(self, choices, rewards):
+        """用本轮 (choices, rewards) 更新全部智能体状态，与单体内核的更新规则一致。"""
+        p = self.params
+        flat = np.asarray(choices) * self.n_agents + self._rows  # (4, M) 展平后的下标
+        rewards = np.asarray(rewards, dtype=float)
+        values = self.values.reshape(-1)
+        if self.model == "delta":
+            v = values.take(flat)
+            values.put(flat, v + p["alpha"] * (rewards - v))
+        elif self.model == "qlearning":
+            max_next_q = self.values.max(axis=0)
+            q = values.take(flat)
+            values.put(flat, q + p["alpha"] * (rewards + p["gamma"] * max_next_q - q))
+        else:
+            V, Ef = self.V.reshape(-1), self.Ef.reshape(-1)
+            v = V.take(flat)
+            v += p["alpha_v"] * (rewards - v)
+            V.put(flat, v)
+            ef = Ef.take(flat)
+            ef += p["alpha_f"] * (np.where(rewards > 0, 1.0, -1.0) - ef)
+            Ef.put(flat, ef)
+            values.put(flat, p["W_v"] * v + p["W_f"] * ef)
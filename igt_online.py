@@ -0,0 +1,90 @@
+"""
+在线模型后验：学生每点一次牌堆，就在固定参数网格上增量更新 Delta / Q-learning / ORL 的对数后验，
+不必回放整段 history。每次更新只对网格做一次向量化的 log_prob + update，工作量与已玩轮数无关。
+「自己玩」页面把它放在 session_state 里，每次刷新都能显示「你目前最像哪个模型」。
+"""
+
+import numpy as np
+
+from igt_fit import MODEL_LABELS, fit_grid, history_arrays
+from igt_kernels import BatchAgents
+
+MODELS = ("delta", "qlearning", "orl")
+_LOG_P_FLOOR = np.log(1e-10)
+
+
+def _logsumexp(x):
+    m = x.max()
+    return m + np.log(np.exp(x - m).sum())
+
+
+class OnlinePosterior:
+    """
+    每个模型在其参数网格（igt_fit.fit_grid）上维护均匀先验下的对数后验（未归一化）。
+    update(choice, reward) 逐次加入一轮；model_probs() 为各模型的后验概率（模型先验相等），
+    map_params(model) 为网格上后验最大的参数。
+    """
+
+    def __init__(self, models=MODELS, grid_points=None):
+        self.models = tuple(models)
+        self.grids = {}
+        self.agents = {}
+        self.log_post = {}
+        for m in self.models:
+            grid = fit_grid(m, (grid_points or {}).get(m))
+            k = len(next(iter(grid.values())))
+            self.grids[m] = grid
+            self.agents[m] = BatchAgents(m, k, grid)
+            self.log_post[m] = np.zeros(k)
+        self.n = 0
+
+    @classmethod
+    def from_history(cls, history, **kwargs):
+        """从已有 history 重建（页面刷新后 session 中没有后验时用）。"""
+        post = cls(**kwargs)
+        choices, rewards = history_arrays(history)
+        for c, r in zip(choices.tolist(), rewards.tolist()):
+            post.update(c, r)
+        return post
+
+    def update(self, choice, reward):
+        """加入一轮 (牌堆下标, 收益)：每个模型对整张网格做一次向量化更新。"""
+        for m in self.models:
+            agents = self.agents[m]
+            c = np.full(agents.n_agents, int(choice))
+            self.log_post[m] += np.maximum(agents.log_prob(c), _LOG_P_FLOOR)
+            agents.update(c, np.full(agents.n_agents, float(reward)))
+        self.n += 1
+
+    def log_evidence(self):
+        """各模型的对数边际似然：网格上似然的平均（均匀先验）取 log。"""
+        return {m: _logsumexp(lp) - np.log(len(lp)) for m, lp in self.log_post.items()}
+
+    def model_probs(self):
+        """各模型的后验概率 {模型: p}（模型先验相等）。"""
+        ev = self.log_evidence()
+        x = np.array([ev[m] for m in self.models])
+        p = np.exp(x - x.max())
+        p /= p.sum()
+        return dict(zip(self.models, p.tolist()))
+
+    def best_model(self):
+        probs = self.model_probs()
+        return max(probs, key=probs.get)
+
+    def map_params(self, model):
+        """网格上后验最大的参数 {参数名: 值}。"""
+        i = int(self.log_post[model].argmax())
+        return {k: float(v[i]) for k, v in self.grids[model].items()}
+
+    def summary(self):
+        """页面展示用：best、best_label、probs（按模型）、map_params（按模型）、n。"""
+        probs = self.model_probs()
+        best = max(probs, key=probs.get)
+        return {
+            "n": self.n,
+            "best": best,
+            "best_label": MODEL_LABELS[best],
+            "probs": probs,
+            "map_params": {m: self.map_params(m) for m in self.models},
+        }
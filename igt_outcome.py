@@ -0,0 +1,205 @@
+"""
+IGT 牌堆配置的解析结果分布：不做蒙特卡洛，直接算出 N 轮后累计净收益的精确分布。
+每个牌堆的罚款是伯努利事件，固定选择次数时罚款次数服从二项分布，各牌堆再做卷积；
+固定选择概率（策略）时，每轮结果独立同分布，对单轮分布做 N 次卷积（FFT 求幂）。
+供后台牌堆配置与分析报告展示方差、分位数、亏损概率等风险指标。
+"""
+
+from math import gcd, lgamma
+
+import numpy as np
+
+from igt_env import DECK_NAMES, normalize_decks
+
+
+class OutcomeDistribution:
+    """
+    累计净收益（最终余额 - 初始余额）的离散分布：取值 offset + step * i，概率 probs[i]。
+    """
+
+    def __init__(self, offset, step, probs, initial_balance=2000):
+        self.offset = int(offset)
+        self.step = int(step)
+        self.probs = probs
+        self.initial_balance = initial_balance
+
+    @property
+    def values(self):
+        """分布支撑点（净收益）。"""
+        return self.offset + self.step * np.arange(len(self.probs), dtype=np.int64)
+
+    @property
+    def mean(self):
+        return float(self.values @ self.probs)
+
+    @property
+    def variance(self):
+        v = self.values - self.mean
+        return float((v * v) @ self.probs)
+
+    @property
+    def std(self):
+        return self.variance ** 0.5
+
+    def cdf(self, x):
+        """P(净收益 <= x)。"""
+        i = int(np.floor((x - self.offset) / self.step))
+        if i < 0:
+            return 0.0
+        return float(min(self.probs[:i + 1].sum(), 1.0))
+
+    def prob_below(self, x):
+        """P(净收益 < x)。"""
+        i = int(np.ceil((x - self.offset) / self.step)) - 1
+        if i < 0:
+            return 0.0
+        return float(min(self.probs[:i + 1].sum(), 1.0))
+
+    def prob_loss(self):
+        """最终余额低于初始余额（默认 2000）的概率，即 P(净收益 < 0)。"""
+        return self.prob_below(0)
+
+    def quantile(self, q):
+        """净收益的 q 分位数：使 P(净收益 <= x) >= q 的最小 x；q 可为数组。"""
+        cum = np.cumsum(self.probs)
+        idx = np.searchsorted(cum, np.asarray(q, dtype=float) - 1e-12, side="left")
+        idx = np.minimum(idx, len(self.probs) - 1)
+        return self.offset + self.step * idx
+
+    def summary(self, quantiles=(0.05, 0.5, 0.95)):
+        """常用指标字典（页面展示用）。"""
+        qs = self.quantile(quantiles)
+        return {
+            "mean": self.mean,
+            "std": self.std,
+            "quantiles": {q: int(x) for q, x in zip(quantiles, np.atleast_1d(qs))},
+            "prob_loss": self.prob_loss(),
+            "expected_balance": self.initial_balance + self.mean,
+        }
+
+
+def _binomial_pmf(n, p):
+    """Bin(n, p) 的概率质量函数，长度 n + 1。"""
+    if p <= 0.0:
+        pmf = np.zeros(n + 1)
+        pmf[0] = 1.0
+        return pmf
+    if p >= 1.0:
+        pmf = np.zeros(n + 1)
+        pmf[n] = 1.0
+        return pmf
+    k = np.arange(n + 1)
+    logc = np.array([lgamma(n + 1) - lgamma(j + 1) - lgamma(n - j + 1) for j in range(n + 1)])
+    return np.exp(logc + k * np.log(p) + (n - k) * np.log1p(-p))
+
+
+def _as_counts(counts):
+    """choice counts：dict {'A': n_A, ...} 或按 DECK_NAMES 顺序的序列。"""
+    if isinstance(counts, dict):
+        return [int(counts.get(k, 0)) for k in DECK_NAMES]
+    counts = [int(c) for c in counts]
+    if len(counts) != len(DECK_NAMES):
+        raise ValueError(f"counts 长度应为 {len(DECK_NAMES)}")
+    return counts
+
+
+def _as_policy(policy):
+    """选择策略：dict {'A': p_A, ...} 或按 DECK_NAMES 顺序的概率序列，自动归一化。"""
+    if isinstance(policy, dict):
+        policy = [policy.get(k, 0.0) for k in DECK_NAMES]
+    pi = np.asarray(policy, dtype=float)
+    if pi.shape != (len(DECK_NAMES),) or np.any(pi < 0) or pi.sum() <= 0:
+        raise ValueError("policy 应为 4 个非负概率")
+    return pi / pi.sum()
+
+
+def outcome_from_counts(decks, counts, initial_balance=2000):
+    """
+    已知各牌堆被选次数 counts 时，累计净收益的精确分布。
+    净收益 = Σ n_k·win_k + Σ loss_k·X_k，X_k ~ Bin(n_k, p_k) 相互独立。
+    """
+    table = normalize_decks(decks)
+    counts = _as_counts(counts)
+    if any(c < 0 for c in counts):
+        raise ValueError("counts 不能为负")
+    offset = sum(n * table[k][0] for k, n in zip(DECK_NAMES, counts))
+    # 罚款额统一放到公约数 step 的格点上，便于直接卷积
+    active = [(n, table[k][1], table[k][2]) for k, n in zip(DECK_NAMES, counts) if n > 0 and table[k][2] != 0 and table[k][1] > 0]
+    step = 0
+    for _, _, loss in active:
+        step = gcd(step, abs(loss))
+    step = step or 1
+    probs = np.ones(1)
+    for n, p, loss in active:
+        pmf = _binomial_pmf(n, p)
+        stride = abs(loss) // step
+        spread = np.zeros(n * stride + 1)
+        if loss < 0:
+            spread[::stride] = pmf[::-1]  # X 次罚款 -> 偏移 n*loss + (n - X)*|loss|
+            offset += n * loss
+        else:
+            spread[::stride] = pmf
+        probs = np.convolve(probs, spread)
+    return OutcomeDistribution(offset, step, _clean(probs), initial_balance)
+
+
+def outcome_from_policy(decks, policy, n_trials, initial_balance=2000):
+    """
+    每轮按固定概率 policy 选牌、共 n_trials 轮时，累计净收益的分布。
+    单轮结果在 {win_k, win_k + loss_k} 上取值，n_trials 轮独立同分布，用 FFT 做 n 次幂卷积。
+    """
+    table = normalize_decks(decks)
+    pi = _as_policy(policy)
+    n_trials = int(n_trials)
+    if n_trials < 0:
+        raise ValueError("n_trials 不能为负")
+    atoms = []  # 单轮 (取值, 概率)
+    for k, w in zip(DECK_NAMES, pi):
+        win, p, loss = table[k]
+        if w <= 0:
+            continue
+        atoms.append((win, w * (1.0 - p)))
+        atoms.append((win + loss, w * p))
+    atoms = [(v, w) for v, w in atoms if w > 0]
+    lo = min(v for v, _ in atoms)
+    step = 0
+    for v, _ in atoms:
+        step = gcd(step, v - lo)
+    step = step or 1
+    single = np.zeros((max(v for v, _ in atoms) - lo) // step + 1)
+    for v, w in atoms:
+        single[(v - lo) // step] += w
+    if n_trials == 0:
+        return OutcomeDistribution(0, step, np.ones(1), initial_balance)
+    size = (len(single) - 1) * n_trials + 1
+    nfft = 1 << (size - 1).bit_length()
+    probs = np.fft.irfft(np.fft.rfft(single, nfft) ** n_trials, nfft)[:size]
+    return OutcomeDistribution(lo * n_trials, step, _clean(probs), initial_balance)
+
+
+def _clean(probs):
+    """去掉浮点误差带来的负值，重新归一化。"""
+    probs = np.clip(probs, 0.0, None)
+    return probs / probs.sum()
+
+
+def deck_risk_table(decks, n_trials=100, initial_balance=2000):
+    """
+    每个牌堆「只选它 n_trials 轮」以及「四堆均匀随机选」的风险指标，
+    返回行字典列表（后台牌堆配置页展示用）。
+    """
+    rows = []
+    plans = [(k, outcome_from_counts(decks, {k: n_trials}, initial_balance)) for k in DECK_NAMES]
+    plans.append(("random", outcome_from_policy(decks, [1, 1, 1, 1], n_trials, initial_balance)))
+    for name, dist in plans:
+        s = dist.summary()
+        rows.append({
+            "plan": name,
+            "mean": s["mean"],
+            "std": s["std"],
+            "q05": s["quantiles"][0.05],
+            "q50": s["quantiles"][0.5],
+            "q95": s["quantiles"][0.95],
+            "prob_loss": s["prob_loss"],
+        })
+    return rows
@@ -0,0 +1,182 @@
+"""
+参数恢复检验：用已知参数批量模拟 Delta / Q-learning / ORL 智能体，再用最大似然拟合回去，
+看 n_trials 轮的数据能否认出各参数（例如 ORL 的 W_f 与 W_v 是否可区分）。
+- python igt_recovery.py --agents 200 --trials 100 -j 8 --out recovery.json
+- 牌堆配置：默认牌堆 + deck_config 当前全局配置（不同时），可用 --decks 追加 JSON 文件
+
+模拟与拟合按块分发到进程池；每个智能体的随机流由 SeedSequence(base_seed, spawn_key=(k,)) 确定，
+结果与 worker 数、分块方式无关。报告为 JSON：每个 (模型, 牌堆配置) 的恢复相关、偏差、RMSE、
+真值×拟合值相关矩阵，以及每次拟合的耗时与吞吐量，便于在版本之间跟踪拟合精度与速度。
+"""
+
+import json
+import os
+import platform
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from deck_config import get_decks
+from igt_env import DEFAULT_DECKS, normalize_decks
+from igt_fit import FIT_SPACE, GRID_POINTS, fit_model_arrays, sample_params
+from igt_sweep import simulate_histories
+
+MODELS = ("delta", "qlearning", "orl")
+REPORT_VERSION = 1
+
+
+def deck_configs(extra_files=None):
+    """待检验的牌堆配置 {名称: decks}：默认牌堆、当前全局配置（与默认不同时）以及 extra_files 中的 JSON。"""
+    configs = {"default": normalize_decks(DEFAULT_DECKS)}
+    current = normalize_decks(get_decks())
+    if current != configs["default"]:
+        configs["current"] = current
+    for path in extra_files or []:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        configs[os.path.splitext(os.path.basename(path))[0]] = normalize_decks(data.get("decks", data))
+    return {name: {k: list(v) for k, v in d.items()} for name, d in configs.items()}
+
+
+def _fit_scale(model, name, values):
+    """统计恢复相关时使用的刻度：对数刻度的参数取 log。"""
+    return np.log(values) if FIT_SPACE[model][name][2] == "log" else values
+
+
+def _recover_chunk(model, params, seed_indices, base_seed, n_trials, decks):
+    """worker：模拟一块智能体并拟合回去，返回 (拟合参数 {名: 数组}, 拟合耗时秒)。"""
+    choices, rewards, _ = simulate_histories(model, params, seed_indices, base_seed, n_trials, decks)
+    start = time.perf_counter()
+    fits = fit_model_arrays(choices, rewards, model)
+    elapsed = time.perf_counter() - start
+    fitted = {k: np.array([f["params"][k] for f in fits]) for k in params}
+    return fitted, elapsed
+
+
+def recovery_stats(model, true, fitted):
+    """
+    恢复统计：每个参数的 Pearson r（对数刻度的参数取 log 后计算）、偏差（拟合 - 真值的均值）、RMSE，
+    以及真值（行）× 拟合值（列）的相关矩阵（对角线外的高相关说明参数之间可以相互替代）。
+    """
+    names = list(true)
+    t = np.column_stack([_fit_scale(model, k, true[k]) for k in names])
+    f = np.column_stack([_fit_scale(model, k, fitted[k]) for k in names])
+    n = len(names)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        corr = np.corrcoef(t, f, rowvar=False)[:n, n:]
+    params = {}
+    for j, k in enumerate(names):
+        err = fitted[k] - true[k]
+        params[k] = {
+            "r": _finite(corr[j, j]),
+            "bias": float(err.mean()),
+            "rmse": float(np.sqrt((err ** 2).mean())),
+            "scale": FIT_SPACE[model][k][2],
+        }
+    return {
+        "params": params,
+        "corr_matrix": {"true": names, "fitted": names, "r": [[_finite(v) for v in row] for row in corr]},
+    }
+
+
+def _finite(v):
+    return float(v) if np.isfinite(v) else None
+
+
+def run_recovery(
+    models=MODELS, configs=None, n_agents=200, n_trials=100, base_seed=0,
+    workers=None, chunk_size=25, progress=print,
+):
+    """执行参数恢复检验，返回报告 dict（可直接 json.dump）。"""
+    configs = configs or deck_configs()
+    jobs = []
+    for model in models:
+        true = sample_params(model, n_agents, np.random.default_rng([base_seed, MODELS.index(model)]))
+        for name, decks in configs.items():
+            jobs.append((model, name, decks, true))
+
+    wall_start = time.perf_counter()
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = []
+        for model, name, decks, true in jobs:
+            futures = []
+            for s in range(0, n_agents, chunk_size):
+                ids = np.arange(s, min(s + chunk_size, n_agents))
+                chunk = {k: v[ids] for k, v in true.items()}
+                futures.append(pool.submit(_recover_chunk, model, chunk, ids, base_seed, n_trials, decks))
+            pending.append((model, name, true, futures, time.perf_counter()))
+        for model, name, true, futures, submitted in pending:
+            parts = [fut.result() for fut in futures]
+            fitted = {k: np.concatenate([p[0][k] for p in parts]) for k in true}
+            fit_seconds = sum(p[1] for p in parts)
+            row = {
+                "model": model,
+                "decks": name,
+                "n_agents": int(n_agents),
+                "n_trials": int(n_trials),
+                "fit_seconds": fit_seconds,
+                "seconds_per_fit": fit_seconds / max(n_agents, 1),
+                "fits_per_second": n_agents / fit_seconds if fit_seconds > 0 else None,
+                **recovery_stats(model, true, fitted),
+            }
+            results.append(row)
+            if progress:
+                rs = " ".join(f"{k}={_fmt(v['r'])}" for k, v in row["params"].items())
+                progress(f"{model:9s} [{name}] r: {rs} · {row['seconds_per_fit'] * 1000:.1f} ms/拟合")
+    wall = time.perf_counter() - wall_start
+    total_fits = n_agents * len(jobs)
+    return {
+        "version": REPORT_VERSION,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "config": {
+            "models": list(models),
+            "n_agents": int(n_agents),
+            "n_trials": int(n_trials),
+            "base_seed": int(base_seed),
+            "chunk_size": int(chunk_size),
+            "workers": workers or os.cpu_count(),
+            "grid_points": {m: GRID_POINTS[m] for m in models},
+            "decks": configs,
+        },
+        "environment": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "wall_seconds": wall,
+        "fits_per_second_wall": total_fits / wall if wall > 0 else None,
+        "results": results,
+    }
+
+
+def _fmt(v):
+    return "nan" if v is None else f"{v:.2f}"
+
+
+def main(argv=None):
+    import argparse
+    p = argparse.ArgumentParser(description="IGT 智能体参数恢复检验（多进程，输出 JSON 报告）")
+    p.add_argument("--models", nargs="*", default=list(MODELS), choices=list(MODELS), help="检验的模型")
+    p.add_argument("--agents", type=int, default=200, help="每个 (模型, 牌堆配置) 的模拟智能体数")
+    p.add_argument("--trials", "-n", type=int, default=100, help="每个智能体的轮数")
+    p.add_argument("--seed", type=int, default=0, help="主种子")
+    p.add_argument("--workers", "-j", type=int, default=None, help="进程数（默认 CPU 核数）")
+    p.add_argument("--chunk", type=int, default=25, help="每个任务块的智能体数")
+    p.add_argument("--decks", nargs="*", default=[], help="额外的牌堆配置 JSON 文件")
+    p.add_argument("--out", "-o", default="recovery.json", help="报告路径（JSON）")
+    args = p.parse_args(argv)
+    report = run_recovery(
+        args.models, deck_configs(args.decks), args.agents, args.trials,
+        base_seed=args.seed, workers=args.workers, chunk_size=args.chunk,
+    )
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"总耗时 {report['wall_seconds']:.1f}s，报告已写入 {args.out}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
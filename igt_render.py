@@ -0,0 +1,66 @@
+"""
+渲染节流：把模拟步与界面帧解耦。逐步运行时每一步都算，但只在「到时间」或「到步数」时刷新一次前端，
+最后一步总会刷新，保证界面停在最终状态。步间延迟较大（每步都看得清）时自然每步都刷新。
+折线图用 IncrementalLineChart 只追加新点，不每帧重画整条曲线。
+"""
+
+import time
+
+DEFAULT_MAX_FPS = 10.0
+
+
+class RenderScheduler:
+    """
+    max_fps: 每秒最多刷新几帧（None 或 0 表示不按时间限制）；
+    every: 每隔多少步至少刷新一次（None 表示不按步数强制刷新）。
+    due(t, last) 判断第 t 步后是否该刷新，返回 True 时同时记为已刷新。
+    """
+
+    def __init__(self, max_fps=DEFAULT_MAX_FPS, every=None, clock=time.perf_counter):
+        self.min_interval = 1.0 / max_fps if max_fps else 0.0
+        self.every = every
+        self._clock = clock
+        self._last_time = None
+        self._last_step = 0
+        self.frames = 0
+
+    def due(self, t, last=False):
+        now = self._clock()
+        ready = (
+            last
+            or self._last_time is None
+            or now - self._last_time >= self.min_interval
+            or (self.every is not None and t - self._last_step >= self.every)
+        )
+        if ready:
+            self._last_time = now
+            self._last_step = t
+            self.frames += 1
+        return ready
+
+
+class IncrementalLineChart:
+    """
+    增量折线图：第一帧在占位符上建图，之后每帧只用 add_rows 追加新增的点，
+    每帧开销与已画的点数无关。n 为已画的点数（横轴 0..n-1）。
+    """
+
+    def __init__(self, placeholder, height=220):
+        self._ph = placeholder
+        self.height = height
+        self._chart = None
+        self.n = 0
+
+    def extend(self, columns):
+        """columns: {列名: 新增的值列表}（各列等长），接在已画的点之后。"""
+        import pandas as pd
+
+        k = len(next(iter(columns.values()), []))
+        if k == 0:
+            return
+        df = pd.DataFrame(columns, index=range(self.n, self.n + k))
+        if self._chart is None:
+            self._chart = self._ph.line_chart(df, height=self.height)
+        else:
+            self._chart.add_rows(df)
+        self.n += k
@@ -0,0 +1,159 @@
+"""
+可复现的模型运行提交：Delta / Q-learning / ORL / 仪表盘的运行由 (模型, 参数, seed, 轮数, 牌堆[, 公共随机数]) 完全决定，
+提交时只存这份「配方」与结果轨迹的校验和（几百字节），后台查看或导出时再按需重新模拟（进程内 LRU 缓存）。
+verify_recipe 重新模拟并比对校验和：引擎（环境或模型内核）改动导致结果漂移时可以发现。
+- 单模型页面：与 run_*_step_by_step 相同，IGTEnv(seed) + seed_run(env, seed) 派生环境与智能体随机流；
+- 仪表盘：dashboard_steps 与页面共用，派生方式见其说明。
+命令行: python igt_replay.py --verify   （校验全部可复现提交）
+"""
+
+import hashlib
+import json
+import sys
+from functools import lru_cache
+
+import numpy as np
+
+from igt_env import DECK_NAMES, IGTEnv, OutcomeTape, seed_run, spawn_rngs
+from igt_kernels import delta_steps, orl_steps, qlearning_steps
+
+RECIPE_VERSION = 1
+REPLAY_CACHE_SIZE = 256
+
+STEPS = {"delta": delta_steps, "qlearning": qlearning_steps, "orl": orl_steps}
+# 仪表盘的三条路径：路径字段 -> 模型
+DASHBOARD_PATHS = {"path_delta": "delta", "path_ql": "qlearning", "path_orl": "orl"}
+
+
+def _run_steps(model, env, n_trials, params, rng):
+    return STEPS[model](env, n_trials, rng=rng, **params)
+
+
+def dashboard_steps(seed, decks, n_trials, params, crn=False):
+    """
+    仪表盘：三个模型按轮同步的 StepRecord 三元组 (delta, qlearning, orl)。
+    三个环境与三个智能体各用一条由 seed 派生的独立随机流；crn 时罚款取自同一条结果带，
+    三个智能体的选牌随机流也相同。params: {模型: 参数 dict}。
+    """
+    env_rngs = spawn_rngs(seed, 6)
+    agent_rngs = env_rngs[3:]
+    tape = None
+    if crn:
+        tape = OutcomeTape(seed=np.random.SeedSequence(seed, spawn_key=(6,)))
+        shared = np.random.SeedSequence(seed, spawn_key=(7,))
+        agent_rngs = [np.random.default_rng(shared) for _ in range(3)]
+    return zip(*(
+        _run_steps(model, IGTEnv(decks=decks, rng=env_rng, tape=tape), n_trials, params[model], rng)
+        for model, env_rng, rng in zip(DASHBOARD_PATHS.values(), env_rngs[:3], agent_rngs)
+    ))
+
+
+def _rows(records):
+    return tuple((rec.t, DECK_NAMES[rec.choice], rec.reward, rec.balance) for rec in records)
+
+
+def trajectory_checksum(path_rows):
+    """轨迹 [(轮次, 选择, 收益, 余额), ...] 的校验和（16 位十六进制）。"""
+    payload = json.dumps([list(r) for r in path_rows], separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def _simulate(recipe):
+    """按配方重新模拟，返回 {路径字段: path_rows 元组}；配方版本不支持时报错，不按新语义重放旧配方。"""
+    if recipe.get("v") != RECIPE_VERSION:
+        raise ValueError(f"不支持的配方版本: {recipe.get('v')}")
+    decks = recipe.get("decks")
+    n_trials, seed = recipe["n_trials"], recipe["seed"]
+    if recipe["model"] == "dashboard":
+        paths = {k: [] for k in DASHBOARD_PATHS}
+        for recs in dashboard_steps(seed, decks, n_trials, recipe["params"], recipe.get("crn", False)):
+            for k, rec in zip(DASHBOARD_PATHS, recs):
+                paths[k].append(rec)
+        return {k: _rows(v) for k, v in paths.items()}
+    env = IGTEnv(seed=seed, decks=decks)
+    rng = seed_run(env, seed)
+    return {"path_rows": _rows(_run_steps(recipe["model"], env, n_trials, recipe["params"], rng))}
+
+
+@lru_cache(maxsize=REPLAY_CACHE_SIZE)
+def _simulate_cached(key):
+    return _simulate(json.loads(key))
+
+
+def replay(recipe):
+    """按配方得到 {路径字段: path_rows}（带缓存；返回的元组不可修改，可安全共享）。"""
+    return _simulate_cached(json.dumps(_generating(recipe), sort_keys=True, ensure_ascii=False))
+
+
+def _generating(recipe):
+    # 缓存键只含生成所需的字段，校验和不同（如引擎改动前后）的同一配方共用模拟结果
+    return {k: v for k, v in recipe.items() if k != "checksum"}
+
+
+def make_recipe(model, params, seed, n_trials, decks, paths, crn=None):
+    """
+    model: delta / qlearning / orl / dashboard；dashboard 时 params 为 {模型: 参数}，paths 为 {路径字段: path_rows}，
+    否则 paths 为本次运行的 path_rows。返回可直接放入提交的配方（含结果校验和）。
+    """
+    if not isinstance(paths, dict):
+        paths = {"path_rows": paths}
+    recipe = {
+        "v": RECIPE_VERSION,
+        "model": model,
+        "params": params,
+        "seed": int(seed),
+        "n_trials": int(n_trials),
+        "decks": {k: list(v) for k, v in decks.items()} if decks else None,
+        "checksum": {k: trajectory_checksum(rows) for k, rows in paths.items()},
+    }
+    if crn is not None:
+        recipe["crn"] = bool(crn)
+    return recipe
+
+
+def replay_path_rows(recipe, path_key="path_rows"):
+    """配方对应的某条 path_rows（缓存中的元组）；路径不存在时为空。"""
+    return replay(recipe).get(path_key, ())
+
+
+def verify_recipe(recipe):
+    """重新模拟（不走缓存）并比对校验和，返回 {路径字段: 是否一致}。"""
+    paths = _simulate(_generating(recipe))
+    return {k: trajectory_checksum(paths.get(k, ())) == c for k, c in recipe.get("checksum", {}).items()}
+
+
+def verify_submissions(modules=None):
+    """校验存储中全部可复现提交，返回不一致的 [(模块, 学号, 时间, 不一致的路径或无法重放的原因)]。"""
+    from submission_store import MODULES, get_all
+
+    drift = []
+    for m in modules or MODULES:
+        for e in get_all(m):
+            if "recipe" not in e:
+                continue
+            try:
+                bad = [k for k, ok in verify_recipe(e["recipe"]).items() if not ok]
+            except ValueError as err:
+                bad = [str(err)]
+            if bad:
+                drift.append((m, e.get("学号", ""), e.get("时间", ""), bad))
+    return drift
+
+
+def main(argv=None):
+    import argparse
+    p = argparse.ArgumentParser(description="可复现模型运行提交：按配方重新模拟并校验")
+    p.add_argument("--verify", action="store_true", help="校验全部可复现提交的校验和")
+    args = p.parse_args(argv)
+    if not args.verify:
+        p.print_help()
+        return 0
+    drift = verify_submissions()
+    for m, uid, ts, bad in drift:
+        print(f"[漂移] {m} {uid} {ts}: {', '.join(bad)}")
+    print("全部一致" if not drift else f"共 {len(drift)} 条提交与当前引擎结果不一致")
+    return 1 if drift else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,114 @@
+"""
+运行日志：只保存结构化的 StepRecord，显示时才格式化成文本（格式化结果按行缓存）。
+逐步运行时每步只追加一条记录，刷新时只显示末尾窗口；运行结束后可分页浏览或搜索全部日志。
+"""
+
+import math
+
+from igt_env import DECK_NAMES
+
+DEFAULT_WINDOW = 40
+DEFAULT_PAGE_SIZE = 100
+
+
+class RunLog:
+    """
+    formatter: StepRecord -> 日志文本（可含换行），如 run_delta.format_delta_record。
+    可迭代（逐行给出格式化文本）与取长度，"\\n".join(log) 与旧的 log_lines 列表用法一致。
+    """
+
+    def __init__(self, formatter, window=DEFAULT_WINDOW):
+        self._format = formatter
+        self.window = window
+        self._records = []
+        self._lines = {}
+
+    def append(self, rec):
+        self._records.append(rec)
+
+    def __len__(self):
+        return len(self._records)
+
+    def __iter__(self):
+        for i in range(len(self._records)):
+            yield self.line(i)
+
+    def record(self, i):
+        return self._records[i]
+
+    def line(self, i):
+        """第 i 条（从 0 开始）的格式化文本，首次访问时才格式化。"""
+        s = self._lines.get(i)
+        if s is None:
+            s = self._lines[i] = self._format(self._records[i])
+        return s
+
+    def path_rows(self, start=0):
+        """结果表 [(轮次, 牌堆字母, 收益, 余额), ...]，由记录生成；start 可为负（如 -30 取末尾 30 行）。"""
+        return [(r.t, DECK_NAMES[r.choice], r.reward, r.balance) for r in self._records[start:]]
+
+    def series(self, value, initial, start=0):
+        """
+        逐轮序列 [initial, 第 1 轮后, 第 2 轮后, ...] 从第 start 个起的部分，value: StepRecord -> 值。
+        如余额 series(lambda r: r.balance, 2000)；增量画图时 start 取已画的点数。
+        """
+        head = [initial] if start == 0 else []
+        return head + [value(r) for r in self._records[max(start - 1, 0):]]
+
+    def lines(self, start=0, stop=None):
+        n = len(self._records)
+        stop = n if stop is None else min(stop, n)
+        return [self.line(i) for i in range(max(start, 0), stop)]
+
+    def tail(self, n=None):
+        """末尾 n 条（缺省为 window）拼成的文本。"""
+        n = self.window if n is None else n
+        return "\n".join(self.lines(len(self._records) - n))
+
+    def n_pages(self, page_size=DEFAULT_PAGE_SIZE):
+        return max(1, math.ceil(len(self._records) / page_size))
+
+    def page(self, page, page_size=DEFAULT_PAGE_SIZE):
+        """第 page 页（从 1 开始）的文本。"""
+        start = (max(1, page) - 1) * page_size
+        return "\n".join(self.lines(start, start + page_size))
+
+    def search(self, query, limit=200):
+        """全文搜索（不区分大小写），返回最多 limit 条匹配行的文本。"""
+        q = query.strip().lower()
+        if not q:
+            return []
+        hits = []
+        for i in range(len(self._records)):
+            s = self.line(i)
+            if q in s.lower():
+                hits.append(s)
+                if len(hits) >= limit:
+                    break
+        return hits
+
+    def text(self):
+        """完整日志文本（下载用）。"""
+        return "\n".join(self)
+
+
+def show_run_log(log, key, height=280, page_size=DEFAULT_PAGE_SIZE, labels=None):
+    """
+    Streamlit 日志浏览：搜索框 + 分页，只把当前页（或搜索结果）发往前端。
+    labels: {"search", "page", "matches"} 文本（缺省为中文）。
+    """
+    import streamlit as st
+
+    labels = {"search": "搜索日志", "page": "页码", "matches": "匹配 {n} 条", **(labels or {})}
+    c_search, c_page = st.columns([3, 1])
+    with c_search:
+        query = st.text_input(labels["search"], key=f"{key}_search")
+    if query.strip():
+        hits = log.search(query)
+        st.caption(labels["matches"].format(n=len(hits)))
+        text = "\n".join(hits)
+    else:
+        with c_page:
+            page = st.number_input(labels["page"], 1, log.n_pages(page_size), log.n_pages(page_size), key=f"{key}_page")
+        text = log.page(int(page), page_size)
+    st.text_area("运行日志", value=text, height=height, disabled=True, label_visibility="collapsed", key=f"{key}_view")
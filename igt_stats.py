@@ -0,0 +1,77 @@
+"""
+流式统计：Welford / Chan 合并的均值与方差，内存只与统计量形状有关，与样本数无关。
+各批次（或各进程）分别累计后用 merge 合并，结果与一次性计算相同。
+"""
+
+import math
+
+import numpy as np
+
+Z_95 = 1.959963984540054  # 正态 97.5% 分位数
+
+
+class RunningStats:
+    """
+    逐样本（或逐批）更新的均值 / 方差，统计量形状为 shape（标量时为 ()）。
+    update(x) 加入一个样本；update_batch(xs) 加入一批（第 0 维为样本）；merge(other) 合并另一份统计。
+    """
+
+    def __init__(self, shape=()):
+        self.n = 0
+        self.mean = np.zeros(shape)
+        self.m2 = np.zeros(shape)
+
+    @classmethod
+    def from_moments(cls, n, mean, m2):
+        """由已算好的 (样本数, 均值, 离差平方和) 构造，用于把一批的汇总直接并入。"""
+        s = cls(np.shape(mean))
+        s.n = int(n)
+        s.mean = np.array(mean, dtype=float)
+        s.m2 = np.array(m2, dtype=float)
+        return s
+
+    def update(self, x):
+        x = np.asarray(x, dtype=float)
+        self.n += 1
+        d = x - self.mean
+        self.mean = self.mean + d / self.n
+        self.m2 = self.m2 + d * (x - self.mean)
+
+    def update_batch(self, xs):
+        xs = np.asarray(xs, dtype=float)
+        if len(xs) == 0:
+            return
+        mean = xs.mean(axis=0)
+        self.merge(RunningStats.from_moments(len(xs), mean, ((xs - mean) ** 2).sum(axis=0)))
+
+    def merge(self, other):
+        """Chan 并行合并：把 other 的样本并入本统计。"""
+        if other.n == 0:
+            return self
+        if self.n == 0:
+            self.n, self.mean, self.m2 = other.n, other.mean.copy(), other.m2.copy()
+            return self
+        n = self.n + other.n
+        d = other.mean - self.mean
+        self.mean = self.mean + d * (other.n / n)
+        self.m2 = self.m2 + other.m2 + d * d * (self.n * other.n / n)
+        self.n = n
+        return self
+
+    @property
+    def var(self):
+        """样本方差（n - 1 为分母）。"""
+        return self.m2 / (self.n - 1) if self.n > 1 else np.zeros_like(self.mean)
+
+    @property
+    def std(self):
+        return np.sqrt(self.var)
+
+    @property
+    def sem(self):
+        return self.std / math.sqrt(self.n) if self.n > 0 else np.zeros_like(self.mean)
+
+    def ci(self, z=Z_95):
+        """均值的正态近似置信区间 (下界, 上界)，默认 95%。"""
+        half = z * self.sem
+        return self.mean - half, self.mean + half
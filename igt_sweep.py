@@ -0,0 +1,208 @@
+"""
+多核参数扫描：参数网格 × 种子 的笛卡尔积分发到进程池，结果写入内存映射的 .npy 结果表。
+- python igt_sweep.py delta --grid alpha=0.05:0.5:10 temp=0.5,1,1.5 --seeds 50 --out sweep_delta.npy
+- 也可从各智能体脚本进入：python run_delta.py sweep --grid ... （参数相同，省略模型名）
+
+每个任务 (参数组合, 第 k 个种子) 的随机流由 SeedSequence(base_seed, spawn_key=(k,)) 唯一确定，
+与分块方式、worker 数无关；同一个 k 在不同参数组合间共用随机数（公共随机数，比较参数时方差更小）。
+worker 直接把结果行写进内存映射文件，不回传列表；中断后用同一命令重跑即可从未完成的行继续。
+"""
+
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from igt_env import DECK_NAMES, IGTBatchEnv, normalize_decks
+from igt_kernels import MODEL_PARAMS, BatchAgents
+from igt_population import param_grid
+
+N_DECKS = len(DECK_NAMES)
+RESULT_COLUMNS = ["seed", "final_balance", "net_score"] + [f"prop_{k}" for k in DECK_NAMES] + ["done"]
+
+
+def parse_grid_arg(items):
+    """
+    解析 --grid 参数：name=v1,v2,v3 列举取值；name=start:stop:num 为等距取 num 个点。
+    返回 {name: [values]}。
+    """
+    grid = {}
+    for item in items or []:
+        if "=" not in item:
+            raise ValueError(f"网格参数格式应为 name=values: {item}")
+        name, spec = item.split("=", 1)
+        if ":" in spec:
+            start, stop, num = spec.split(":")
+            values = np.linspace(float(start), float(stop), int(num)).tolist()
+        else:
+            values = [float(v) for v in spec.split(",") if v]
+        grid[name.strip()] = values
+    return grid
+
+
+def task_rng(base_seed, seed_index):
+    """第 seed_index 个种子对应的随机流（与参数组合、分块方式无关）。"""
+    return np.random.default_rng(np.random.SeedSequence(base_seed, spawn_key=(int(seed_index),)))
+
+
+def simulate_histories(model, params, seed_indices, base_seed, n_trials, decks=None, initial_balance=2000):
+    """
+    批量模拟一组任务，每个任务用自己的随机流预先抽好全部均匀数，结果与批大小无关。
+    params: {参数名: 长度 M 的数组}；返回 (choices, rewards, final_balance)，前两者形状 (n_trials, M)。
+    """
+    n = len(seed_indices)
+    n_u = 3 if model == "qlearning" else 2  # 选择用 1~2 个，环境罚款用 1 个
+    draws = np.empty((n_trials, n, n_u))
+    for j, k in enumerate(seed_indices):
+        draws[:, j, :] = task_rng(base_seed, k).random((n_trials, n_u))
+    env = IGTBatchEnv(n, decks=decks)
+    env.reset(initial_balance)
+    agents = BatchAgents(model, n, params)
+    choices = np.empty((n_trials, n), dtype=np.int64)
+    rewards = np.empty((n_trials, n), dtype=np.int64)
+    for t in range(n_trials):
+        u = draws[t]
+        choices[t] = agents.choose(u[:, 0], u[:, 1] if model == "qlearning" else None)
+        rewards[t] = env.step(choices[t], u=u[:, -1])
+        agents.update(choices[t], rewards[t])
+    return choices, rewards, env.balances.copy()
+
+
+def simulate_tasks(model, params, seed_indices, base_seed, n_trials, decks=None, initial_balance=2000):
+    """simulate_histories 的汇总版：返回 (M, len(RESULT_COLUMNS)) 的结果行。"""
+    choices, _, final_balance = simulate_histories(
+        model, params, seed_indices, base_seed, n_trials, decks, initial_balance
+    )
+    n = len(seed_indices)
+    counts = np.zeros((n, N_DECKS))
+    for k in range(N_DECKS):
+        counts[:, k] = (choices == k).sum(axis=0)
+    out = np.empty((n, len(RESULT_COLUMNS)))
+    out[:, 0] = seed_indices
+    out[:, 1] = final_balance
+    out[:, 2] = counts[:, 2] + counts[:, 3] - counts[:, 0] - counts[:, 1]
+    out[:, 3:3 + N_DECKS] = counts / max(n_trials, 1)
+    out[:, -1] = 1.0
+    return out
+
+
+def _run_chunk(path, model, param_names, task_ids, n_seeds, base_seed, n_trials, decks):
+    """worker：计算一块任务并直接写入内存映射结果表，只回传完成的行数。"""
+    table = np.load(path, mmap_mode="r+")
+    n_params = len(param_names)
+    params = {k: table[task_ids, i] for i, k in enumerate(param_names)}
+    res = simulate_tasks(model, params, task_ids % n_seeds, base_seed, n_trials, decks)
+    table[task_ids, n_params:] = res
+    table.flush()
+    del table
+    return len(task_ids)
+
+
+def _meta_path(path):
+    return os.path.splitext(path)[0] + ".json"
+
+
+def open_result_table(path, meta, combos, n_seeds, overwrite=False):
+    """
+    创建或续用结果表。表头为参数列 + RESULT_COLUMNS，行号 = 组合序号 * n_seeds + 种子序号。
+    已存在且元数据一致时续用（断点续跑），不一致时报错（或 overwrite 重建）。
+    """
+    meta_file = _meta_path(path)
+    if os.path.exists(path) and os.path.exists(meta_file) and not overwrite:
+        with open(meta_file, "r", encoding="utf-8") as f:
+            old = json.load(f)
+        if old != meta:
+            raise ValueError(f"{path} 已存在且参数不同；换一个 --out 或加 --overwrite")
+        return np.load(path, mmap_mode="r+")
+    names = meta["columns"]
+    table = np.lib.format.open_memmap(path, mode="w+", dtype=np.float64, shape=(len(combos) * n_seeds, len(names)))
+    table[:] = 0.0
+    n_params = len(meta["param_names"])
+    values = np.array([[c[k] for k in meta["param_names"]] for c in combos], dtype=float).reshape(len(combos), n_params)
+    table[:, :n_params] = np.repeat(values, n_seeds, axis=0)
+    table.flush()
+    with open(meta_file, "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+    return table
+
+
+def run_sweep(
+    model, grid, n_seeds, n_trials, out, base_seed=0, decks=None,
+    workers=None, chunk_size=500, overwrite=False, progress=print,
+):
+    """执行参数扫描，返回结果表路径。progress 为进度输出函数（None 则不输出）。"""
+    combos = param_grid(model, grid)
+    param_names = list(MODEL_PARAMS[model])
+    decks = {k: list(v) for k, v in normalize_decks(decks).items()}
+    meta = {
+        "model": model,
+        "param_names": param_names,
+        "grid": {k: list(map(float, np.atleast_1d(v))) for k, v in (grid or {}).items()},
+        "n_seeds": int(n_seeds),
+        "base_seed": int(base_seed),
+        "n_trials": int(n_trials),
+        "decks": decks,
+        "columns": param_names + RESULT_COLUMNS,
+    }
+    table = open_result_table(out, meta, combos, n_seeds, overwrite)
+    todo = np.flatnonzero(table[:, -1] < 1.0)
+    n_total = len(table)
+    del table
+    if progress:
+        progress(f"{model}: {len(combos)} 组参数 × {n_seeds} 个种子 = {n_total} 个任务，待完成 {len(todo)}")
+    if len(todo) == 0:
+        return out
+
+    chunks = [todo[i:i + chunk_size] for i in range(0, len(todo), chunk_size)]
+    done = n_total - len(todo)
+    start = time.perf_counter()
+    finished = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(_run_chunk, out, model, param_names, ids, n_seeds, base_seed, n_trials, decks)
+            for ids in chunks
+        ]
+        for fut in as_completed(futures):
+            finished += fut.result()
+            if progress:
+                elapsed = time.perf_counter() - start
+                eta = elapsed / finished * (len(todo) - finished)
+                progress(f"进度 {done + finished}/{n_total} · 已用 {elapsed:.1f}s · 预计剩余 {eta:.1f}s")
+    return out
+
+
+def main(argv=None, model=None):
+    """命令行入口；从 run_*.py 进入时 model 已确定，不需要再写模型名。"""
+    import argparse
+    p = argparse.ArgumentParser(description="IGT 智能体参数扫描（多进程，结果写入内存映射 .npy）")
+    if model is None:
+        p.add_argument("model", choices=list(MODEL_PARAMS), help="模型")
+    p.add_argument("--grid", nargs="*", default=[], help="参数网格，如 alpha=0.05:0.5:10 temp=0.5,1,1.5")
+    p.add_argument("--seeds", type=int, default=20, help="每组参数的种子（重复）数")
+    p.add_argument("--base-seed", type=int, default=0, help="主种子")
+    p.add_argument("--trials", "-n", type=int, default=100, help="每次运行的轮数")
+    p.add_argument("--out", "-o", required=True, help="结果表路径（.npy），同名 .json 为元数据")
+    p.add_argument("--workers", "-j", type=int, default=None, help="进程数（默认 CPU 核数）")
+    p.add_argument("--chunk", type=int, default=500, help="每个任务块的运行数")
+    p.add_argument("--decks", default=None, help="牌堆配置 JSON 文件（缺省为默认牌堆）")
+    p.add_argument("--overwrite", action="store_true", help="忽略已有结果，重新开始")
+    args = p.parse_args(argv)
+    model = model or args.model
+    decks = None
+    if args.decks:
+        with open(args.decks, "r", encoding="utf-8") as f:
+            decks = json.load(f)
+        decks = decks.get("decks", decks)
+    run_sweep(
+        model, parse_grid_arg(args.grid), args.seeds, args.trials, args.out,
+        base_seed=args.base_seed, decks=decks, workers=args.workers,
+        chunk_size=args.chunk, overwrite=args.overwrite,
+    )
+    print(f"结果已写入 {args.out}（列见 {_meta_path(args.out)}）")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,119 @@
+"""
+提交数据中轨迹的紧凑编码（带版本号）：
+    {"v": 1, "n": 轮数, "choices": "ACDD…", "dtype": "<i2", "rewards": base64(小端整数数组), "initial_balance": 2000}
+选择是每轮一个字母的字符串，收益是 int16（超出范围时 int32）小端数组的 base64，余额不存，
+由 initial_balance + 累计收益推出；轮次即 1..n。
+编码前会校验轨迹符合这些约定（轮次连续、余额与收益一致），不符合时原样保留旧格式。
+
+提交字段对应关系（encode_payload）：字段 X 编码后存为 X_z
+    自己玩   history                          -> history_z
+    模型运行 path_rows（balances 不再单独存）    -> path_rows_z
+    仪表盘   path_{delta,ql,orl}（balances_* 同上） -> path_{delta,ql,orl}_z
+读取方用 history_from_entry / path_rows_from_entry，新旧两种格式都能读；
+可复现提交（只存配方 recipe，见 igt_replay）的路径在读取时按需重新模拟。
+"""
+
+import base64
+
+import numpy as np
+
+from igt_env import DECK_NAMES
+
+TRAJECTORY_VERSION = 1
+
+# 路径字段 -> 对应的余额字段
+PATH_KEYS = {"path_rows": "balances", "path_delta": "balances_delta", "path_ql": "balances_ql", "path_orl": "balances_orl"}
+
+
+def encode_trajectory(choices, rewards, initial_balance=2000):
+    """choices: 牌堆字母序列；rewards: 每轮收益。"""
+    rewards = np.asarray(rewards, dtype=np.int64)
+    small = rewards.size == 0 or (rewards.min() >= -2 ** 15 and rewards.max() < 2 ** 15)
+    dtype = "<i2" if small else "<i4"
+    return {
+        "v": TRAJECTORY_VERSION,
+        "n": int(rewards.size),
+        "choices": "".join(choices),
+        "dtype": dtype,
+        "rewards": base64.b64encode(rewards.astype(dtype).tobytes()).decode("ascii"),
+        "initial_balance": int(initial_balance),
+    }
+
+
+def decode_trajectory(z):
+    """返回 (choices 字符串, rewards int64 数组, balances int64 数组)，balances 为每轮之后的余额。"""
+    if z.get("v") != TRAJECTORY_VERSION:
+        raise ValueError(f"不支持的轨迹编码版本: {z.get('v')}")
+    rewards = np.frombuffer(base64.b64decode(z["rewards"]), dtype=z["dtype"]).astype(np.int64)
+    return z["choices"], rewards, z["initial_balance"] + np.cumsum(rewards)
+
+
+def _encode_rows(choices, rewards, balances, initial_balance):
+    """满足约定（选择为单个牌堆字母、余额 = 初始 + 累计收益）时返回编码，否则 None。"""
+    if any(c not in DECK_NAMES for c in choices):
+        return None
+    derived = initial_balance + np.cumsum(np.asarray(rewards, dtype=np.int64))
+    if not np.array_equal(derived, np.asarray(balances, dtype=np.int64)):
+        return None
+    return encode_trajectory(choices, rewards, initial_balance)
+
+
+def encode_payload(payload):
+    """把提交中的轨迹字段换成紧凑编码（已编码或不符合约定的字段原样保留），返回新 dict。"""
+    out = dict(payload)
+    history = out.get("history")
+    if history:
+        choices, rewards, balances = zip(*history)
+        z = _encode_rows(choices, rewards, balances, balances[0] - rewards[0])
+        if z is not None:
+            out["history_z"] = z
+            del out["history"]
+    for path_key, bal_key in PATH_KEYS.items():
+        rows = out.get(path_key)
+        if not rows:
+            continue
+        ts, choices, rewards, balances = zip(*rows)
+        if list(ts) != list(range(1, len(rows) + 1)):
+            continue
+        stored = out.get(bal_key)
+        initial = stored[0] if stored else balances[0] - rewards[0]
+        z = _encode_rows(choices, rewards, balances, initial)
+        if z is None:
+            continue
+        out[path_key + "_z"] = z
+        del out[path_key]
+        if stored is not None and list(stored) == [initial, *balances]:
+            del out[bal_key]
+    return out
+
+
+def history_from_entry(entry):
+    """自己玩提交的 [(选择, 收益, 余额), ...]。"""
+    if "history" in entry:
+        return [tuple(h) for h in entry["history"]]
+    z = entry.get("history_z")
+    if not z:
+        return []
+    choices, rewards, balances = decode_trajectory(z)
+    return list(zip(choices, rewards.tolist(), balances.tolist()))
+
+
+def path_rows_from_entry(entry, path_key="path_rows"):
+    """模型运行提交的 [(轮次, 选择, 收益, 余额), ...]；仪表盘用 path_key="path_delta" 等。"""
+    if path_key in entry:
+        return [tuple(r) for r in entry[path_key]]
+    z = entry.get(path_key + "_z")
+    if z:
+        choices, rewards, balances = decode_trajectory(z)
+        return list(zip(range(1, len(choices) + 1), choices, rewards.tolist(), balances.tolist()))
+    if "recipe" in entry:
+        from igt_replay import replay_path_rows
+        return list(replay_path_rows(entry["recipe"], path_key))
+    return []
+
+
+def has_path_rows(entry, path_key="path_rows"):
+    if "recipe" in entry:
+        return path_key in entry["recipe"].get("checksum", {})
+    return entry.get(path_key) is not None or entry.get(path_key + "_z") is not None
+
@@ -2,13 +2,17 @@
 实验室 1：自己玩 - 手动选牌堆，观察余额与奖惩。
 布局：左上日志、左下历史表；右上牌堆比例、右下收益曲线。日志区可点击切换为牌堆选择柱状图。
 可视化下方有分析按钮，完成 100 轮后可点击生成 IGT 策略诊断报告。
+每次选牌同时增量更新模型后验（igt_online），操作区下方实时显示「最像哪个模型」。
+计数、累计比例与余额曲线由 session 中的 PlayStats 逐轮 O(1) 维护，图表直接读取。
 """
 
 import streamlit as st
+import numpy as np
 import pandas as pd
-from collections import Counter
-from igt_env import IGTEnv
+from igt_env import IGTEnv, PlayStats
 from igt_analysis import analyze_igt_history, IGT_N_TRIALS
+from igt_fit import MODEL_LABELS
+from igt_online import OnlinePosterior
 from auth import is_logged_in, get_user_id, get_nickname
 from submission_store import add_submission
 from deck_config import get_decks, get_allow_user_edit
@@ -36,6 +40,13 @@ if "balance" not in st.session_state:
 
 env = st.session_state.env
 st.session_state.balance = env.balance
+# 在线模型后验与 env 同步；session 中没有或轮数对不上时按 history 重建
+post = st.session_state.get("online_post")
+if post is None or post.n != len(env.history):
+    post = st.session_state.online_post = OnlinePosterior.from_history(env.history)
+stats = st.session_state.get("play_stats")
+if stats is None or stats.n != len(env.history):
+    stats = st.session_state.play_stats = PlayStats.from_history(env.history)
 
 # 语言切换（侧栏）
 with st.sidebar:
@@ -61,6 +72,8 @@ for i, deck in enumerate(IGTEnv.DECK_NAMES):
     with [col1, col2, col3, col4][i]:
         if st.button(t("deck_btn", deck=deck), key=f"deck_{deck}", disabled=game_over):
             reward = env.step(deck)
+            post.update(i, reward)
+            stats.update(i, env.balance)
             st.session_state.balance = env.balance
             st.rerun()
 
@@ -68,11 +81,22 @@ if env.history:
     last_choice, last_reward, _ = env.history[-1]
     sign = "+" if last_reward >= 0 else ""
     st.info(t("last_choice", deck=last_choice, sign=sign, reward=last_reward))
+    live = post.summary()
+    st.markdown("**" + t("live_model_title") + "** · " + t(
+        "live_model_best", model=live["best_label"], p=live["probs"][live["best"]], n=live["n"]
+    ))
+    live_cols = st.columns(len(live["probs"]))
+    for col, (m, prob) in zip(live_cols, live["probs"].items()):
+        with col:
+            st.progress(prob, text=f"{MODEL_LABELS[m]} {prob:.0%}")
+    st.caption(t("live_model_caption"))
 
 if st.button(t("btn_reset"), type="secondary"):
     st.session_state.env = IGTEnv(decks=st.session_state.igt_decks)
     st.session_state.env.reset(initial_balance=2000)
     st.session_state.balance = 2000
+    st.session_state.online_post = OnlinePosterior()
+    st.session_state.play_stats = PlayStats()
     st.session_state.pop("igt_analysis_report", None)
     st.rerun()
 
@@ -83,16 +107,19 @@ col_left, col_right = st.columns([1, 1])
 decks = list(IGTEnv.DECK_NAMES)
 with col_left:
     st.caption(t("history_label"))
-    if env.history:
-        records = [
-            {t("col_round"): i, t("col_choice"): c, t("col_reward"): r, t("col_balance"): b}
-            for i, (c, r, b) in enumerate(env.history, 1)
-        ]
-        records.reverse()
+    history = env.history
+    if history:
+        n = len(history)
+        # 直接读历史缓冲的只读数组视图，最新在上
+        records = {
+            t("col_round"): np.arange(n, 0, -1),
+            t("col_choice"): np.array(decks)[history.choices[::-1]],
+            t("col_reward"): history.rewards[::-1],
+            t("col_balance"): history.balances[::-1],
+        }
         st.dataframe(records, use_container_width=True, height=240, hide_index=True)
         st.caption(t("bar_chart_caption"))
-        counts = Counter(h[0] for h in env.history)
-        df_bar = pd.DataFrame({t("col_count"): [counts.get(d, 0) for d in decks]}, index=decks)
+        df_bar = pd.DataFrame({t("col_count"): stats.counts}, index=decks)
         st.bar_chart(df_bar, height=260)
     else:
         st.dataframe([], use_container_width=True, height=240, hide_index=True)
@@ -101,21 +128,13 @@ with col_left:
         st.bar_chart(df_bar, height=260)
 
 with col_right:
-    if env.history:
-        counts = {d: 0 for d in decks}
-        prop_a, prop_b, prop_c, prop_d = [], [], [], []
-        for choice, _, _ in env.history:
-            counts[choice] = counts.get(choice, 0) + 1
-            tot = sum(counts.values())
-            prop_a.append(counts["A"] / tot)
-            prop_b.append(counts["B"] / tot)
-            prop_c.append(counts["C"] / tot)
-            prop_d.append(counts["D"] / tot)
+    if history:
+        # 累积选牌比例与余额序列由 PlayStats 逐轮维护
+        props = stats.proportions
         st.caption(t("prop_caption"))
-        st.line_chart({"A": prop_a, "B": prop_b, "C": prop_c, "D": prop_d}, height=260)
+        st.line_chart({d: props[:, i] for i, d in enumerate(decks)}, height=260)
         st.caption(t("balance_curve"))
-        balances = [2000] + [h[2] for h in env.history]
-        st.line_chart({t("col_balance"): balances}, height=260)
+        st.line_chart({t("col_balance"): stats.balances}, height=260)
     else:
         st.caption(t("empty_chart"))
 
@@ -140,12 +159,12 @@ if not can_analyze:
 
 # 点击分析后保存报告到 session_state
 if analyze_clicked and can_analyze:
-    st.session_state.igt_analysis_report = analyze_igt_history(env.history)
+    st.session_state.igt_analysis_report = analyze_igt_history(env.history, decks=env.decks)
     st.rerun()
 
 def _self_play_payload():
     return {
-        "history": env.history,
+        "history": env.history_list(),
         "balance": env.balance,
         "n_rounds": len(env.history),
         "decks": dict(st.session_state.igt_decks),
@@ -222,3 +241,34 @@ if summary and len(env.history) >= IGT_N_TRIALS:
         st.markdown("---")
         st.markdown("### " + t("report_model"))
         st.markdown(summary["model_match"])
+        fit = summary.get("fit")
+        if fit:
+            st.dataframe(
+                [
+                    {
+                        t("fit_model"): MODEL_LABELS[m],
+                        t("fit_loglik"): round(f["log_lik"], 1),
+                        "AIC": round(f["aic"], 1),
+                        "BIC": round(f["bic"], 1),
+                        t("fit_weight"): f"{fit['weights'][m]:.1%}",
+                        t("fit_params"): ", ".join(f"{k}={v:.3g}" for k, v in f["params"].items()),
+                    }
+                    for m, f in fit["fits"].items()
+                ],
+                use_container_width=True,
+                hide_index=True,
+            )
+        risk = summary.get("risk")
+        if risk:
+            st.markdown("---")
+            st.markdown("### " + t("report_risk"))
+            st.markdown(t(
+                "report_risk_text",
+                mean=risk["expected_balance"],
+                std=risk["std"],
+                lo=2000 + risk["quantiles"][0.05],
+                hi=2000 + risk["quantiles"][0.95],
+                p_loss=risk["prob_loss"],
+                actual=risk["actual_balance"],
+                pct=risk["actual_percentile"],
+            ))
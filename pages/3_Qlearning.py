@@ -8,6 +8,8 @@ import pandas as pd
 from collections import Counter
 from igt_env import IGTEnv
 from run_qlearning import run_qlearning_step_by_step
+from igt_runlog import show_run_log
+from igt_replay import make_recipe
 from auth import is_logged_in, get_user_id, get_nickname
 from submission_store import add_submission
 from i18n import t, get_lang, set_lang
@@ -60,22 +62,26 @@ if run_clicked:
         chart_ph = st.empty()
 
     with st.spinner(t("spinner_ql")):
-        path_rows, balances, log_lines = run_qlearning_step_by_step(
+        path_rows, balances, run_log = run_qlearning_step_by_step(
             env, n_trials, alpha, epsilon, gamma, seed, step_delay,
             log_ph, balance_ph, path_ph, prop_ph, chart_ph,
         )
     st.session_state.ql_result = {
         "path_rows": path_rows,
         "balances": balances,
-        "log_lines": log_lines,
+        "run_log": run_log,
         "final_balance": env.balance,
         "n_trials": n_trials,
+        "decks": dict(st.session_state.igt_decks),
+        "recipe": make_recipe(
+            "qlearning", {"alpha": alpha, "epsilon": epsilon, "gamma": gamma}, seed, n_trials, st.session_state.igt_decks, path_rows,
+        ),
     }
     st.rerun()
 
 if st.session_state.get("ql_result"):
     res = st.session_state.ql_result
-    path_rows, balances, log_lines = res["path_rows"], res["balances"], res["log_lines"]
+    path_rows, balances, run_log = res["path_rows"], res["balances"], res["run_log"]
     decks = list(IGTEnv.DECK_NAMES)
     counts = Counter(r[1] for r in path_rows)
 
@@ -90,10 +96,10 @@ if st.session_state.get("ql_result"):
                 get_user_id(),
                 get_nickname(),
                 {
-                    "path_rows": path_rows,
-                    "balances": balances,
+                    "recipe": res["recipe"],
                     "n_trials": res["n_trials"],
                     "final_balance": res["final_balance"],
+                    "decks": res["decks"],
                 },
             )
             st.success(t("submitted_thanks"))
@@ -103,14 +109,7 @@ if st.session_state.get("ql_result"):
         st.caption(t("history_label"))
         with st.expander(t("explain_title"), expanded=False):
             st.caption("模型每轮以 ε 探索/利用选择牌堆，用 Q-learning 更新 Q 值。")
-            st.text_area(
-                "运行日志",
-                value="\n".join(log_lines),
-                height=280,
-                disabled=True,
-                label_visibility="collapsed",
-                key="ql_log_view",
-            )
+            show_run_log(run_log, key="ql_log", labels={"search": t("log_search"), "page": t("log_page"), "matches": t("log_matches")})
         st.dataframe(
             [{t("col_round"): r[0], t("col_choice"): r[1], t("col_reward"): r[2], t("col_balance"): r[3]} for r in path_rows[-30:]],
             use_container_width=True,
@@ -8,6 +8,8 @@ import pandas as pd
 from collections import Counter
 from igt_env import IGTEnv
 from run_orl import run_orl_step_by_step
+from igt_runlog import show_run_log
+from igt_replay import make_recipe
 from auth import is_logged_in, get_user_id, get_nickname
 from submission_store import add_submission
 from i18n import t, get_lang, set_lang
@@ -63,7 +65,7 @@ if run_clicked:
         freq_chart_ph = st.empty()
 
     with st.spinner(t("spinner_orl")):
-        path_rows, balances, ef_history, log_lines = run_orl_step_by_step(
+        path_rows, balances, ef_history, run_log = run_orl_step_by_step(
             env, n_trials, alpha_v, alpha_f, W_v, W_f, temp, seed, step_delay,
             log_ph, balance_ph, path_ph, prop_ph, chart_ph, freq_chart_ph,
         )
@@ -72,10 +74,14 @@ if run_clicked:
         "path_rows": path_rows,
         "balances": balances,
         "ef_history": ef_history,
-        "log_lines": log_lines,
+        "run_log": run_log,
         "final_balance": env.balance,
         "n_trials": n_trials,
         "decks": decks,
+        "recipe": make_recipe(
+            "orl", {"alpha_v": alpha_v, "alpha_f": alpha_f, "W_v": W_v, "W_f": W_f, "temp": temp},
+            seed, n_trials, st.session_state.igt_decks, path_rows,
+        ),
     }
     st.rerun()
 
@@ -83,7 +89,7 @@ if st.session_state.get("orl_result"):
     res = st.session_state.orl_result
     path_rows = res["path_rows"]
     balances = res["balances"]
-    log_lines = res["log_lines"]
+    run_log = res["run_log"]
     ef_history = res["ef_history"]
     decks = res["decks"]
     counts = Counter(r[1] for r in path_rows)
@@ -99,10 +105,10 @@ if st.session_state.get("orl_result"):
                 get_user_id(),
                 get_nickname(),
                 {
-                    "path_rows": path_rows,
-                    "balances": balances,
+                    "recipe": res["recipe"],
                     "n_trials": res["n_trials"],
                     "final_balance": res["final_balance"],
+                    "decks": res["recipe"]["decks"],
                 },
             )
             st.success(t("submitted_thanks"))
@@ -112,14 +118,7 @@ if st.session_state.get("orl_result"):
         st.caption(t("history_label"))
         with st.expander(t("explain_title"), expanded=False):
             st.caption("模型每轮根据 V（金额）与 Ef（赢钱频率）加权得分、Softmax 得出选择。")
-            st.text_area(
-                "运行日志",
-                value="\n".join(log_lines),
-                height=280,
-                disabled=True,
-                label_visibility="collapsed",
-                key="orl_log_view",
-            )
+            show_run_log(run_log, key="orl_log", labels={"search": t("log_search"), "page": t("log_page"), "matches": t("log_matches")})
         st.dataframe(
             [{t("col_round"): r[0], t("col_choice"): r[1], t("col_reward"): r[2], t("col_balance"): r[3]} for r in path_rows[-30:]],
             use_container_width=True,
@@ -1,20 +1,55 @@
 """
 仪表盘对比：同时配置 Delta、Q-learning、ORL 参数，可逐步运行并实时查看图表变化。
+可开启公共随机数：三个环境共用一条逐牌堆结果带（OutcomeTape），比较更公平、方差更小。
+逐步运行时维护累计选择计数，按帧率刷新：折线图只追加新点（add_rows），柱状图只改柱高，不重建图。
 """
 
 import time
 import streamlit as st
 import numpy as np
+import pandas as pd
 import matplotlib.pyplot as plt
 from igt_env import IGTEnv
-from run_delta import run_delta_one_step
-from run_qlearning import run_qlearning_one_step
-from run_orl import run_orl_one_step
+from igt_replay import dashboard_steps, make_recipe
+from igt_population import simulate_population
+from igt_render import DEFAULT_MAX_FPS, RenderScheduler
 from auth import is_logged_in, get_user_id, get_nickname
 from submission_store import add_submission
 from deck_config import get_decks, get_allow_user_edit
 from i18n import t, get_lang, set_lang
 
+MODEL_LABELS = ("Delta", "Q-learning", "ORL")
+MODEL_COLORS = ("#4A90D9", "#E67E22", "#27AE60")
+
+plt.rcParams["font.sans-serif"] = ["Arial Unicode MS", "SimHei", "DejaVu Sans"]
+plt.rcParams["axes.unicode_minus"] = False
+
+
+def prop_figure(decks):
+    """建一次三模型分组柱状图，返回 (fig, 每个模型的柱子)；之后只用 set_props 改柱高。"""
+    fig, ax = plt.subplots(figsize=(8, 4))
+    x = np.arange(len(decks))
+    w = 0.25
+    bars = [
+        ax.bar(x + (i - 1) * w, np.zeros(len(decks)), w, label=label, color=color)
+        for i, (label, color) in enumerate(zip(MODEL_LABELS, MODEL_COLORS))
+    ]
+    ax.set_xticks(x)
+    ax.set_xticklabels(decks)
+    ax.set_ylabel("选择占比")
+    ax.set_xlabel("牌堆")
+    ax.legend()
+    ax.set_ylim(0, 1)
+    return fig, bars
+
+
+def set_props(bars, props):
+    """props: (模型数, 牌堆数) 选择占比。"""
+    for container, row in zip(bars, props):
+        for rect, p in zip(container, row):
+            rect.set_height(p)
+
+
 st.set_page_config(page_title="仪表盘对比 · IGT", page_icon="📊", layout="wide")
 if "lang" not in st.session_state:
     st.session_state.lang = "zh"
@@ -66,77 +101,58 @@ with c3:
     orl_W_f = st.slider("ORL W_f", 0.0, 1.0, 0.5, 0.05, key="orl_wf")
     orl_temp = st.slider("ORL " + t("temp"), 0.1, 3.0, 1.5, 0.1, key="orl_temp")
 
+crn = st.checkbox(t("crn_toggle"), value=True, help=t("crn_help"), key="dash_crn")
 run_clicked = st.button(t("run_all"), type="primary")
 
 if run_clicked:
     decks = list("ABCD")
-    np.random.seed(seed)
-    env_d = IGTEnv(seed=seed, decks=st.session_state.igt_decks)
-    env_q = IGTEnv(seed=seed, decks=st.session_state.igt_decks)
-    env_o = IGTEnv(seed=seed, decks=st.session_state.igt_decks)
-    env_d.reset(2000)
-    env_q.reset(2000)
-    env_o.reset(2000)
-    V_d = {a: 0.0 for a in decks}
-    Q_q = {a: 0.0 for a in decks}
-    V_o = {a: 0.0 for a in decks}
-    Ef_o = {a: 0.0 for a in decks}
+    # 三个模型按轮同步的逐步记录（随机流派生与公共随机数见 igt_replay.dashboard_steps，提交后可按配方复现）
+    params = {
+        "delta": {"alpha": delta_alpha, "temp": delta_temp},
+        "qlearning": {"alpha": ql_alpha, "epsilon": ql_epsilon, "gamma": ql_gamma},
+        "orl": {"alpha_v": orl_alpha_v, "alpha_f": orl_alpha_f, "W_v": orl_W_v, "W_f": orl_W_f, "temp": orl_temp},
+    }
+    steps = dashboard_steps(seed, st.session_state.igt_decks, n_trials, params, crn)
 
     path_d, path_q, path_o = [], [], []
     bal_d, bal_q, bal_o = [2000], [2000], [2000]
+    counts = np.zeros((len(MODEL_LABELS), len(decks)), dtype=np.int64)  # 各模型的牌堆选择计数
 
     st.subheader("总收益对比（折线图）")
     line_ph = st.empty()
+    line_chart = line_ph.line_chart(pd.DataFrame({m: [0] for m in MODEL_LABELS}), height=320)
     st.subheader("牌组选择占比（柱状图）")
     bar_ph = st.empty()
+    fig, bars = prop_figure(decks)
 
-    def proportions(path_rows):
-        c = {x: 0 for x in decks}
-        for (_, choice, _, _) in path_rows:
-            c[choice] += 1
-        n = len(path_rows) or 1
-        return [c[x] / n for x in decks]
-
+    sched = RenderScheduler(DEFAULT_MAX_FPS)
+    rendered = 0  # 已推送到折线图的轮数
     with st.spinner("正在逐步运行三组模型…"):
-        for step in range(1, n_trials + 1):
-            choice_d, r_d, V_d = run_delta_one_step(env_d, V_d, delta_alpha, delta_temp)
-            choice_q, r_q, Q_q = run_qlearning_one_step(env_q, Q_q, ql_alpha, ql_epsilon, ql_gamma)
-            choice_o, r_o, V_o, Ef_o = run_orl_one_step(env_o, V_o, Ef_o, orl_alpha_v, orl_alpha_f, orl_W_v, orl_W_f, orl_temp)
-
-            path_d.append((step, choice_d, r_d, env_d.balance))
-            path_q.append((step, choice_q, r_q, env_q.balance))
-            path_o.append((step, choice_o, r_o, env_o.balance))
-            bal_d.append(env_d.balance)
-            bal_q.append(env_q.balance)
-            bal_o.append(env_o.balance)
-
-            reward_d = [b - 2000 for b in bal_d]
-            reward_q = [b - 2000 for b in bal_q]
-            reward_o = [b - 2000 for b in bal_o]
-            line_ph.line_chart({"Delta": reward_d, "Q-learning": reward_q, "ORL": reward_o}, height=320)
-
-            prop_d = proportions(path_d)
-            prop_q = proportions(path_q)
-            prop_o = proportions(path_o)
-            plt.rcParams["font.sans-serif"] = ["Arial Unicode MS", "SimHei", "DejaVu Sans"]
-            plt.rcParams["axes.unicode_minus"] = False
-            fig, ax = plt.subplots(figsize=(8, 4))
-            x = np.arange(len(decks))
-            w = 0.25
-            ax.bar(x - w, prop_d, w, label="Delta", color="#4A90D9")
-            ax.bar(x, prop_q, w, label="Q-learning", color="#E67E22")
-            ax.bar(x + w, prop_o, w, label="ORL", color="#27AE60")
-            ax.set_xticks(x)
-            ax.set_xticklabels(decks)
-            ax.set_ylabel("选择占比")
-            ax.set_xlabel("牌堆")
-            ax.legend()
-            ax.set_ylim(0, 1)
-            bar_ph.pyplot(fig)
-            plt.close()
+        for rec_d, rec_q, rec_o in steps:
+            step = rec_d.t
+            path_d.append((step, decks[rec_d.choice], rec_d.reward, rec_d.balance))
+            path_q.append((step, decks[rec_q.choice], rec_q.reward, rec_q.balance))
+            path_o.append((step, decks[rec_o.choice], rec_o.reward, rec_o.balance))
+            bal_d.append(rec_d.balance)
+            bal_q.append(rec_q.balance)
+            bal_o.append(rec_o.balance)
+            counts[0, rec_d.choice] += 1
+            counts[1, rec_q.choice] += 1
+            counts[2, rec_o.choice] += 1
+
+            # 到帧时只追加新增的点、只改柱高，不重建整张图
+            if sched.due(step, last=step == n_trials):
+                line_chart.add_rows(pd.DataFrame(
+                    {m: [b - 2000 for b in bal[rendered + 1:]] for m, bal in zip(MODEL_LABELS, (bal_d, bal_q, bal_o))},
+                    index=range(rendered + 1, step + 1),
+                ))
+                rendered = step
+                set_props(bars, counts / step)
+                bar_ph.pyplot(fig)
 
             if step_delay > 0:
                 time.sleep(step_delay)
+    plt.close(fig)
 
     st.session_state.dashboard = {
         "n_trials": n_trials,
@@ -147,6 +163,11 @@ if run_clicked:
         "balances_ql": bal_q,
         "balances_orl": bal_o,
         "decks": dict(st.session_state.igt_decks),
+        "crn": crn,
+        "recipe": make_recipe(
+            "dashboard", params, seed, n_trials, st.session_state.igt_decks,
+            {"path_delta": path_d, "path_ql": path_q, "path_orl": path_o}, crn=crn,
+        ),
     }
     st.rerun()
 
@@ -170,32 +191,11 @@ if "dashboard" in st.session_state:
 
     st.subheader("牌组选择占比")
     decks = list("ABCD")
-    def proportions(path_rows):
-        c = {x: 0 for x in decks}
-        for (_, choice, _, _) in path_rows:
-            c[choice] += 1
-        return [c[x] / len(path_rows) for x in decks]
-
-    prop_d = proportions(path_d)
-    prop_q = proportions(path_q)
-    prop_o = proportions(path_o)
-
-    plt.rcParams["font.sans-serif"] = ["Arial Unicode MS", "SimHei", "DejaVu Sans"]
-    plt.rcParams["axes.unicode_minus"] = False
-    fig, ax = plt.subplots(figsize=(8, 4))
-    x = np.arange(len(decks))
-    w = 0.25
-    ax.bar(x - w, prop_d, w, label="Delta", color="#4A90D9")
-    ax.bar(x, prop_q, w, label="Q-learning", color="#E67E22")
-    ax.bar(x + w, prop_o, w, label="ORL", color="#27AE60")
-    ax.set_xticks(x)
-    ax.set_xticklabels(decks)
-    ax.set_ylabel("选择占比")
-    ax.set_xlabel("牌堆")
-    ax.legend()
-    ax.set_ylim(0, 1)
+    counts = np.array([[sum(1 for r in path if r[1] == x) for x in decks] for path in (path_d, path_q, path_o)])
+    fig, bars = prop_figure(decks)
+    set_props(bars, counts / max(len(path_d), 1))
     st.pyplot(fig)
-    plt.close()
+    plt.close(fig)
 
     st.subheader(t("history_label"))
     def make_log(path_rows):
@@ -217,17 +217,45 @@ if "dashboard" in st.session_state:
             get_user_id(),
             get_nickname(),
             {
+                "recipe": d["recipe"],
                 "n_trials": n,
-                "path_delta": path_d,
-                "path_ql": path_q,
-                "path_orl": path_o,
-                "balances_delta": bal_d,
-                "balances_ql": bal_q,
-                "balances_orl": bal_o,
                 "decks": d.get("decks", dict(st.session_state.igt_decks)),
+                "crn": d.get("crn", False),
             },
         )
         st.success(t("submitted_thanks"))
         st.rerun()
 else:
     st.info("👆 " + t("hint_dash"))
+
+# 群体平均：三模型各用当前参数重复 N 次，批量模拟后对比平均余额与 5%~95% 区间
+st.markdown("---")
+st.subheader(t("pop_title"))
+st.caption(t("pop_caption"))
+pop_col, _ = st.columns([1, 3])
+with pop_col:
+    n_rep = st.number_input(t("pop_replicates"), min_value=10, max_value=20000, value=1000, step=100, key="pop_rep")
+if st.button(t("pop_run"), key="pop_run"):
+    pop_params = {
+        "Delta": ("delta", {"alpha": delta_alpha, "temp": delta_temp}),
+        "Q-learning": ("qlearning", {"alpha": ql_alpha, "epsilon": ql_epsilon, "gamma": ql_gamma}),
+        "ORL": ("orl", {"alpha_v": orl_alpha_v, "alpha_f": orl_alpha_f, "W_v": orl_W_v, "W_f": orl_W_f, "temp": orl_temp}),
+    }
+    with st.spinner(t("pop_spinner")):
+        st.session_state.dashboard_population = {
+            name: simulate_population(model, grid, n_replicates=n_rep, n_trials=n_trials, decks=st.session_state.igt_decks, seed=seed)
+            for name, (model, grid) in pop_params.items()
+        }
+if "dashboard_population" in st.session_state:
+    pop = st.session_state.dashboard_population
+    st.caption(t("pop_mean_curve", n=next(iter(pop.values()))["n_replicates"]))
+    st.line_chart({name: r["mean_balance"][0] - 2000 for name, r in pop.items()}, height=300)
+    st.caption(t("pop_band"))
+    band = {}
+    for name, r in pop.items():
+        lo, _, hi = r["quantile_balance"][:, 0, :]
+        band[f"{name} 5%"] = lo - 2000
+        band[f"{name} 95%"] = hi - 2000
+    st.line_chart(band, height=300)
+    st.caption(t("pop_prop"))
+    st.bar_chart(pd.DataFrame({name: r["overall_prop"][0] for name, r in pop.items()}, index=list(IGTEnv.DECK_NAMES)), height=260)
@@ -0,0 +1,258 @@
+"""
+算法对比：Delta / Q-learning / ORL 各跑 R 次 × T 轮（同一牌堆、默认参数），比较余额曲线与选牌比例。
+- python run_agents.py                         （默认每个模型 20 次 × 1000 轮，弹出对比图）
+- python run_agents.py -r 10000 -n 100 -j 8 --out compare --no-show
+- python run_agents.py -r 500 --crn   （公共随机数：各模型共用逐牌堆结果带，配对差值的置信区间更窄）
+
+每个模型的 R 次重复按批（--batch）批量模拟并分发到进程池；每批只回传 Welford 流式统计量
+（每轮余额、每轮选牌比例、整局选牌比例、最终余额的均值与方差），主进程合并，内存与 R 无关。
+输出 <out>.png（均值 ± 95% 置信带）、<out>.npz 与 <out>.csv（逐轮均值与置信区间），
+并打印各模型与第一个模型最终余额的配对差值。
+"""
+
+import json
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from igt_env import DECK_NAMES, IGTBatchEnv, OutcomeTape
+from igt_fit import MODEL_LABELS
+from igt_kernels import BatchAgents
+from igt_stats import Z_95, RunningStats
+
+N_DECKS = len(DECK_NAMES)
+MODELS = ("delta", "qlearning", "orl")
+STAT_KEYS = ("balance", "choice", "overall_prop", "final_balance")
+
+
+def _empty_stats(n_trials):
+    return {
+        "balance": RunningStats((n_trials + 1,)),
+        "choice": RunningStats((n_trials, N_DECKS)),
+        "overall_prop": RunningStats((N_DECKS,)),
+        "final_balance": RunningStats(),
+    }
+
+
+def run_batch(model, n_runs, n_trials, seed, batch_index, params=None, decks=None, tape=None, initial_balance=2000):
+    """
+    批量模拟一批 n_runs 次运行，返回 (该批的流式统计量 {名称: RunningStats}, 最终余额数组)。
+    每轮只在 (n_runs,) 的数组上更新统计，不保存整条路径；随机流由 (seed, 模型, 批序号) 确定。
+    tape 为 OutcomeTape 时罚款取自结果带（公共随机数），同一批中各模型的第 i 次运行共用第 i 条带。
+    """
+    # 公共随机数模式下，选牌用的均匀数也按 (seed, 批序号) 在各模型间共用
+    key = len(MODELS) if tape is not None else MODELS.index(model)
+    ss = np.random.SeedSequence(seed, spawn_key=(key, int(batch_index)))
+    env_rng, agent_rng = (np.random.default_rng(s) for s in ss.spawn(2))
+    env = IGTBatchEnv(n_runs, decks=decks, rng=env_rng, tape=tape)
+    env.reset(initial_balance)
+    agents = BatchAgents(model, n_runs, params)
+    bal_mean = np.empty(n_trials + 1)
+    bal_m2 = np.zeros(n_trials + 1)
+    bal_mean[0] = initial_balance
+    counts = np.zeros((n_trials, N_DECKS))
+    rows = np.arange(n_runs)
+    totals = np.zeros((n_runs, N_DECKS))
+    for t in range(n_trials):
+        u = agent_rng.random(n_runs)
+        u_pick = agent_rng.random(n_runs) if model == "qlearning" or tape is not None else None
+        choices = agents.choose(u, u_pick if model == "qlearning" else None)
+        agents.update(choices, env.step(choices))
+        bal = env.balances
+        bal_mean[t + 1] = bal.mean()
+        bal_m2[t + 1] = ((bal - bal_mean[t + 1]) ** 2).sum()
+        counts[t] = np.bincount(choices, minlength=N_DECKS)
+        totals[rows, choices] += 1
+    p = counts / n_runs
+    stats = _empty_stats(n_trials)
+    stats["balance"].merge(RunningStats.from_moments(n_runs, bal_mean, bal_m2))
+    # 选牌指示变量的离差平方和：n·p·(1 - p)
+    stats["choice"].merge(RunningStats.from_moments(n_runs, p, n_runs * p * (1.0 - p)))
+    stats["overall_prop"].update_batch(totals / max(n_trials, 1))
+    stats["final_balance"].update_batch(env.balances)
+    return stats, env.balances.copy()
+
+
+def run_batch_models(models, n_runs, n_trials, seed, batch_index, params=None, decks=None, crn=False):
+    """
+    一批 n_runs 次运行依次交给每个模型，返回 ({模型: 统计量}, {模型: 与第一个模型最终余额之差的统计})。
+    crn=True 时各模型共用一条由 (seed, 批序号) 确定的结果带，配对差值的方差显著更小。
+    """
+    params = params or {}
+    tape = None
+    if crn:
+        # spawn_key 第一位取 len(MODELS) + 1，与各模型自己的随机流、共用的选牌随机流都错开
+        tape = OutcomeTape(n_runs, seed=np.random.SeedSequence(seed, spawn_key=(len(MODELS) + 1, int(batch_index))))
+    stats, finals = {}, {}
+    for m in models:
+        stats[m], finals[m] = run_batch(m, n_runs, n_trials, seed, batch_index, params.get(m), decks, tape)
+    base = finals[models[0]]
+    diffs = {}
+    for m in models[1:]:
+        diffs[m] = RunningStats()
+        diffs[m].update_batch(finals[m] - base)
+    return stats, diffs
+
+
+def compare_agents(
+    models=MODELS, n_runs=20, n_trials=1000, seed=42, params=None, decks=None,
+    batch_size=1000, workers=None, crn=False, progress=print,
+):
+    """
+    各模型跑 n_runs 次并合并流式统计，返回 (results, diffs)：
+      results {模型: {名称: RunningStats}}；diffs {模型: 该模型与 models[0] 最终余额配对差的 RunningStats}。
+    params: {模型: {参数: 值}}，缺省为 MODEL_PARAMS；workers=1 时不开进程池；crn 为公共随机数模式。
+    """
+    models = tuple(models)
+    batches = [(b, min(batch_size, n_runs - s)) for b, s in enumerate(range(0, n_runs, batch_size))]
+    results = {m: _empty_stats(n_trials) for m in models}
+    diffs = {m: RunningStats() for m in models[1:]}
+    start = time.perf_counter()
+
+    def collect(outputs):
+        done = 0
+        for (_, size), (stats, batch_diffs) in zip(batches, outputs):
+            for m in models:
+                for k in STAT_KEYS:
+                    results[m][k].merge(stats[m][k])
+            for m, d in batch_diffs.items():
+                diffs[m].merge(d)
+            done += size
+            if progress:
+                progress(f"{done}/{n_runs} 次 × {len(models)} 个模型 · {time.perf_counter() - start:.1f}s")
+
+    args = [(models, size, n_trials, seed, b, params, decks, crn) for b, size in batches]
+    if workers == 1:
+        collect(run_batch_models(*a) for a in args)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            collect(pool.map(run_batch_models, *zip(*args)))
+    return results, diffs
+
+
+def summary_arrays(results):
+    """合并后的统计 -> 扁平数组字典（键为 <模型>_<量>），供 .npz 保存与绘图。"""
+    out = {}
+    for m, stats in results.items():
+        for k in STAT_KEYS:
+            s = stats[k]
+            lo, hi = s.ci()
+            out[f"{m}_{k}_mean"] = s.mean
+            out[f"{m}_{k}_std"] = s.std
+            out[f"{m}_{k}_lo"] = lo
+            out[f"{m}_{k}_hi"] = hi
+        out[f"{m}_n_runs"] = np.array(stats["final_balance"].n)
+    return out
+
+
+def save_npz(path, results, diffs=None):
+    arrays = summary_arrays(results)
+    for m, d in (diffs or {}).items():
+        lo, hi = d.ci()
+        arrays.update({f"{m}_diff_mean": d.mean, f"{m}_diff_std": d.std, f"{m}_diff_lo": lo, f"{m}_diff_hi": hi})
+    np.savez_compressed(path, models=np.array(list(results)), decks=np.array(DECK_NAMES), **arrays)
+
+
+def _cell(x):
+    return f"{x:.6g}" if isinstance(x, (float, np.floating)) else str(x)
+
+
+def save_csv(path, results):
+    """逐轮长表：model, trial, 余额均值与 95% CI, 各牌堆选择比例均值与 95% CI。"""
+    header = ["model", "trial", "balance_mean", "balance_lo", "balance_hi"]
+    for d in DECK_NAMES:
+        header += [f"prop_{d}_mean", f"prop_{d}_lo", f"prop_{d}_hi"]
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        f.write(",".join(header) + "\n")
+        for m, stats in results.items():
+            bal, ch = stats["balance"], stats["choice"]
+            b_lo, b_hi = bal.ci()
+            c_lo, c_hi = ch.ci()
+            for t in range(len(bal.mean)):
+                row = [m, t, bal.mean[t], b_lo[t], b_hi[t]]
+                for j in range(N_DECKS):
+                    row += [ch.mean[t - 1, j], c_lo[t - 1, j], c_hi[t - 1, j]] if t > 0 else ["", "", ""]
+                f.write(",".join(_cell(x) for x in row) + "\n")
+
+
+def plot_comparison(results, path=None, show=True):
+    """两幅图：余额均值 ± 95% CI；每轮选好牌（C + D）比例均值 ± 95% CI。"""
+    import matplotlib
+    if not show:
+        matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(13, 4.5))
+    for m, stats in results.items():
+        label = f"{MODEL_LABELS[m]} (R={stats['final_balance'].n})"
+        bal = stats["balance"]
+        x = np.arange(len(bal.mean))
+        lo, hi = bal.ci()
+        ax1.plot(x, bal.mean, label=label)
+        ax1.fill_between(x, lo, hi, alpha=0.25)
+        ch = stats["choice"]
+        good = ch.mean[:, 2] + ch.mean[:, 3]
+        # 选 C 或 D 本身也是指示变量，方差为 p(1 - p)
+        half = Z_95 * np.sqrt(good * (1.0 - good) / max(ch.n, 1))
+        xt = np.arange(1, len(good) + 1)
+        ax2.plot(xt, good, label=label)
+        ax2.fill_between(xt, good - half, good + half, alpha=0.25)
+    ax1.set_xlabel("Trial")
+    ax1.set_ylabel("Balance")
+    ax1.set_title("Balance: mean ± 95% CI")
+    ax1.legend()
+    ax2.set_xlabel("Trial")
+    ax2.set_ylabel("P(choose C or D)")
+    ax2.set_ylim(0, 1)
+    ax2.set_title("Good-deck choice rate: mean ± 95% CI")
+    ax2.legend()
+    fig.tight_layout()
+    if path:
+        fig.savefig(path, dpi=120)
+    if show:
+        plt.show()
+    plt.close(fig)
+
+
+def main(argv=None):
+    import argparse
+    p = argparse.ArgumentParser(description="Delta / Q-learning / ORL 多次运行对比（流式统计，多进程）")
+    p.add_argument("--models", nargs="*", default=list(MODELS), choices=list(MODELS), help="参与对比的模型")
+    p.add_argument("--runs", "-r", type=int, default=20, help="每个模型的重复次数 R")
+    p.add_argument("--trials", "-n", type=int, default=1000, help="每次运行的轮数")
+    p.add_argument("--seed", type=int, default=42, help="主种子")
+    p.add_argument("--batch", type=int, default=1000, help="每批同时模拟的运行数")
+    p.add_argument("--workers", "-j", type=int, default=None, help="进程数（默认 CPU 核数，1 为不开进程池）")
+    p.add_argument("--decks", default=None, help="牌堆配置 JSON 文件（缺省为默认牌堆）")
+    p.add_argument("--out", "-o", default="agents_compare", help="输出文件前缀（.png / .npz / .csv）")
+    p.add_argument("--crn", action="store_true", help="公共随机数：各模型共用逐牌堆结果带，配对比较方差更小")
+    p.add_argument("--no-show", action="store_true", help="只保存图片，不弹出窗口")
+    args = p.parse_args(argv)
+    decks = None
+    if args.decks:
+        with open(args.decks, "r", encoding="utf-8") as f:
+            decks = json.load(f)
+        decks = decks.get("decks", decks)
+    results, diffs = compare_agents(
+        args.models, args.runs, args.trials, args.seed, decks=decks,
+        batch_size=args.batch, workers=args.workers, crn=args.crn,
+    )
+    for m, stats in results.items():
+        fb, prop = stats["final_balance"], stats["overall_prop"]
+        lo, hi = fb.ci()
+        props = " ".join(f"{d}={v:.1%}" for d, v in zip(DECK_NAMES, prop.mean))
+        print(f"{MODEL_LABELS[m]:10s} 最终余额 {fb.mean:.1f} ± {fb.std:.1f}（95% CI {lo:.1f}~{hi:.1f}）· {props}")
+    base = MODEL_LABELS[args.models[0]] if args.models else ""
+    for m, d in diffs.items():
+        lo, hi = d.ci()
+        print(f"{MODEL_LABELS[m]} - {base}: {d.mean:.1f}（95% CI {lo:.1f}~{hi:.1f}{'，公共随机数' if args.crn else ''}）")
+    save_npz(args.out + ".npz", results, diffs)
+    save_csv(args.out + ".csv", results)
+    plot_comparison(results, args.out + ".png", show=not args.no_show)
+    print(f"结果已写入 {args.out}.png / .npz / .csv")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
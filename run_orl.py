@@ -2,145 +2,113 @@
 ORL 模型 · 同时模拟“金额感知”与“频率感知”，与 demo 共用 igt_env。
 - 前端: streamlit run run_orl.py
 - 自动化: python run_orl.py --auto
+- 流式导出: python run_orl.py --auto -n 10000000 --out run.npy   （逐块写 .csv / .npy，内存与轮数无关）
+- 参数扫描: python run_orl.py sweep --grid ... --out result.npy   （多进程，见 igt_sweep.py）
 """
 
 import sys
 import time
 import numpy as np
-from igt_env import IGTEnv
-
-
-def softmax(x, temperature=1.0):
-    x = np.array(x, dtype=float)
-    x = (x - x.max()) / max(temperature, 1e-8)
-    exp_x = np.exp(x)
-    return exp_x / exp_x.sum()
-
-
-def update_orl(choice, reward, V, Ef, alpha_v, alpha_f, W_v, W_f):
-    """ORL 单步更新：更新 V（期望金额）、Ef（赢钱频率），返回该选项的综合分值 valence。"""
-    # 1. 更新期望价值 (类似 Delta)
-    V[choice] += alpha_v * (reward - V[choice])
-    # 2. 更新赢钱频率 (ORL 特有)：reward > 0 为 1，否则 -1
-    sign = 1 if reward > 0 else -1
-    Ef[choice] += alpha_f * (sign - Ef[choice])
-    # 3. 综合决策分值
-    valence = W_v * V[choice] + W_f * Ef[choice]
-    return valence
-
-
-def run_orl_one_step(env, V, Ef, alpha_v, alpha_f, W_v, W_f, temp):
-    """执行一步 ORL，返回 (choice, reward, new_V, new_Ef)。"""
-    decks = list(IGTEnv.DECK_NAMES)
-    valence_list = [W_v * V[a] + W_f * Ef[a] for a in decks]
-    probs = softmax(valence_list, temperature=temp)
-    choice = np.random.choice(decks, p=probs)
+from igt_env import IGTEnv, seed_run
+from igt_export import DEFAULT_CHUNK, open_writer
+from igt_render import DEFAULT_MAX_FPS, IncrementalLineChart, RenderScheduler
+from igt_runlog import RunLog
+from igt_kernels import N_DECKS, orl_kernel, orl_steps, orl_update, softmax_choice, to_path_rows
+
+
+def run_orl_one_step(env, V, Ef, alpha_v, alpha_f, W_v, W_f, temp, rng=None):
+    """执行一步 ORL，返回 (choice, reward, new_V, new_Ef)。rng 为智能体的随机流，缺省时与 env 共用。"""
+    rng = env.rng if rng is None else rng
+    decks = IGTEnv.DECK_NAMES
+    V_arr = np.array([V[a] for a in decks], dtype=float)
+    Ef_arr = np.array([Ef[a] for a in decks], dtype=float)
+    valence = W_v * V_arr + W_f * Ef_arr
+    i = softmax_choice(valence, temp, rng.random(), np.empty(N_DECKS))
+    choice = decks[i]
     r = env.step(choice)
-    V = dict(V)
-    Ef = dict(Ef)
-    update_orl(choice, r, V, Ef, alpha_v, alpha_f, W_v, W_f)
-    return choice, r, V, Ef
+    orl_update(V_arr, Ef_arr, valence, i, r, alpha_v, alpha_f, W_v, W_f)
+    return choice, r, dict(zip(decks, V_arr.tolist())), dict(zip(decks, Ef_arr.tolist()))
 
 
-def run_orl_auto(env, n_trials, alpha_v=0.15, alpha_f=0.15, W_v=0.5, W_f=0.5, temp=1.5, seed=42):
+def run_orl_auto(env, n_trials, alpha_v=0.15, alpha_f=0.15, W_v=0.5, W_f=0.5, temp=1.5, seed=42, rng=None):
     """无 UI：用与 demo 相同的 igt_env 自动跑完，返回 (path_rows, balances, ef_history)。"""
-    if seed is not None:
-        np.random.seed(seed)
-    env.reset(initial_balance=2000)
-    decks = list(IGTEnv.DECK_NAMES)
-    V = {a: 0.0 for a in decks}
-    Ef = {a: 0.0 for a in decks}
-    path_rows = []
-    balances = [2000]
-    ef_history = {a: [0.0] for a in decks}
-
-    for t in range(1, n_trials + 1):
-        valence_list = [W_v * V[a] + W_f * Ef[a] for a in decks]
-        probs = softmax(valence_list, temperature=temp)
-        choice = np.random.choice(decks, p=probs)
-        r = env.step(choice)
-        update_orl(choice, r, V, Ef, alpha_v, alpha_f, W_v, W_f)
+    rng = seed_run(env, seed, rng)
+    choices, rewards, balances, ef_trace, _, _ = orl_kernel(env, n_trials, alpha_v, alpha_f, W_v, W_f, temp, rng)
+    ef_history = {a: ef_trace[:, k].tolist() for k, a in enumerate(IGTEnv.DECK_NAMES)}
+    return to_path_rows(choices, rewards, balances), balances.tolist(), ef_history
+
+
+def format_orl_record(rec):
+    """一条 ORL 逐步记录 -> 日志行；刚大亏却仍觉得该牌堆赢钱频繁时追加一句解释。"""
+    decks = IGTEnv.DECK_NAMES
+    V = dict(zip(decks, np.round(rec.state["V"], 1).tolist()))
+    Ef = dict(zip(decks, np.round(rec.state["Ef"], 2).tolist()))
+    line = (
+        f"第 {rec.t:4d} 轮  选择 牌堆 {decks[rec.choice]}  →  收益 {rec.reward:+5d}  →  余额 {rec.balance:6d}  |  "
+        f"V = {V}  |  Ef = {Ef}"
+    )
+    if rec.reward < 0 and rec.state["Ef"][rec.choice] > 0.3:
+        line += "\n  → 智能体觉得这个牌堆赢钱很频繁，所以即使刚才大亏，它还是想选。"
+    return line
 
-        path_rows.append((t, choice, r, env.balance))
-        balances.append(env.balance)
-        for a in decks:
-            ef_history[a].append(Ef[a])
 
-    return path_rows, balances, ef_history
+def _ef_series(log, decks, start=0, label="{}"):
+    """各牌堆 Ef 的逐轮序列（初始为 0），从第 start 个点起：{label.format(牌堆): [...]}。"""
+    return {label.format(a): log.series(lambda s, k=k: float(s.state["Ef"][k]), 0.0, start) for k, a in enumerate(decks)}
 
 
 def run_orl_step_by_step(
     env, n_trials, alpha_v, alpha_f, W_v, W_f, temp, seed, step_delay,
-    log_ph, balance_ph, path_ph, prop_ph, chart_ph, freq_chart_ph,
+    log_ph, balance_ph, path_ph, prop_ph, chart_ph, freq_chart_ph, rng=None, max_fps=DEFAULT_MAX_FPS,
 ):
-    """逐步执行 ORL，并更新前端占位符。布局：左上是日志、左下是历史表；右上是牌堆比例、右下是收益曲线与 Ef。"""
-    if seed is not None:
-        np.random.seed(seed)
-    env.reset(initial_balance=2000)
+    """逐步执行 ORL（从 orl_steps 取记录），按帧率（max_fps，最后一步必刷新）更新前端占位符；日志只存记录、刷新时只显示末尾窗口，曲线只追加新点，结果表由日志生成。布局：左上是日志、左下是历史表；右上是牌堆比例、右下是收益曲线与 Ef。"""
+    rng = seed_run(env, seed, rng)
     decks = list(IGTEnv.DECK_NAMES)
-    V = {a: 0.0 for a in decks}
-    Ef = {a: 0.0 for a in decks}
-
-    log_lines = []
-    path_rows = []
-    balances = [2000]
-    ef_history = {a: [0.0] for a in decks}
-
-    for t in range(1, n_trials + 1):
-        valence_list = [W_v * V[a] + W_f * Ef[a] for a in decks]
-        probs = softmax(valence_list, temperature=temp)
-        choice = np.random.choice(decks, p=probs)
-        r = env.step(choice)
-        update_orl(choice, r, V, Ef, alpha_v, alpha_f, W_v, W_f)
-
-        path_rows.append((t, choice, r, env.balance))
-        balances.append(env.balance)
-        for a in decks:
-            ef_history[a].append(Ef[a])
-
-        freq_comment = "智能体觉得这个牌堆赢钱很频繁，所以即使刚才大亏，它还是想选。" if r < 0 and Ef[choice] > 0.3 else ""
-        line = (
-            f"第 {t:4d} 轮  选择 牌堆 {choice}  →  收益 {r:+5d}  →  余额 {env.balance:6d}  |  "
-            f"V = {dict((k, round(v, 1)) for k, v in V.items())}  |  Ef = {dict((k, round(v, 2)) for k, v in Ef.items())}"
-        )
-        if freq_comment:
-            line += f"\n  → {freq_comment}"
-        log_lines.append(line)
-
-        if log_ph is not None:
-            log_ph.text_area(
-                "运行日志",
-                value="\n".join(log_lines),
-                height=400,
-                disabled=True,
-                key=f"orl_log_{t}",
-                label_visibility="collapsed",
-            )
-        if balance_ph is not None:
-            balance_ph.metric("当前余额", f"¥ {env.balance}", delta=f"{r:+d}")
-        if path_ph is not None:
-            path_ph.dataframe(
-                data=[{"轮次": r[0], "选择": r[1], "收益": r[2], "余额": r[3]} for r in path_rows[-30:]],
-                use_container_width=True,
-                height=200,
-                hide_index=True,
-            )
-        if prop_ph is not None and path_rows:
-            from collections import Counter
-            counts = Counter(r[1] for r in path_rows)
-            prop_ph.bar_chart({d: [counts.get(d, 0)] for d in decks}, height=200)
-        if chart_ph is not None and len(balances) > 1:
-            chart_ph.line_chart({"余额": balances}, height=200)
-        if freq_chart_ph is not None and t > 1:
-            freq_chart_ph.line_chart(
-                {f"Ef({a})": ef_history[a] for a in decks},
-                height=200,
-            )
+
+    sched = RenderScheduler(max_fps)
+    counts = np.zeros(len(decks), dtype=np.int64)
+    log = RunLog(format_orl_record)
+    initial = 2000
+    balance_chart = IncrementalLineChart(chart_ph, height=200) if chart_ph is not None else None
+    ef_chart = IncrementalLineChart(freq_chart_ph, height=200) if freq_chart_ph is not None else None
+
+    for rec in orl_steps(env, n_trials, alpha_v, alpha_f, W_v, W_f, temp, rng, initial_balance=initial):
+        t, r = rec.t, rec.reward
+        log.append(rec)
+        counts[rec.choice] += 1
+
+        # 只在到帧时刷新前端（最后一步必刷新），模拟不被渲染拖慢
+        if sched.due(t, last=t == n_trials):
+            if log_ph is not None:
+                log_ph.text_area(
+                    "运行日志",
+                    value=log.tail(),
+                    height=400,
+                    disabled=True,
+                    key=f"orl_log_{sched.frames}",
+                    label_visibility="collapsed",
+                )
+            if balance_ph is not None:
+                balance_ph.metric("当前余额", f"¥ {rec.balance}", delta=f"{r:+d}")
+            if path_ph is not None:
+                path_ph.dataframe(
+                    data=[{"轮次": r[0], "选择": r[1], "收益": r[2], "余额": r[3]} for r in log.path_rows(-30)],
+                    use_container_width=True,
+                    height=200,
+                    hide_index=True,
+                )
+            if prop_ph is not None:
+                prop_ph.bar_chart({d: [int(counts[k])] for k, d in enumerate(decks)}, height=200)
+            if balance_chart is not None:
+                balance_chart.extend({"余额": log.series(lambda s: s.balance, initial, balance_chart.n)})
+            if ef_chart is not None:
+                ef_chart.extend(_ef_series(log, decks, ef_chart.n, label="Ef({})"))
 
         if step_delay > 0:
             time.sleep(step_delay)
 
-    return path_rows, balances, ef_history, log_lines
+    # 结果表与曲线都由日志中的记录生成，运行中不另存一份
+    return log.path_rows(), log.series(lambda s: s.balance, initial), _ef_series(log, decks), log
 
 
 def _main_auto():
@@ -155,19 +123,36 @@ def _main_auto():
     p.add_argument("--W-f", type=float, default=0.5, help="频率权重 W_f")
     p.add_argument("--seed", type=int, default=42, help="随机种子")
     p.add_argument("--log-every", type=int, default=50, help="每 N 轮打印一行")
+    p.add_argument("--out", "-o", default=None, help="逐步记录流式导出到 .csv 或 .npy（内存与轮数无关）")
+    p.add_argument("--chunk", type=int, default=DEFAULT_CHUNK, help="导出时每块的记录数")
     args = p.parse_args()
-    env = IGTEnv(seed=args.seed)
-    path_rows, balances, ef_history = run_orl_auto(
-        env, args.trials, args.alpha_v, args.alpha_f, args.W_v, args.W_f, temp=1.5, seed=args.seed
-    )
-    for i in range(0, len(path_rows), args.log_every):
-        t, choice, r, bal = path_rows[i]
-        print(f"第 {t:4d} 轮  选择 牌堆 {choice}  →  收益 {r:+5d}  →  余额 {bal:6d}")
+    env = IGTEnv(seed=args.seed, keep_history=False)  # 记录由生成器逐条给出，环境不必再存历史
+    rng = seed_run(env, args.seed)
+    writer = None
+    if args.out:
+        meta = {"params": {"alpha_v": args.alpha_v, "alpha_f": args.alpha_f, "W_v": args.W_v, "W_f": args.W_f, "temp": 1.5}, "seed": args.seed, "n_trials": args.trials, "decks": env.decks}
+        writer = open_writer(args.out, "orl", meta, args.chunk)
+    # 逐条从生成器取记录：打印每 N 轮一行，其余按块写入 --out，内存与轮数无关
+    try:
+        for rec in orl_steps(env, args.trials, args.alpha_v, args.alpha_f, args.W_v, args.W_f, 1.5, rng):
+            if writer is not None:
+                writer.write(rec)
+            if (rec.t - 1) % args.log_every == 0:
+                print(format_orl_record(rec))
+    finally:
+        if writer is not None:
+            writer.close()
     print("---")
     print(f"运行结束 · 共 {args.trials} 轮 · 最终余额 ¥ {env.balance}")
+    if args.out:
+        print(f"逐步记录已写入 {args.out}")
 
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "sweep":
+        from igt_sweep import main as _main_sweep
+        _main_sweep(sys.argv[2:], model="orl")
+        sys.exit(0)
     if "--auto" in sys.argv or "-a" in sys.argv:
         _main_auto()
         sys.exit(0)
@@ -2,107 +2,95 @@
 Q-learning 智能体 · 与 demo 共用 igt_env，可前端运行或自动化运行。
 - 前端: streamlit run run_qlearning.py
 - 自动化: python run_qlearning.py --auto   （在终端自动跑完，打印日志与结果）
+- 流式导出: python run_qlearning.py --auto -n 10000000 --out run.npy   （逐块写 .csv / .npy，内存与轮数无关）
+- 参数扫描: python run_qlearning.py sweep --grid ... --out result.npy   （多进程，见 igt_sweep.py）
 """
 
 import sys
 import time
 import numpy as np
-from igt_env import IGTEnv
-
-
-def run_qlearning_one_step(env, Q, alpha, epsilon, gamma):
-    """执行一步 Q-learning，返回 (choice, reward, new_Q)。"""
-    decks = list(IGTEnv.DECK_NAMES)
-    if np.random.random() < epsilon:
-        choice = np.random.choice(decks)
-    else:
-        choice = max(decks, key=lambda a: Q[a])
+from igt_env import IGTEnv, seed_run
+from igt_export import DEFAULT_CHUNK, open_writer
+from igt_render import DEFAULT_MAX_FPS, IncrementalLineChart, RenderScheduler
+from igt_runlog import RunLog
+from igt_kernels import epsilon_greedy_choice, qlearning_kernel, qlearning_steps, qlearning_update, to_path_rows
+
+
+def run_qlearning_one_step(env, Q, alpha, epsilon, gamma, rng=None):
+    """执行一步 Q-learning，返回 (choice, reward, new_Q)。rng 为智能体的随机流，缺省时与 env 共用。"""
+    rng = env.rng if rng is None else rng
+    decks = IGTEnv.DECK_NAMES
+    values = np.array([Q[a] for a in decks], dtype=float)
+    i = epsilon_greedy_choice(values, epsilon, rng.random(), rng.random())
+    choice = decks[i]
     r = env.step(choice)
-    Q = dict(Q)
-    max_next_q = max(Q.values())
-    Q[choice] += alpha * (r + gamma * max_next_q - Q[choice])
-    return choice, r, Q
+    qlearning_update(values, i, r, alpha, gamma)
+    return choice, r, dict(zip(decks, values.tolist()))
 
 
-def run_qlearning_auto(env, n_trials, alpha=0.15, epsilon=0.1, gamma=0.0, seed=42):
+def run_qlearning_auto(env, n_trials, alpha=0.15, epsilon=0.1, gamma=0.0, seed=42, rng=None):
     """无 UI：用与 demo 相同的 igt_env 自动跑完，返回 (path_rows, balances)。"""
-    if seed is not None:
-        np.random.seed(seed)
-    env.reset(initial_balance=2000)
-    decks = list(IGTEnv.DECK_NAMES)
-    Q = {a: 0.0 for a in decks}
-    path_rows = []
-    balances = [2000]
-    for t in range(1, n_trials + 1):
-        if np.random.random() < epsilon:
-            choice = np.random.choice(decks)
-        else:
-            choice = max(decks, key=lambda a: Q[a])
-        r = env.step(choice)
-        max_next_q = max(Q.values())
-        Q[choice] += alpha * (r + gamma * max_next_q - Q[choice])
-        path_rows.append((t, choice, r, env.balance))
-        balances.append(env.balance)
-    return path_rows, balances
-
-
-def run_qlearning_step_by_step(env, n_trials, alpha, epsilon, gamma, seed, step_delay, log_ph, balance_ph, path_ph, prop_ph, chart_ph):
-    """逐步执行 Q-learning，并更新前端占位符。布局：左上是日志、左下是历史表；右上是牌堆比例、右下是收益曲线。"""
-    if seed is not None:
-        np.random.seed(seed)
-    env.reset(initial_balance=2000)
+    rng = seed_run(env, seed, rng)
+    choices, rewards, balances, _, _ = qlearning_kernel(env, n_trials, alpha, epsilon, gamma, rng)
+    return to_path_rows(choices, rewards, balances), balances.tolist()
+
+
+def format_qlearning_record(rec):
+    """一条 Q-learning 逐步记录 -> 日志行（含本轮是探索还是利用）。"""
+    mode = "探索" if rec.state["explored"] else "利用"
+    values = dict(zip(IGTEnv.DECK_NAMES, np.round(rec.state["Q"], 1).tolist()))
+    return (
+        f"第 {rec.t:4d} 轮  [{mode}] 选择 牌堆 {IGTEnv.DECK_NAMES[rec.choice]}  →  收益 {rec.reward:+5d}"
+        f"  →  余额 {rec.balance:6d}  |  Q = {values}"
+    )
+
+
+def run_qlearning_step_by_step(env, n_trials, alpha, epsilon, gamma, seed, step_delay, log_ph, balance_ph, path_ph, prop_ph, chart_ph, rng=None, max_fps=DEFAULT_MAX_FPS):
+    """逐步执行 Q-learning（从 qlearning_steps 取记录），按帧率（max_fps，最后一步必刷新）更新前端占位符；日志只存记录、刷新时只显示末尾窗口，曲线只追加新点，结果表由日志生成。布局：左上是日志、左下是历史表；右上是牌堆比例、右下是收益曲线。"""
+    rng = seed_run(env, seed, rng)
     decks = list(IGTEnv.DECK_NAMES)
-    Q = {a: 0.0 for a in decks}
-
-    log_lines = []
-    path_rows = []
-    balances = [2000]
-
-    for t in range(1, n_trials + 1):
-        if np.random.random() < epsilon:
-            choice = np.random.choice(decks)
-            mode = "探索"
-        else:
-            choice = max(decks, key=lambda a: Q[a])
-            mode = "利用"
-        r = env.step(choice)
-        max_next_q = max(Q.values())
-        Q[choice] += alpha * (r + gamma * max_next_q - Q[choice])
-
-        path_rows.append((t, choice, r, env.balance))
-        balances.append(env.balance)
-        line = f"第 {t:4d} 轮  [{mode}] 选择 牌堆 {choice}  →  收益 {r:+5d}  →  余额 {env.balance:6d}  |  Q = {dict((k, round(v, 1)) for k, v in Q.items())}"
-        log_lines.append(line)
-
-        if log_ph is not None:
-            log_ph.text_area(
-                "运行日志",
-                value="\n".join(log_lines),
-                height=400,
-                disabled=True,
-                key=f"ql_log_{t}",
-                label_visibility="collapsed",
-            )
-        if balance_ph is not None:
-            balance_ph.metric("当前余额", f"¥ {env.balance}", delta=f"{r:+d}")
-        if path_ph is not None:
-            path_ph.dataframe(
-                data=[{"轮次": r[0], "选择": r[1], "收益": r[2], "余额": r[3]} for r in path_rows[-30:]],
-                use_container_width=True,
-                height=220,
-                hide_index=True,
-            )
-        if prop_ph is not None and path_rows:
-            from collections import Counter
-            counts = Counter(r[1] for r in path_rows)
-            prop_ph.bar_chart({d: [counts.get(d, 0)] for d in decks}, height=220)
-        if chart_ph is not None and len(balances) > 1:
-            chart_ph.line_chart({"余额": balances}, height=220)
+
+    sched = RenderScheduler(max_fps)
+    counts = np.zeros(len(decks), dtype=np.int64)
+    log = RunLog(format_qlearning_record)
+    initial = 2000
+    balance_chart = IncrementalLineChart(chart_ph, height=220) if chart_ph is not None else None
+
+    for rec in qlearning_steps(env, n_trials, alpha, epsilon, gamma, rng, initial_balance=initial):
+        t, r = rec.t, rec.reward
+        log.append(rec)
+        counts[rec.choice] += 1
+
+        # 只在到帧时刷新前端（最后一步必刷新），模拟不被渲染拖慢
+        if sched.due(t, last=t == n_trials):
+            if log_ph is not None:
+                log_ph.text_area(
+                    "运行日志",
+                    value=log.tail(),
+                    height=400,
+                    disabled=True,
+                    key=f"ql_log_{sched.frames}",
+                    label_visibility="collapsed",
+                )
+            if balance_ph is not None:
+                balance_ph.metric("当前余额", f"¥ {rec.balance}", delta=f"{r:+d}")
+            if path_ph is not None:
+                path_ph.dataframe(
+                    data=[{"轮次": r[0], "选择": r[1], "收益": r[2], "余额": r[3]} for r in log.path_rows(-30)],
+                    use_container_width=True,
+                    height=220,
+                    hide_index=True,
+                )
+            if prop_ph is not None:
+                prop_ph.bar_chart({d: [int(counts[k])] for k, d in enumerate(decks)}, height=220)
+            if balance_chart is not None:
+                balance_chart.extend({"余额": log.series(lambda s: s.balance, initial, balance_chart.n)})
 
         if step_delay > 0:
             time.sleep(step_delay)
 
-    return path_rows, balances, log_lines
+    # 结果表与曲线都由日志中的记录生成，运行中不另存一份
+    return log.path_rows(), log.series(lambda s: s.balance, initial), log
 
 
 def _main_auto():
@@ -116,17 +104,36 @@ def _main_auto():
     p.add_argument("--gamma", type=float, default=0.0, help="折扣因子 γ")
     p.add_argument("--seed", type=int, default=42, help="随机种子")
     p.add_argument("--log-every", type=int, default=50, help="每 N 轮打印一行")
+    p.add_argument("--out", "-o", default=None, help="逐步记录流式导出到 .csv 或 .npy（内存与轮数无关）")
+    p.add_argument("--chunk", type=int, default=DEFAULT_CHUNK, help="导出时每块的记录数")
     args = p.parse_args()
-    env = IGTEnv(seed=args.seed)
-    path_rows, balances = run_qlearning_auto(env, args.trials, args.alpha, args.epsilon, args.gamma, args.seed)
-    for i in range(0, len(path_rows), args.log_every):
-        t, choice, r, bal = path_rows[i]
-        print(f"第 {t:4d} 轮  选择 牌堆 {choice}  →  收益 {r:+5d}  →  余额 {bal:6d}")
+    env = IGTEnv(seed=args.seed, keep_history=False)  # 记录由生成器逐条给出，环境不必再存历史
+    rng = seed_run(env, args.seed)
+    writer = None
+    if args.out:
+        meta = {"params": {"alpha": args.alpha, "epsilon": args.epsilon, "gamma": args.gamma}, "seed": args.seed, "n_trials": args.trials, "decks": env.decks}
+        writer = open_writer(args.out, "qlearning", meta, args.chunk)
+    # 逐条从生成器取记录：打印每 N 轮一行，其余按块写入 --out，内存与轮数无关
+    try:
+        for rec in qlearning_steps(env, args.trials, args.alpha, args.epsilon, args.gamma, rng):
+            if writer is not None:
+                writer.write(rec)
+            if (rec.t - 1) % args.log_every == 0:
+                print(format_qlearning_record(rec))
+    finally:
+        if writer is not None:
+            writer.close()
     print("---")
     print(f"运行结束 · 共 {args.trials} 轮 · 最终余额 ¥ {env.balance}")
+    if args.out:
+        print(f"逐步记录已写入 {args.out}")
 
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "sweep":
+        from igt_sweep import main as _main_sweep
+        _main_sweep(sys.argv[2:], model="qlearning")
+        sys.exit(0)
     if "--auto" in sys.argv or "-a" in sys.argv:
         _main_auto()
         sys.exit(0)
@@ -0,0 +1,171 @@
+"""
+后台 CSV 导出：从存储逐条取提交、逐块生成 CSV，可选 gzip / zip 压缩，边生成边写入文件，不在内存中拼出整份导出。
+只在管理员点「准备下载」时生成；结果写入临时文件，按 (模块, 学号, 格式) 做 LRU 缓存（最多 EXPORT_CACHE_SIZE 份，
+淘汰时删除文件），模块数据变化（data_version）后重建。生成时只锁住同一份导出，不同导出互不阻塞。
+CSV 以 UTF-8 BOM 开头，Excel 可直接打开。
+"""
+
+import atexit
+import csv
+import gzip
+import io
+import os
+import tempfile
+import threading
+import zipfile
+from collections import OrderedDict
+from tempfile import SpooledTemporaryFile
+
+from igt_trajectory import history_from_entry, path_rows_from_entry
+from submission_store import data_version, iter_submissions
+
+EXPORT_FORMATS = ("csv", "gzip", "zip")
+CSV_FIELDS = ["学号", "昵称", "提交时间", "轮次", "选择", "收益", "余额"]
+CHUNK_ROWS = 4096  # 每攒够这么多行编码写出一次
+SPOOL_MAX = 8 * 1024 * 1024
+GZIP_LEVEL = 6
+EXPORT_CACHE_SIZE = 8  # 最多缓存这么多份导出文件
+
+_MIME = {"csv": "text/csv", "gzip": "application/gzip", "zip": "application/zip"}
+_SUFFIX = {"csv": ".csv", "gzip": ".csv.gz", "zip": ".zip"}
+
+_cache = OrderedDict()  # (module, user_id, fmt) -> (version, 临时文件路径)，最近使用的在末尾
+_cache_lock = threading.Lock()  # 只保护 _cache / _build_locks，生成导出时不持有
+_build_locks = {}  # (module, user_id, fmt) -> Lock，同一份导出只由一个线程生成
+
+
+def iter_csv_rows(module, user_id=None):
+    """
+    某模块（或某学号）提交的 CSV 行（按 CSV_FIELDS 顺序的元组），逐条提交惰性生成；
+    内容与 self_play_to_csv_rows / model_run_to_csv_rows 相同。
+    """
+    for e in iter_submissions(module, user_id):
+        head = (e.get("学号", ""), e.get("昵称", ""), e.get("时间", ""))
+        if module == "自己玩":
+            for i, row in enumerate(history_from_entry(e), 1):
+                yield head + (i,) + tuple(row)
+        else:
+            for row in path_rows_from_entry(e):
+                yield head + tuple(row)
+
+
+def write_csv(rows, f, fieldnames=CSV_FIELDS, chunk_rows=CHUNK_ROWS):
+    """把行元组迭代器按块写入二进制文件对象 f（BOM + 表头 + 数据），返回数据行数。"""
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(fieldnames)
+    f.write(b"\xef\xbb\xbf")
+    n = 0
+    for row in rows:
+        writer.writerow(row)
+        n += 1
+        if n % chunk_rows == 0:
+            f.write(buf.getvalue().encode("utf-8"))
+            buf.seek(0)
+            buf.truncate()
+    f.write(buf.getvalue().encode("utf-8"))
+    return n
+
+
+def export_name(module, user_id=None, fmt="csv"):
+    return f"igt_{module}_{user_id or '全部'}{_SUFFIX[fmt]}"
+
+
+def build_export(module, user_id=None, fmt="csv", f=None):
+    """把导出写入二进制文件对象 f（缺省新建 SpooledTemporaryFile），返回已回到开头的 f。"""
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"不支持的导出格式: {fmt}（应为 {'/'.join(EXPORT_FORMATS)}）")
+    rows = iter_csv_rows(module, user_id)
+    if f is None:
+        f = SpooledTemporaryFile(max_size=SPOOL_MAX)
+    if fmt == "gzip":
+        with gzip.GzipFile(fileobj=f, mode="wb", compresslevel=GZIP_LEVEL, mtime=0) as gz:
+            write_csv(rows, gz)
+    elif fmt == "zip":
+        with zipfile.ZipFile(f, "w", zipfile.ZIP_DEFLATED) as zf, zf.open(export_name(module, user_id), "w") as member:
+            write_csv(rows, member)
+    else:
+        write_csv(rows, f)
+    f.seek(0)
+    return f
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:  # Windows 上仍被打开的文件删不掉，留给系统清理临时目录
+        pass
+
+
+def _build_file(module, user_id, fmt):
+    """生成导出到新的临时文件，返回路径。"""
+    fd, path = tempfile.mkstemp(prefix="igt_export_", suffix=_SUFFIX.get(fmt, ""))
+    try:
+        with os.fdopen(fd, "wb") as f:
+            build_export(module, user_id, fmt, f)
+    except BaseException:
+        _remove(path)
+        raise
+    return path
+
+
+def _build_lock(key):
+    with _cache_lock:
+        return _build_locks.setdefault(key, threading.Lock())
+
+
+def _open_cached(key, version):
+    """缓存命中时打开缓存文件（每次调用独立的只读句柄），否则 None。"""
+    with _cache_lock:
+        cached = _cache.get(key)
+        if cached is None or cached[0] != version:
+            return None
+        _cache.move_to_end(key)
+        return open(cached[1], "rb")
+
+
+def _put(key, version, path):
+    """放入缓存，淘汰最久未用的导出并删除其文件（已打开的句柄照常可读）。"""
+    stale = []
+    with _cache_lock:
+        old = _cache.pop(key, None)
+        if old is not None:
+            stale.append(old[1])
+        _cache[key] = (version, path)
+        while len(_cache) > EXPORT_CACHE_SIZE:
+            k, (_, p) = _cache.popitem(last=False)
+            stale.append(p)
+            lock = _build_locks.get(k)
+            if lock is not None and not lock.locked():
+                del _build_locks[k]
+    for p in stale:
+        _remove(p)
+
+
+@atexit.register
+def clear_cache():
+    """删除全部缓存的导出文件。"""
+    with _cache_lock:
+        paths = [p for _, p in _cache.values()]
+        _cache.clear()
+        _build_locks.clear()
+    for p in paths:
+        _remove(p)
+
+
+def get_export(module, user_id=None, fmt="csv"):
+    """
+    返回 (只读二进制文件对象, 文件名, MIME)，调用方用完后关闭。同一 (模块, 学号, 格式) 在模块数据未变时
+    直接打开缓存的文件，否则重新流式生成；同一份导出并发请求时只生成一次。
+    """
+    key = (module, user_id, fmt)
+    version = data_version(module)
+    f = _open_cached(key, version)
+    if f is None:
+        with _build_lock(key):
+            f = _open_cached(key, version)  # 等锁期间可能已由其他线程生成
+            if f is None:
+                path = _build_file(module, user_id, fmt)
+                f = open(path, "rb")
+                _put(key, version, path)
+    return f, export_name(module, user_id, fmt), _MIME[fmt]
@@ -1,89 +1,455 @@
 """
-用户提交数据存储：JSON 文件 data/submissions.json，按模块分键。
+用户提交数据存储。下方模块函数不变，后端可插拔（环境变量 IGT_SUBMISSION_BACKEND=sqlite|jsonl，缺省 sqlite）：
+
+SQLite（data/submissions.db，SqliteStore）：WAL 模式，连接池复用连接，多会话并发读写；(module, 学号, 时间) 与学号上建索引，
+按学号查询、列用户、删除都是索引查询；提交的其余内容（轨迹等）存为 zlib 压缩的紧凑 JSON BLOB。
+首次使用时若库为空，从 JSONL 日志（或旧版 submissions.json）导入。
+
+JSONL（JsonlStore）：只追加的日志 data/submissions.jsonl，每次提交一行紧凑 JSON（含 module）。
+- 提交：加文件锁后在末尾追加一行并 fsync，耗时与已有数据量无关，多进程 / 多会话同时提交互不覆盖。
+- 读取：进程内缓存解析结果，文件增长时只解析新增的完整行；末尾被截断的半行（写入中途崩溃）忽略。
+- 删除：追加一条删除记录（墓碑）；失效行占比过高时压缩（重写为只含有效提交的新文件后原子替换）。
+- 迁移：首次使用时若只有旧版 data/submissions.json，按原顺序转写为 JSONL（旧文件保留作备份）；
+  转写在旁路锁文件 submissions.jsonl.lock 上互斥进行，多个进程同时首次提交时只迁移一次。
+轨迹字段按 igt_trajectory 的紧凑格式写入（history -> history_z 等），CSV 导出时透明解码，旧格式照常可读。
 后台按学号展示、支持 CSV 下载。
 """
 
 import json
 import os
+import sqlite3
+import tempfile
+import threading
+import zlib
+from contextlib import contextmanager
 from datetime import datetime
 from typing import Any, List
 
+from igt_trajectory import encode_payload, history_from_entry, path_rows_from_entry
+
+try:
+    import fcntl
+except ImportError:  # Windows：只有进程内的线程锁
+    fcntl = None
+
 DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
-SUBMISSIONS_FILE = os.path.join(DATA_DIR, "submissions.json")
+SUBMISSIONS_FILE = os.path.join(DATA_DIR, "submissions.json")  # 旧版整文件 JSON，仅用于迁移
+SUBMISSIONS_LOG = os.path.join(DATA_DIR, "submissions.jsonl")
+SUBMISSIONS_DB = os.path.join(DATA_DIR, "submissions.db")
+BACKEND = os.environ.get("IGT_SUBMISSION_BACKEND", "sqlite")
 
 MODULES = ["自己玩", "Delta", "Qlearning", "ORL", "仪表盘"]
 
+COMPACT_MIN_DEAD = 64  # 失效行（墓碑、被删的提交、损坏行）至少这么多才考虑压缩
+COMPACT_DEAD_RATIO = 0.25  # 且占全部行的比例超过此值
+
+
+def _dumps(rec):
+    return (json.dumps(rec, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+
+
+class JsonlStore:
+    """
+    JSONL 日志存储。每行为 {"op": "add", "module": 模块, "entry": {...}}
+    或 {"op": "delete_user", "学号": 学号}；按行顺序重放即得当前数据。
+    """
+
+    def __init__(self, path=SUBMISSIONS_LOG, legacy_path=SUBMISSIONS_FILE):
+        self.path = path
+        self.legacy_path = legacy_path
+        self._lock = threading.RLock()
+        self._reset_state()
+
+    def _reset_state(self):
+        self._data = {m: [] for m in MODULES}
+        self._ino = None
+        self._offset = 0
+        self._lines = 0
+        self._dead = 0
+
+    @contextmanager
+    def _locked(self):
+        """线程锁 + 日志文件上的排他 flock；拿到锁后若文件已被压缩替换则重新打开。"""
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._migrate()
+            while True:
+                f = open(self.path, "ab")
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_EX)
+                if os.fstat(f.fileno()).st_ino == os.stat(self.path).st_ino:
+                    break
+                f.close()
+            try:
+                yield f
+            finally:
+                f.close()  # 关闭即释放 flock
+
+    @contextmanager
+    def _sidecar_locked(self):
+        """旁路锁文件（日志路径 + .lock）上的排他 flock，用于日志文件本身尚不存在时（迁移）的进程间互斥。"""
+        with open(self.path + ".lock", "ab") as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            yield  # 关闭即释放 flock
+
+    def _migrate(self):
+        if os.path.exists(self.path) or not os.path.exists(self.legacy_path):
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with self._sidecar_locked():
+            if os.path.exists(self.path):  # 其他进程已迁移完成
+                return
+            try:
+                with open(self.legacy_path, "r", encoding="utf-8") as f:
+                    old = json.load(f)
+            except Exception:
+                return
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(self.path), prefix=".submissions.", suffix=".migrating")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    for module, entries in old.items():
+                        for e in entries:
+                            f.write(_dumps({"op": "add", "module": module, "entry": e}))
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp, self.path)
+            except BaseException:
+                os.remove(tmp)  # 只清理本进程自己的临时文件
+                raise
+
+    def _apply(self, rec):
+        op = rec.get("op")
+        if op == "add":
+            self._data.setdefault(rec["module"], []).append(rec["entry"])
+        elif op == "delete_user":
+            uid = rec.get("学号")
+            removed = 0
+            for m, rows in self._data.items():
+                kept = [r for r in rows if r.get("学号") != uid]
+                removed += len(rows) - len(kept)
+                self._data[m] = kept
+            self._dead += removed + 1
+        else:
+            self._dead += 1
+
+    def _refresh(self):
+        """把文件中尚未读过的完整行并入缓存；文件被替换或变短时整体重读。"""
+        self._migrate()
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            self._reset_state()
+            return
+        if st.st_ino != self._ino or st.st_size < self._offset:
+            self._reset_state()
+            self._ino = st.st_ino
+        if st.st_size == self._offset:
+            return
+        with open(self.path, "rb") as f:
+            f.seek(self._offset)
+            chunk = f.read()
+        end = chunk.rfind(b"\n") + 1  # 只消费完整行，末尾半行留到下次
+        for line in chunk[:end].splitlines():
+            if not line.strip():
+                continue
+            self._lines += 1
+            try:
+                self._apply(json.loads(line))
+            except (ValueError, KeyError, AttributeError):
+                self._dead += 1
+        self._offset += end
+
+    def load(self) -> dict:
+        """{模块: [提交]}（缓存对象，调用方不要修改）。"""
+        with self._lock:
+            self._refresh()
+            return self._data
+
+    def get_module(self, module):
+        return list(self.load().get(module, []))
+
+    def for_user(self, module, user_id):
+        return [r for r in self.load().get(module, []) if r.get("学号") == user_id]
+
+    def iter_module(self, module, user_id=None):
+        rows = self.get_module(module) if user_id is None else self.for_user(module, user_id)
+        yield from rows
+
+    def version(self, module):
+        """数据版本：日志文件（inode, 已读长度），任何提交或删除后都会变化。"""
+        with self._lock:
+            self._refresh()
+            return (self._ino, self._offset)
+
+    def users(self):
+        data = self.load()
+        users = {}
+        for m in MODULES:
+            for r in data.get(m, []):
+                uid = r.get("学号", "")
+                if uid and uid not in users:
+                    users[uid] = r.get("昵称", "")
+        return [(uid, users[uid]) for uid in sorted(users.keys())]
+
+    def append(self, rec):
+        line = _dumps(rec)
+        with self._locked() as f:
+            size = f.seek(0, os.SEEK_END)
+            if size:
+                with open(self.path, "rb") as r:
+                    r.seek(size - 1)
+                    if r.read(1) != b"\n":
+                        line = b"\n" + line  # 上次写入中途崩溃留下的半行，让它自成一行（读取时跳过）
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def add(self, module, entry):
+        self.append({"op": "add", "module": module, "entry": entry})
+
+    def delete_user(self, user_id):
+        self.append({"op": "delete_user", "学号": user_id})
+        with self._lock:
+            self._refresh()
+            if self._dead >= COMPACT_MIN_DEAD and self._dead > COMPACT_DEAD_RATIO * self._lines:
+                self.compact()
+
+    def compact(self):
+        """重写为只含当前有效提交的日志并原子替换。"""
+        with self._locked():
+            self._refresh()
+            tmp = self.path + ".compacting"
+            with open(tmp, "wb") as f:
+                for module, entries in self._data.items():
+                    for e in entries:
+                        f.write(_dumps({"op": "add", "module": module, "entry": e}))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.path)
+            self._reset_state()
+            self._refresh()
+
+
+_ENTRY_KEYS = ("学号", "昵称", "时间")
+
 
-def _ensure_dir():
-    os.makedirs(DATA_DIR, exist_ok=True)
+class SqliteStore:
+    """
+    SQLite 存储：每条提交一行 (module, 学号, 昵称, 时间, payload)，payload 为其余字段的 zlib 压缩 JSON。
+    连接放在池里复用：每次操作借一个空闲连接（没有就新建，设好 WAL 等 PRAGMA），用完放回。
+    Streamlit 每次重跑都在新线程里执行，连接不绑定线程（check_same_thread=False），不会每次重跑都重连；
+    同一连接同一时刻只借给一个操作，WAL 模式下多个连接读写互不阻塞。
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS submissions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        module TEXT NOT NULL,
+        user_id TEXT NOT NULL,
+        nickname TEXT NOT NULL DEFAULT '',
+        ts TEXT NOT NULL DEFAULT '',
+        payload BLOB NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_submissions_module_user_ts ON submissions (module, user_id, ts);
+    CREATE INDEX IF NOT EXISTS idx_submissions_user ON submissions (user_id);
+    CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+    """
+
+    POOL_MAX = 8  # 最多保留这么多空闲连接，多出的用完即关
+
+    def __init__(self, path=SUBMISSIONS_DB, import_from=None):
+        self.path = path
+        self._pool = []  # 空闲连接（list 的 append / pop 是原子的）
+        self._import_from = import_from
+        self._init_lock = threading.Lock()
+        self._ready = False
+
+    def _connect(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        if not self._ready:
+            with self._init_lock:
+                if not self._ready:
+                    conn.executescript(self.SCHEMA)
+                    self._import(conn)
+                    self._ready = True
+        return conn
+
+    @contextmanager
+    def _conn(self):
+        """借一个连接，用完放回池中（池满则关闭）。"""
+        try:
+            conn = self._pool.pop()
+        except IndexError:
+            conn = self._connect()
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            if len(self._pool) < self.POOL_MAX:
+                self._pool.append(conn)
+            else:
+                conn.close()
+
+    def _import(self, conn):
+        """库为空且从未导入过时，从旧存储（JsonlStore）按原顺序导入。"""
+        if self._import_from is None:
+            return
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")  # 先拿写锁再检查：多个进程同时首次打开时只有一个导入，其余等待后跳过
+            if conn.execute("SELECT 1 FROM meta WHERE key = 'imported'").fetchone():
+                return
+            if not conn.execute("SELECT 1 FROM submissions LIMIT 1").fetchone():
+                data = self._import_from().load()
+                conn.executemany(
+                    "INSERT INTO submissions (module, user_id, nickname, ts, payload) VALUES (?, ?, ?, ?, ?)",
+                    [self._row(m, e) for m, entries in data.items() for e in entries],
+                )
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('imported', ?)", (datetime.now().isoformat(),))
+
+    @staticmethod
+    def _row(module, entry):
+        rest = encode_payload({k: v for k, v in entry.items() if k not in _ENTRY_KEYS})
+        payload = zlib.compress(json.dumps(rest, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+        return module, entry.get("学号", ""), entry.get("昵称", ""), entry.get("时间", ""), payload
+
+    @staticmethod
+    def _entry(user_id, nickname, ts, payload):
+        return {"学号": user_id, "昵称": nickname, "时间": ts, **json.loads(zlib.decompress(payload))}
+
+    def _entries(self, sql, args):
+        with self._conn() as conn:
+            return [self._entry(*r) for r in conn.execute(sql, args)]
+
+    def iter_module(self, module, user_id=None):
+        """逐条解码某模块（或某学号）的提交，不一次性载入全部。"""
+        if user_id is None:
+            sql, args = "SELECT user_id, nickname, ts, payload FROM submissions WHERE module = ? ORDER BY id", (module,)
+        else:
+            sql = "SELECT user_id, nickname, ts, payload FROM submissions WHERE module = ? AND user_id = ? ORDER BY ts, id"
+            args = (module, user_id)
+        with self._conn() as conn:  # 迭代期间连接一直借出
+            for r in conn.execute(sql, args):
+                yield self._entry(*r)
+
+    def version(self, module):
+        """某模块的数据版本 (条数, 最大 id)：增删提交后都会变化。"""
+        with self._conn() as conn:
+            return tuple(conn.execute(
+                "SELECT COUNT(*), MAX(id) FROM submissions WHERE module = ?", (module,)
+            ).fetchone())
+
+    def load(self) -> dict:
+        data = {m: [] for m in MODULES}
+        with self._conn() as conn:
+            for module, *r in conn.execute(
+                "SELECT module, user_id, nickname, ts, payload FROM submissions ORDER BY id"
+            ):
+                data.setdefault(module, []).append(self._entry(*r))
+        return data
+
+    def get_module(self, module):
+        return self._entries(
+            "SELECT user_id, nickname, ts, payload FROM submissions WHERE module = ? ORDER BY id", (module,)
+        )
+
+    def for_user(self, module, user_id):
+        return self._entries(
+            "SELECT user_id, nickname, ts, payload FROM submissions WHERE module = ? AND user_id = ? ORDER BY ts, id",
+            (module, user_id),
+        )
+
+    def users(self):
+        # 取每个学号最早一条提交里的昵称
+        with self._conn() as conn:
+            rows = conn.execute(
+                "SELECT user_id, nickname, MIN(id) FROM submissions WHERE user_id != '' GROUP BY user_id ORDER BY user_id"
+            )
+            return [(uid, nick) for uid, nick, _ in rows]
+
+    def add(self, module, entry):
+        with self._conn() as conn, conn:
+            conn.execute(
+                "INSERT INTO submissions (module, user_id, nickname, ts, payload) VALUES (?, ?, ?, ?, ?)",
+                self._row(module, entry),
+            )
+
+    def delete_user(self, user_id):
+        with self._conn() as conn, conn:
+            conn.execute("DELETE FROM submissions WHERE user_id = ?", (user_id,))
+
+    def compact(self):
+        """回收删除后的空间并清空 WAL。"""
+        with self._conn() as conn:
+            conn.execute("VACUUM")
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+
+def make_store(backend=BACKEND):
+    """按名称创建存储后端：sqlite（缺省，首次使用时从 JSONL / 旧 JSON 导入）或 jsonl。"""
+    if backend == "sqlite":
+        return SqliteStore(import_from=JsonlStore)
+    if backend == "jsonl":
+        return JsonlStore()
+    raise ValueError(f"未知存储后端: {backend}（应为 sqlite 或 jsonl）")
+
+
+_store = make_store()
 
 
 def _load():
-    _ensure_dir()
-    if not os.path.exists(SUBMISSIONS_FILE):
-        return {m: [] for m in MODULES}
-    try:
-        with open(SUBMISSIONS_FILE, "r", encoding="utf-8") as f:
-            data = json.load(f)
-    except Exception:
-        data = {}
-    for m in MODULES:
-        if m not in data:
-            data[m] = []
-    return data
-
-
-def _save(data: dict):
-    _ensure_dir()
-    with open(SUBMISSIONS_FILE, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    return _store.load()
 
 
 def add_submission(module: str, user_id: str, nickname: str, payload: dict):
     if module not in MODULES:
         MODULES.append(module)
-    data = _load()
     entry = {
         "学号": user_id,
         "昵称": nickname,
         "时间": datetime.now().isoformat(),
-        **payload,
+        **encode_payload(payload),
     }
-    data[module].append(entry)
-    _save(data)
+    _store.add(module, entry)
 
 
 def get_all(module: str) -> list:
     """获取某模块全部提交（仅后台管理员使用）。"""
-    data = _load()
-    return data.get(module, [])
+    return _store.get_module(module)
 
 
 def get_all_for_user(module: str, user_id: str) -> list:
     """按学号隔离：仅返回该学号的提交记录，用于普通用户查看自己的数据。"""
-    data = _load()
-    rows = data.get(module, [])
-    return [r for r in rows if r.get("学号") == user_id]
+    return _store.for_user(module, user_id)
 
 
 def delete_user_data(user_id: str):
     """删除某学号在所有模块的提交数据（后台用户管理用）。"""
-    data = _load()
-    for m in MODULES:
-        data[m] = [r for r in data.get(m, []) if r.get("学号") != user_id]
-    _save(data)
+    _store.delete_user(user_id)
+
+
+def compact():
+    """手动压缩存储（JSONL 重写日志，SQLite VACUUM）。"""
+    _store.compact()
+
+
+def iter_submissions(module: str, user_id: str = None):
+    """逐条给出某模块（或某学号）的提交，供流式导出使用。"""
+    return _store.iter_module(module, user_id)
+
+
+def data_version(module: str):
+    """某模块数据的版本标识，数据变化（提交、删除）后不同，用于导出缓存失效。"""
+    return _store.version(module)
 
 
 def list_users() -> list:
     """从提交数据中提取所有用户 (学号, 昵称)，用于用户管理列表。"""
-    data = _load()
-    users = {}
-    for m in MODULES:
-        for r in data.get(m, []):
-            uid = r.get("学号", "")
-            if uid and uid not in users:
-                users[uid] = r.get("昵称", "")
-    return [(uid, users[uid]) for uid in sorted(users.keys())]
+    return _store.users()
 
 
 def get_all_grouped_by_user(module: str) -> dict:
@@ -99,13 +465,13 @@ def get_all_grouped_by_user(module: str) -> dict:
 
 
 def self_play_to_csv_rows(entries: list) -> List[dict]:
-    """自己玩：每条 entry 含 history，转为 CSV 行（轮次、选择、收益、余额）。"""
+    """自己玩：每条 entry 含 history（或紧凑编码 history_z），转为 CSV 行（轮次、选择、收益、余额）。"""
     rows = []
     for e in entries:
         user_id = e.get("学号", "")
         nickname = e.get("昵称", "")
         ts = e.get("时间", "")
-        history = e.get("history", [])
+        history = history_from_entry(e)
         for i, (choice, reward, balance) in enumerate(history, 1):
             rows.append({
                 "学号": user_id,
@@ -120,13 +486,13 @@ def self_play_to_csv_rows(entries: list) -> List[dict]:
 
 
 def model_run_to_csv_rows(entries: list) -> List[dict]:
-    """Delta/Qlearning/ORL：path_rows 转为 CSV 行。"""
+    """Delta/Qlearning/ORL：path_rows（或紧凑编码 path_rows_z）转为 CSV 行。"""
     rows = []
     for e in entries:
         user_id = e.get("学号", "")
         nickname = e.get("昵称", "")
         ts = e.get("时间", "")
-        path_rows = e.get("path_rows", [])
+        path_rows = path_rows_from_entry(e)
         for t, choice, reward, balance in path_rows:
             rows.append({
                 "学号": user_id,
@@ -0,0 +1,32 @@
+"""拟合缓存并发保存：各写者的条目都保留，不因共用临时文件而失败。"""
+
+import threading
+
+import igt_cohort
+
+N_WRITERS = 4
+N_ROUNDS = 25
+
+
+def test_concurrent_save_cache_merges_all_entries(tmp_path, monkeypatch):
+    monkeypatch.setattr(igt_cohort, "FIT_CACHE_FILE", str(tmp_path / "fit_cache.json"))
+    errors = []
+
+    def writer(i):
+        try:
+            for j in range(N_ROUNDS):
+                cache = igt_cohort._load_cache()  # 与 fit_cohort 相同：读 -> 加新结果 -> 保存
+                cache[f"w{i}-{j}"] = {"best": "delta"}
+                igt_cohort._save_cache(cache)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=writer, args=(i,)) for i in range(N_WRITERS)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert errors == []
+    assert set(igt_cohort._load_cache()) == {f"w{i}-{j}" for i in range(N_WRITERS) for j in range(N_ROUNDS)}
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["fit_cache.json", "fit_cache.json.lock"]
@@ -0,0 +1,89 @@
+"""轨迹紧凑编码（持久化格式）的往返测试。"""
+
+import json
+
+import numpy as np
+
+from igt_trajectory import (
+    decode_trajectory,
+    encode_payload,
+    encode_trajectory,
+    history_from_entry,
+    path_rows_from_entry,
+)
+
+
+def _history(rewards, choices="ABCD", initial=2000):
+    bal = initial + np.cumsum(rewards)
+    return [[choices[i % len(choices)], int(r), int(b)] for i, (r, b) in enumerate(zip(rewards, bal))]
+
+
+def _path_rows(rewards, initial=2000):
+    return [[i, c, r, b] for i, (c, r, b) in enumerate(_history(rewards, initial=initial), 1)]
+
+
+def _stored(payload):
+    # 提交经 JSON 存储后再读出
+    return json.loads(json.dumps(encode_payload(payload), ensure_ascii=False))
+
+
+def test_self_play_round_trip():
+    history = _history([100, -250, 50, -1150, 100])
+    entry = _stored({"history": history, "final_balance": history[-1][2]})
+    assert "history" not in entry and entry["history_z"]["dtype"] == "<i2"
+    assert entry["final_balance"] == history[-1][2]
+    assert history_from_entry(entry) == [tuple(h) for h in history]
+
+
+def test_path_rows_round_trip_drops_redundant_balances():
+    rows = _path_rows([100, -250, 50, 100], initial=1500)
+    balances = [1500] + [r[3] for r in rows]
+    entry = _stored({"path_rows": rows, "balances": balances})
+    assert set(entry) == {"path_rows_z"}
+    assert entry["path_rows_z"]["initial_balance"] == 1500
+    assert path_rows_from_entry(entry) == [tuple(r) for r in rows]
+
+
+def test_dashboard_paths_round_trip():
+    payload = {}
+    for key, bal_key in (("path_delta", "balances_delta"), ("path_ql", "balances_ql")):
+        payload[key] = _path_rows([50, -100, 100])
+        payload[bal_key] = [2000] + [r[3] for r in payload[key]]
+    entry = _stored(payload)
+    assert set(entry) == {"path_delta_z", "path_ql_z"}
+    for key in ("path_delta", "path_ql"):
+        assert path_rows_from_entry(entry, key) == [tuple(r) for r in payload[key]]
+
+
+def test_large_rewards_fall_back_to_int32():
+    rewards = [40000, -70000, 100]
+    entry = _stored({"path_rows": _path_rows(rewards)})
+    assert entry["path_rows_z"]["dtype"] == "<i4"
+    assert [r[2] for r in path_rows_from_entry(entry)] == rewards
+    z = encode_trajectory("AB", [-2 ** 15, 2 ** 15 - 1])
+    assert z["dtype"] == "<i2" and decode_trajectory(z)[1].tolist() == [-2 ** 15, 2 ** 15 - 1]
+
+
+def test_non_conforming_trajectories_pass_through():
+    gap = _path_rows([100, -250, 50])
+    gap[1][0] = 5  # 轮次不连续
+    wrong_balance = _path_rows([100, -250, 50])
+    wrong_balance[2][3] += 1  # 余额与累计收益不一致
+    bad_history = _history([100, -250])
+    bad_history[1][2] = 0
+    odd_choice = _history([100, 50], choices=["A", "E"])
+    for payload in (
+        {"path_rows": gap},
+        {"path_rows": wrong_balance, "balances": [2000] + [r[3] for r in wrong_balance]},
+        {"history": bad_history},
+        {"history": odd_choice},
+    ):
+        assert _stored(payload) == payload
+
+
+def test_balances_kept_when_not_redundant():
+    rows = _path_rows([100, -250])
+    balances = [2000, 2100, 1850, 1850]  # 比轨迹多一项，不能由轨迹推出
+    entry = _stored({"path_rows": rows, "balances": balances})
+    assert "path_rows_z" in entry and entry["balances"] == balances
+    assert path_rows_from_entry(entry) == [tuple(r) for r in rows]
@@ -0,0 +1,62 @@
+"""导出缓存：有界 LRU、淘汰时删除文件、同一份导出并发只生成一次。"""
+
+import os
+import threading
+
+import pytest
+
+import submission_export
+import submission_store
+from submission_store import SqliteStore
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    s = SqliteStore(str(tmp_path / "submissions.db"))
+    monkeypatch.setattr(submission_store, "_store", s)
+    submission_export.clear_cache()
+    yield s
+    submission_export.clear_cache()
+
+
+def _add(store, uid, n=3):
+    history = [["A", 100, 2000 + 100 * (i + 1)] for i in range(n)]
+    store.add("自己玩", {"学号": uid, "昵称": "", "时间": "2024-01-01T00:00:00", "history": history})
+
+
+def test_cache_is_bounded_and_evicted_files_are_removed(store, monkeypatch):
+    monkeypatch.setattr(submission_export, "EXPORT_CACHE_SIZE", 2)
+    paths = []
+    for uid in ("a", "b", "c"):
+        _add(store, uid)
+        f, _, _ = submission_export.get_export("自己玩", uid)
+        with f:
+            assert f.read().startswith("\ufeff学号".encode("utf-8"))
+            paths.append(f.name)
+    assert len(submission_export._cache) == 2
+    assert not os.path.exists(paths[0])
+    assert all(os.path.exists(p) for p in paths[1:])
+
+
+def test_concurrent_requests_build_once_and_rebuild_after_change(store, monkeypatch):
+    _add(store, "a")
+    calls = []
+    build = submission_export._build_file
+    monkeypatch.setattr(submission_export, "_build_file", lambda *a: calls.append(a) or build(*a))
+    results = []
+
+    def worker():
+        f, _, _ = submission_export.get_export("自己玩", None, "gzip")
+        with f:
+            results.append(f.read())
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(calls) == 1 and len(set(results)) == 1
+
+    _add(store, "b")
+    submission_export.get_export("自己玩", None, "gzip")[0].close()
+    assert len(calls) == 2
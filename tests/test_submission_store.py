@@ -0,0 +1,111 @@
+"""提交存储的并发测试：多进程同时首次提交不丢行；SQLite 连接跨线程复用。"""
+
+import json
+import multiprocessing
+import os
+import threading
+
+import pytest
+
+from submission_store import JsonlStore, SqliteStore
+
+N_PROCS = 4
+N_PER_PROC = 200
+
+fork = pytest.mark.skipif("fork" not in multiprocessing.get_all_start_methods(), reason="需要 fork")
+
+
+def _legacy(tmp_path):
+    legacy = tmp_path / "submissions.json"
+    old = {"自己玩": [{"学号": "old", "昵称": "旧", "时间": "2024-01-01T00:00:00", "history": [["A", 100, 2100]]}]}
+    legacy.write_text(json.dumps(old, ensure_ascii=False), encoding="utf-8")
+    return str(legacy)
+
+
+def _run_procs(target, args):
+    ctx = multiprocessing.get_context("fork")
+    start = ctx.Barrier(N_PROCS)
+    procs = [ctx.Process(target=target, args=(start, i, *args)) for i in range(N_PROCS)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join(60)
+    assert [p.exitcode for p in procs] == [0] * N_PROCS
+
+
+def _jsonl_worker(start, i, path, legacy):
+    store = JsonlStore(path, legacy)
+    start.wait()
+    for j in range(N_PER_PROC):
+        store.add("Delta", {"学号": f"u{i}", "昵称": "", "时间": f"{j:04d}"})
+
+
+@fork
+def test_jsonl_concurrent_first_submissions_migrate_once(tmp_path):
+    path = str(tmp_path / "submissions.jsonl")
+    _run_procs(_jsonl_worker, (path, _legacy(tmp_path)))
+
+    data = JsonlStore(path, None).load()
+    assert len(data["自己玩"]) == 1  # 旧数据只迁移一次
+    assert len(data["Delta"]) == N_PROCS * N_PER_PROC
+    for i in range(N_PROCS):
+        assert [e["时间"] for e in data["Delta"] if e["学号"] == f"u{i}"] == [f"{j:04d}" for j in range(N_PER_PROC)]
+    assert not [f for f in os.listdir(tmp_path) if f.endswith(".migrating")]
+
+
+def _sqlite_worker(start, i, path, log, legacy):
+    store = SqliteStore(path, import_from=lambda: JsonlStore(log, legacy))
+    start.wait()
+    for j in range(N_PER_PROC // 4):
+        store.add("Delta", {"学号": f"u{i}", "昵称": "", "时间": f"{j:04d}"})
+
+
+@fork
+def test_sqlite_concurrent_first_open_imports_once(tmp_path):
+    path = str(tmp_path / "submissions.db")
+    log = str(tmp_path / "submissions.jsonl")
+    _run_procs(_sqlite_worker, (path, log, _legacy(tmp_path)))
+
+    store = SqliteStore(path)
+    assert len(store.get_module("自己玩")) == 1
+    assert len(store.get_module("Delta")) == N_PROCS * (N_PER_PROC // 4)
+
+
+def test_sqlite_reuses_connections_across_threads(tmp_path):
+    # Streamlit 每次重跑都在新线程里：连接应被复用而不是每个线程新建
+    store = SqliteStore(str(tmp_path / "submissions.db"))
+    seen = []
+
+    def rerun(j):
+        store.add("Delta", {"学号": "u", "昵称": "", "时间": f"{j:04d}"})
+        with store._conn() as conn:
+            seen.append(conn)
+
+    for j in range(10):
+        t = threading.Thread(target=rerun, args=(j,))
+        t.start()
+        t.join()
+    assert len(set(map(id, seen))) == 1
+    assert [e["时间"] for e in store.iter_module("Delta", "u")] == [f"{j:04d}" for j in range(10)]
+
+
+def test_sqlite_concurrent_threads(tmp_path):
+    store = SqliteStore(str(tmp_path / "submissions.db"))
+    errors = []
+
+    def worker(i):
+        try:
+            for j in range(50):
+                store.add("Delta", {"学号": f"u{i}", "昵称": "", "时间": f"{j:04d}"})
+                list(store.iter_module("Delta", f"u{i}"))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert errors == []
+    assert store.version("Delta")[0] == 8 * 50
+    assert len(store._pool) <= SqliteStore.POOL_MAX